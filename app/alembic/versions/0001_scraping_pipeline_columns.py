@@ -0,0 +1,96 @@
+"""Add scraping pipeline columns and tables to existing databases
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18 10:00:00
+
+Tables are created by Base.metadata.create_all at startup, which never
+alters a table that already exists. This brings databases created before
+change detection, delisting, crawl modes, resumable runs and run profiles
+up to date. Every step is skipped when already applied, so it is safe on
+databases that create_all built from the current models.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+NEW_COLUMNS = {
+    'cars': [
+        sa.Column('delisted_at', sa.DateTime(timezone=True)),
+        sa.Column('verified_at', sa.DateTime(timezone=True)),
+        sa.Column('content_hash', sa.String(40)),
+    ],
+    'scraping_logs': [
+        sa.Column('crawl_mode', sa.String(20)),
+        sa.Column('last_page', sa.Integer()),
+        sa.Column('last_external_id', sa.String(100)),
+        sa.Column('resumed_from_id', sa.Integer(),
+                  sa.ForeignKey('scraping_logs.id', name='fk_scraping_logs_resumed_from_id')),
+        sa.Column('request_rate', sa.Float()),
+        sa.Column('stage_metrics', sa.JSON()),
+    ],
+}
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    tables = set(inspector.get_table_names())
+
+    for table, columns in NEW_COLUMNS.items():
+        if table not in tables:
+            # A fresh database: create_all builds it with every column
+            continue
+        existing = {column['name'] for column in inspector.get_columns(table)}
+        missing = [column for column in columns if column.name not in existing]
+        if missing:
+            # Batch mode rebuilds the table where ALTER TABLE cannot add a foreign key
+            with op.batch_alter_table(table) as batch_op:
+                for column in missing:
+                    batch_op.add_column(column.copy())
+
+    if 'cars' in tables and 'ix_cars_is_available' not in {index['name'] for index in inspector.get_indexes('cars')}:
+        op.create_index('ix_cars_is_available', 'cars', ['is_available'])
+
+    if 'search_cars' not in tables and {'searches', 'cars'} <= tables:
+        op.create_table(
+            'search_cars',
+            sa.Column('search_id', sa.Integer(), sa.ForeignKey('searches.id'), primary_key=True),
+            sa.Column('car_id', sa.Integer(), sa.ForeignKey('cars.id'), primary_key=True),
+        )
+        op.create_index('ix_search_cars_car_id', 'search_cars', ['car_id'])
+
+    if 'scrape_page_metrics' not in tables and 'scraping_logs' in tables:
+        op.create_table(
+            'scrape_page_metrics',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('scraping_log_id', sa.Integer(), sa.ForeignKey('scraping_logs.id'), nullable=False),
+            sa.Column('url', sa.Text()),
+            sa.Column('page', sa.Integer(), nullable=False),
+            sa.Column('status_code', sa.Integer()),
+            sa.Column('not_modified', sa.Boolean()),
+            sa.Column('attempts', sa.Integer()),
+            sa.Column('response_bytes', sa.Integer()),
+            sa.Column('fetch_seconds', sa.Float()),
+            sa.Column('parse_seconds', sa.Float()),
+            sa.Column('listings', sa.Integer()),
+            sa.Column('write_seconds', sa.Float()),
+        )
+        op.create_index('ix_scrape_page_metrics_id', 'scrape_page_metrics', ['id'])
+        op.create_index('ix_scrape_page_metrics_scraping_log_id', 'scrape_page_metrics', ['scraping_log_id'])
+
+
+def downgrade() -> None:
+    op.drop_table('scrape_page_metrics')
+    op.drop_table('search_cars')
+    op.drop_index('ix_cars_is_available', table_name='cars')
+    for table, columns in NEW_COLUMNS.items():
+        with op.batch_alter_table(table) as batch_op:
+            for column in reversed(columns):
+                batch_op.drop_column(column.name)
@@ -0,0 +1,53 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+import logging
+
+from app.core.database import get_db
+from app.models.schemas import ScrapeJobProgress, ScrapeJobResponse, ScrapeRunProfile
+from app.services.scrape_job_service import ScrapeJobService
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+@router.get("/jobs/{job_id}", response_model=ScrapeJobResponse)
+async def get_job(job_id: int, db: Session = Depends(get_db)):
+    """Get the status of a scraping job"""
+    try:
+        job = ScrapeJobService(db).get_job(job_id)
+        if not job:
+            raise HTTPException(status_code=404, detail="Job not found")
+        return job
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error getting job {job_id}: {e}")
+        raise HTTPException(status_code=500, detail="Failed to retrieve job")
+
+@router.get("/jobs/{job_id}/progress", response_model=ScrapeJobProgress)
+async def get_job_progress(job_id: int, db: Session = Depends(get_db)):
+    """Get the progress of a scraping job"""
+    try:
+        progress = ScrapeJobService(db).get_progress(job_id)
+        if not progress:
+            raise HTTPException(status_code=404, detail="Job not found")
+        return progress
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error getting progress of job {job_id}: {e}")
+        raise HTTPException(status_code=500, detail="Failed to retrieve job progress")
+
+@router.get("/runs/{run_id}/profile", response_model=ScrapeRunProfile)
+async def get_run_profile(run_id: int, db: Session = Depends(get_db)):
+    """Get fetch, parse and write timings of a scraping run"""
+    try:
+        profile = ScrapeJobService(db).get_run_profile(run_id)
+        if not profile:
+            raise HTTPException(status_code=404, detail="Run not found")
+        return profile
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error getting profile of run {run_id}: {e}")
+        raise HTTPException(status_code=500, detail="Failed to retrieve run profile")
@@ -1,11 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
 from typing import List, Optional
 import logging
 
 from app.core.database import get_db
 from app.models.models import Search
-from app.models.schemas import SearchCreate, SearchUpdate, SearchResponse
+from app.models.schemas import ScrapeJobResponse, SearchCreate, SearchUpdate, SearchResponse
+from app.services.scrape_job_service import ScrapeJobService
 from app.services.search_service import SearchService
 
 logger = logging.getLogger(__name__)
@@ -88,13 +89,19 @@ async def delete_search(search_id: int, db: Session = Depends(get_db)):
         logger.error(f"Error deleting search {search_id}: {e}")
         raise HTTPException(status_code=500, detail="Failed to delete search")
 
-@router.post("/{search_id}/run")
-async def run_search(search_id: int, db: Session = Depends(get_db)):
-    """Manually trigger scraping for a specific search"""
+@router.post("/{search_id}/run", response_model=ScrapeJobResponse, status_code=202)
+async def run_search(search_id: int, response: Response, db: Session = Depends(get_db)):
+    """Start scraping a search in the background; returns the job to poll.
+    
+    If the search already has a queued or running job, that job is returned.
+    """
     try:
-        search_service = SearchService(db)
-        result = await search_service.run_search_scraping(search_id)
-        return result
+        job, created = await ScrapeJobService(db).start_search_run(search_id)
+        if not created:
+            response.status_code = 200
+        return job
+    except ValueError:
+        raise HTTPException(status_code=404, detail="Search not found")
     except HTTPException:
         raise
     except Exception as e:
@@ -7,8 +7,9 @@ from pathlib import Path
 
 from app.core.config import settings
 from app.core.database import engine, Base
-from app.api import cars, searches, analytics, charts
+from app.api import cars, searches, analytics, charts, scraping
 from app.services.scheduler import scheduler
+from app.scraping.parse_pool import shutdown_parse_pool
 
 # Configure logging
 logging.basicConfig(
@@ -36,6 +37,7 @@ async def lifespan(app: FastAPI):
     logger.info("Shutting down CarScraping application...")
     scheduler.shutdown()
     logger.info("Scheduler stopped")
+    shutdown_parse_pool()
 
 # Create FastAPI app
 app = FastAPI(
@@ -56,6 +58,7 @@ app.include_router(cars.router, prefix="/api/cars", tags=["cars"])
 app.include_router(searches.router, prefix="/api/searches", tags=["searches"])
 app.include_router(analytics.router, prefix="/api/analytics", tags=["analytics"])
 app.include_router(charts.router, prefix="/api/charts", tags=["charts"])
+app.include_router(scraping.router, prefix="/api/scraping", tags=["scraping"])
 
 @app.get("/")
 async def read_root(request: Request):
@@ -1,8 +1,17 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, Text, ForeignKey, JSON
+from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, Text, ForeignKey, JSON, Table, or_, select
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.core.database import Base
 
+# Searches a car matched besides the one that crawled it (Car.search_id),
+# filled when a broader search's crawl is routed to the searches it covers
+search_cars = Table(
+    "search_cars",
+    Base.metadata,
+    Column("search_id", Integer, ForeignKey("searches.id"), primary_key=True),
+    Column("car_id", Integer, ForeignKey("cars.id"), primary_key=True, index=True),
+)
+
 class Search(Base):
     """Saved search configurations"""
     __tablename__ = "searches"
@@ -76,10 +85,13 @@ class Car(Base):
     # Metadata
     first_seen = Column(DateTime(timezone=True), server_default=func.now())
     last_seen = Column(DateTime(timezone=True), server_default=func.now())
-    is_available = Column(Boolean, default=True)
+    is_available = Column(Boolean, default=True, index=True)
+    delisted_at = Column(DateTime(timezone=True))  # When a full run last missed the listing
+    verified_at = Column(DateTime(timezone=True))  # Last time the detail page was confirmed live
     
     # Raw data
     raw_data = Column(JSON)  # Store original scraped data
+    content_hash = Column(String(40))  # SHA-1 of the scraped listing, for change detection
     
     # Foreign keys
     search_id = Column(Integer, ForeignKey("searches.id"))
@@ -88,6 +100,14 @@ class Car(Base):
     search = relationship("Search", back_populates="cars")
     price_history = relationship("PriceHistory", back_populates="car")
 
+    @classmethod
+    def in_search(cls, search_id: int):
+        """Filter clause for cars crawled by or routed to a search"""
+        return or_(
+            cls.search_id == search_id,
+            cls.id.in_(select(search_cars.c.car_id).where(search_cars.c.search_id == search_id))
+        )
+
 class PriceHistory(Base):
     """Price tracking history"""
     __tablename__ = "price_history"
@@ -112,6 +132,12 @@ class ScrapingLog(Base):
     started_at = Column(DateTime(timezone=True), server_default=func.now())
     completed_at = Column(DateTime(timezone=True))
     status = Column(String(50), nullable=False)  # success, failed, partial
+    crawl_mode = Column(String(20))  # full, incremental
+    
+    # Resume cursor: last page whose listings were committed
+    last_page = Column(Integer)
+    last_external_id = Column(String(100))
+    resumed_from_id = Column(Integer, ForeignKey("scraping_logs.id"))
     
     # Results
     cars_found = Column(Integer, default=0)
@@ -125,4 +151,28 @@ class ScrapingLog(Base):
     # Performance metrics
     duration_seconds = Column(Float)
     pages_scraped = Column(Integer)
-    requests_made = Column(Integer)
\ No newline at end of file
+    requests_made = Column(Integer)
+    request_rate = Column(Float)  # Adaptive request rate (req/s) at the end of the run
+    # Per pipeline stage (fetch, parse, write): items, throughput, queue depth
+    stage_metrics = Column(JSON)
+
+class ScrapePageMetric(Base):
+    """Timings and sizes of one result page fetched by a scraping run"""
+    __tablename__ = "scrape_page_metrics"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    scraping_log_id = Column(Integer, ForeignKey("scraping_logs.id"), nullable=False, index=True)
+    url = Column(Text)
+    page = Column(Integer, nullable=False)
+    
+    # Fetch
+    status_code = Column(Integer)
+    not_modified = Column(Boolean, default=False)
+    attempts = Column(Integer, default=1)  # retries are attempts - 1
+    response_bytes = Column(Integer, default=0)  # body as received; a 304 has none
+    fetch_seconds = Column(Float)
+    
+    # Parse and write (unset for pages the run stopped before)
+    parse_seconds = Column(Float)
+    listings = Column(Integer)
+    write_seconds = Column(Float)
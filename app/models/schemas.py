@@ -98,6 +98,7 @@ class CarResponse(BaseModel):
     first_seen: datetime
     last_seen: datetime
     is_available: bool
+    delisted_at: Optional[datetime] = None
 
 # Analytics schemas
 class PriceRange(BaseModel):
@@ -131,4 +132,62 @@ class AnalyticsResponse(BaseModel):
     price_trends: List[PriceTrend]
     avg_age_years: float
     fuel_type_distribution: Dict[str, int]
-    transmission_distribution: Dict[str, int]
\ No newline at end of file
+    transmission_distribution: Dict[str, int]
+
+# Scraping job schemas
+class ScrapeJobResponse(BaseModel):
+    job_id: int
+    search_id: int
+    status: str  # queued, running, success, partial, failed
+    crawl_mode: Optional[str] = None
+    started_at: Optional[datetime] = None
+    completed_at: Optional[datetime] = None
+    pages_scraped: int = 0
+    cars_found: int = 0
+    cars_new: int = 0
+    cars_updated: int = 0
+    error_message: Optional[str] = None
+    deduplicated: bool = False  # An active job was returned instead of starting a new one
+
+class ScrapeJobProgress(BaseModel):
+    job_id: int
+    status: str
+    done: bool
+    last_page: Optional[int] = None
+    pages_scraped: int
+    cars_found: int
+    elapsed_seconds: float
+    pages_per_minute: float
+
+# Scrape run profile schemas
+class ScrapePageProfile(BaseModel):
+    page: int
+    url: Optional[str] = None
+    status_code: Optional[int] = None
+    not_modified: bool = False
+    attempts: int = 1
+    response_bytes: int = 0
+    fetch_seconds: Optional[float] = None
+    parse_seconds: Optional[float] = None
+    listings: Optional[int] = None
+    write_seconds: Optional[float] = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+class ScrapeRunProfile(BaseModel):
+    run_id: int
+    search_id: int
+    status: str
+    duration_seconds: Optional[float] = None
+    pages_scraped: int = 0
+    requests_made: int = 0
+    retries: int = 0
+    # Fetch latency percentiles and response bytes
+    fetch: Dict[str, Any]
+    # Parse time and listings extracted per page
+    parse: Dict[str, Any]
+    # DB write time per page
+    write: Dict[str, Any]
+    # Pipeline stage throughput and queue depth (see ScrapingLog.stage_metrics)
+    stages: Optional[Dict[str, Any]] = None
+    pages: List[ScrapePageProfile]
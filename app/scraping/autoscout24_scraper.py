@@ -1,78 +1,113 @@
-import requests
-from bs4 import BeautifulSoup
-from fake_useragent import UserAgent
+from sqlalchemy import or_, select
 from sqlalchemy.orm import Session
 from urllib.parse import urlencode, urlparse, parse_qs
-import time
-import re
+import asyncio
 import logging
-from typing import Dict, List, Optional, Any
-from datetime import datetime
+import time
+from typing import Dict, List, NamedTuple, Optional, Any, Set, Tuple
+from datetime import datetime, timedelta
 
-from app.models.models import Car, Search, ScrapingLog, PriceHistory
+from app.models.models import Car, Search, ScrapingLog, ScrapePageMetric, PriceHistory
 from app.core.config import settings
+from app.scraping.fetcher import AsyncFetcher, FetchResponse
+from app.scraping.crawl_planner import canonical_params, listing_matches, residual_params, search_params
+from app.scraping.http_cache import HttpCache
+from app.scraping.liveness import ALIVE, GONE, LivenessVerifier
+from app.scraping.page_archive import PageArchive
+from app.scraping.parse_pool import get_parse_pool
+from app.scraping.parser import ListingParser
+from app.scraping.pipeline import PagePipeline, stage_metrics
+from app.scraping.persistence import KnownListingIndex, ListingWriter, listing_content_hash
+from app.scraping.proxy_pool import get_proxy_pool
+from app.scraping.rate_limiter import host_rate, with_jitter
+from app.scraping.sharding import Shard, root_shard, split_shard
 
 logger = logging.getLogger(__name__)
 
+# AutoScout24 does not serve result pages past this one
+MAX_PAGES = 50
+
+CRAWL_FULL = 'full'
+CRAWL_INCREMENTAL = 'incremental'
+
+class CrawlRun:
+    """State of one scrape_search run, shared by the crawls of its shards"""
+
+    def __init__(self, search: Search, crawl_mode: str, log_entry: ScrapingLog, members: List[Search],
+                 known_index: KnownListingIndex, archive: Optional[PageArchive] = None):
+        self.search = search
+        self.crawl_mode = crawl_mode
+        self.log_entry = log_entry
+        self.members = members
+        # Only what each member filters beyond this search is checked on listings
+        root_params = canonical_params(search)
+        self.member_params = [(member, residual_params(root_params, canonical_params(member)))
+                              for member in members]
+        self.routed = {member.id: 0 for member in members}
+        self.known_index = known_index
+        self.archive = archive
+        self.cars_found = 0
+        self.cars_new = 0
+        self.cars_updated = 0
+        self.cars_unchanged = 0
+        self.pages_scraped = 0
+        self.requests_made = 0
+        # Everything listed in this run, to skip duplicates and sweep the rest
+        self.seen_external_ids: Set[str] = set()
+        # Why pagination stopped early, if it did
+        self.interrupted: Optional[str] = None
+        self.shards = 0
+        # Shared by the page pipelines of the run's shards
+        self.stage_metrics = stage_metrics()
+        # The writers of concurrent shards share the run's session: one
+        # page is saved at a time, in a worker thread
+        self.db_lock = asyncio.Lock()
+        # Timings and sizes of each fetched page, by page URL
+        self.page_profiles: Dict[str, Dict[str, Any]] = {}
+        self.shard_semaphore = asyncio.Semaphore(max(1, settings.shard_concurrency))
+
+    def page_profile(self, url: str, page: int) -> Dict[str, Any]:
+        return self.page_profiles.setdefault(url, {'url': url, 'page': page})
+
+class CrawlOutcome(NamedTuple):
+    """How pagination of one result URL ended"""
+    reached_last_page: bool
+    # More pages existed past MAX_PAGES
+    pages_capped: bool
+    # Page 1 reported more results than MAX_PAGES can show
+    saturated: bool
+
 class AutoScout24Scraper:
-    def __init__(self, db: Session):
+    def __init__(self, db: Session, fetcher: Optional[AsyncFetcher] = None):
         self.db = db
-        self.ua = UserAgent()
         self.base_url = settings.autoscout24_base_url
-        self.session = requests.Session()
-        self._setup_session()
-
-    def _setup_session(self):
-        """Setup session with headers and settings"""
-        self.session.headers.update({
-            'User-Agent': self.ua.random,
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-            'Accept-Language': 'it-IT,it;q=0.8,en-US;q=0.5,en;q=0.3',
-            'Accept-Encoding': 'gzip, deflate',
-            'DNT': '1',
-            'Connection': 'keep-alive',
-            'Upgrade-Insecure-Requests': '1',
-        })
-
-    def _build_search_url(self, search: Search) -> str:
-        """Build AutoScout24 search URL from search parameters"""
-        params = {}
-        
-        # Basic filters
-        if search.brand:
-            params['make'] = search.brand
-        if search.model:
-            params['model'] = search.model
-        if search.fuel_type:
-            params['fuel'] = search.fuel_type
-        if search.transmission:
-            params['transmission'] = search.transmission
-        if search.body_type:
-            params['body'] = search.body_type
-        if search.color:
-            params['color'] = search.color
-        
-        # Range filters
-        if search.year_min:
-            params['yearfrom'] = search.year_min
-        if search.year_max:
-            params['yearto'] = search.year_max
-        if search.mileage_min:
-            params['kmfrom'] = search.mileage_min
-        if search.mileage_max:
-            params['kmto'] = search.mileage_max
-        if search.price_min:
-            params['pricefrom'] = int(search.price_min)
-        if search.price_max:
-            params['priceto'] = int(search.price_max)
-        if search.power_min:
-            params['powerfrom'] = search.power_min
-        if search.power_max:
-            params['powerto'] = search.power_max
-        
-        # Location
-        if search.province:
-            params['region'] = search.province
+        # A shared fetcher is owned by the caller; otherwise we close our own
+        self._owns_fetcher = fetcher is None
+        self.fetcher = fetcher or AsyncFetcher(
+            cache=HttpCache() if settings.http_cache_enabled else None,
+            proxies=get_proxy_pool()
+        )
+        # Keeps the selector plan learned on the first page for later pages
+        self.parser = ListingParser(self.base_url)
+        # Page-level upserts where the dialect supports ON CONFLICT
+        self.writer = ListingWriter(db) if ListingWriter.supports(db) else None
+        # Log of the latest scrape_search run, for callers that cancel it
+        self.log_entry: Optional[ScrapingLog] = None
+
+    async def close(self) -> None:
+        """Release the HTTP connection pool if this scraper owns it"""
+        if self._owns_fetcher:
+            await self.fetcher.close()
+
+    def _build_search_url(self, search: Search, shard: Optional[Shard] = None) -> str:
+        """Build AutoScout24 search URL from search parameters.
+        
+        shard overrides the price/year bounds for one sub-range of a
+        saturated search.
+        """
+        params = search_params(search)
+        if shard:
+            params.update(shard)
         
         # Sort by newest first
         params['sort'] = 'age'
@@ -82,342 +117,648 @@ class AutoScout24Scraper:
         logger.info(f"Built search URL: {url}")
         return url
 
-    async def scrape_search(self, search: Search) -> Dict[str, Any]:
-        """Scrape all results for a given search"""
-        log_entry = ScrapingLog(
-            search_id=search.id,
-            started_at=datetime.now(),
-            status='running'
-        )
-        self.db.add(log_entry)
+    def _choose_crawl_mode(self, search: Search) -> str:
+        """Incremental unless the search is due a periodic full crawl"""
+        if not settings.incremental_crawl_enabled:
+            return CRAWL_FULL
+        
+        last_full = self.db.query(ScrapingLog.started_at).filter(
+            ScrapingLog.search_id == search.id,
+            ScrapingLog.crawl_mode == CRAWL_FULL,
+            ScrapingLog.status == 'success'
+        ).order_by(ScrapingLog.started_at.desc()).first()
+        
+        if last_full is None:
+            return CRAWL_FULL
+        age = datetime.now() - last_full.started_at.replace(tzinfo=None)
+        if age >= timedelta(hours=settings.full_crawl_interval_hours):
+            return CRAWL_FULL
+        return CRAWL_INCREMENTAL
+
+    async def scrape_search(self, search: Search, crawl_mode: Optional[str] = None,
+                            members: Optional[List[Search]] = None,
+                            log_id: Optional[int] = None) -> Dict[str, Any]:
+        """Scrape all results for a given search.
+        
+        In incremental mode pagination stops once enough consecutive pages
+        hold only known, unchanged listings (results are sorted newest
+        first); a full crawl pages through everything to refresh prices.
+        A full crawl of a search with more results than MAX_PAGES can show
+        is split into price/year shards (see sharding), crawled in parallel.
+        
+        members are narrower searches this one covers (see crawl_planner):
+        each scraped listing is also recorded under every member it matches.
+        
+        If the search's last run stopped part-way, this run resumes it from
+        its cursor (last committed page) in the same crawl mode.
+        
+        log_id is a ScrapingLog queued in advance (a background job) for
+        this run to report its progress on, instead of creating one.
+        """
+        members = members or []
+        resumed = self._find_resumable_run(search, exclude_id=log_id)
+        if resumed is not None:
+            # Carry on the interrupted crawl rather than starting over
+            crawl_mode = resumed.crawl_mode
+        crawl_mode = crawl_mode or self._choose_crawl_mode(search)
+        
+        log_entry = None
+        if log_id is not None:
+            log_entry = self.db.query(ScrapingLog).filter(ScrapingLog.id == log_id).first()
+        if log_entry is None:
+            log_entry = ScrapingLog(search_id=search.id)
+            self.db.add(log_entry)
+        log_entry.started_at = datetime.now()
+        log_entry.status = 'running'
+        log_entry.crawl_mode = crawl_mode
+        if resumed is not None:
+            log_entry.resumed_from_id = resumed.id
+            # Keep the cursor if this run dies before committing a page
+            log_entry.last_page = resumed.last_page
+            log_entry.last_external_id = resumed.last_external_id
         self.db.commit()
+        self.log_entry = log_entry
         
+        run = None
         try:
             search_url = self._build_search_url(search)
             
-            cars_found = 0
-            cars_new = 0
-            cars_updated = 0
-            pages_scraped = 0
-            requests_made = 0
+            run = CrawlRun(
+                search, crawl_mode, log_entry, members,
+                # What is already stored for this search and its members, so
+                # unchanged listings need no DB work
+                known_index=KnownListingIndex.load(self.db, search.id, [member.id for member in members]),
+                archive=PageArchive(log_entry.id) if settings.page_archive_enabled else None
+            )
             
-            # Start scraping from first page
             page = 1
-            has_more_pages = True
+            if resumed is not None:
+                # Re-fetch the last committed page: new listings push results
+                # down, so it overlaps whatever drifted across the boundary
+                page = resumed.last_page
+                run.seen_external_ids = self._seen_since([search.id] + [member.id for member in members], resumed)
+                logger.info(f"Resuming interrupted run {resumed.id} of search {search.name} at page {page}")
             
-            while has_more_pages and page <= 50:  # Limit to 50 pages
-                page_url = f"{search_url}&page={page}"
-                logger.info(f"Scraping page {page}: {page_url}")
-                
-                try:
-                    response = self._make_request(page_url)
-                    requests_made += 1
-                    
-                    if response.status_code != 200:
-                        logger.warning(f"Failed to fetch page {page}: {response.status_code}")
-                        break
-                    
-                    soup = BeautifulSoup(response.content, 'html.parser')
-                    
-                    # Extract car listings from page
-                    car_listings = self._extract_car_listings(soup)
-                    
-                    if not car_listings:
-                        logger.info(f"No car listings found on page {page}, stopping")
-                        has_more_pages = False
-                        break
-                    
-                    for listing_data in car_listings:
-                        try:
-                            car_result = self._process_car_listing(listing_data, search.id)
-                            if car_result['is_new']:
-                                cars_new += 1
-                            else:
-                                cars_updated += 1
-                            cars_found += 1
-                        except Exception as e:
-                            logger.error(f"Error processing car listing: {e}")
-                            continue
-                    
-                    pages_scraped += 1
-                    
-                    # Check if there's a next page
-                    has_more_pages = self._has_next_page(soup)
-                    
-                    # Delay between requests
-                    time.sleep(settings.request_delay)
-                    page += 1
-                    
-                except Exception as e:
-                    logger.error(f"Error scraping page {page}: {e}")
-                    break
+            shardable = (crawl_mode == CRAWL_FULL and settings.shard_saturated_searches
+                         and split_shard(root_shard(search)) is not None)
+            outcome = await self._crawl_pages(run, search_url, page, stop_when_saturated=shardable)
+            reached_last_page = outcome.reached_last_page
+            pages_capped = outcome.pages_capped
+            if shardable and (outcome.saturated or outcome.pages_capped) and not run.interrupted:
+                logger.info(f"Search {search.name} has more results than {MAX_PAGES} pages show, sharding it")
+                reached_last_page = await self._crawl_shards(run, root_shard(search))
+                pages_capped = not reached_last_page and not run.interrupted
+            
+            # Only a full crawl that paged to the end proves what is gone
+            cars_delisted = 0
+            if crawl_mode == CRAWL_FULL and reached_last_page and not run.interrupted:
+                # The members' own cars are all within this crawl's results too
+                for swept in [search] + members:
+                    cars_delisted += await self._sweep_unseen(swept.id, run.seen_external_ids)
             
-            # Update log entry
+            # Update log entry; an interrupted run stays resumable
+            status = 'partial' if run.interrupted else 'success'
             log_entry.completed_at = datetime.now()
-            log_entry.status = 'success'
-            log_entry.cars_found = cars_found
-            log_entry.cars_new = cars_new
-            log_entry.cars_updated = cars_updated
-            log_entry.pages_scraped = pages_scraped
-            log_entry.requests_made = requests_made
+            log_entry.status = status
+            log_entry.error_message = run.interrupted
+            log_entry.cars_found = run.cars_found
+            log_entry.cars_new = run.cars_new
+            log_entry.cars_updated = run.cars_updated
+            log_entry.pages_scraped = run.pages_scraped
+            log_entry.requests_made = run.requests_made
+            log_entry.request_rate = host_rate(search_url)
+            log_entry.stage_metrics = self._stage_report(run)
             log_entry.duration_seconds = (log_entry.completed_at - log_entry.started_at).total_seconds()
+            self._save_page_profiles(run)
             
             self.db.commit()
             
             result = {
-                'status': 'success',
-                'cars_found': cars_found,
-                'cars_new': cars_new,
-                'cars_updated': cars_updated,
-                'pages_scraped': pages_scraped,
-                'requests_made': requests_made,
+                'status': status,
+                'resumed_from': log_entry.resumed_from_id,
+                'crawl_mode': crawl_mode,
+                'cars_found': run.cars_found,
+                'cars_new': run.cars_new,
+                'cars_updated': run.cars_updated,
+                'cars_unchanged': run.cars_unchanged,
+                'cars_delisted': cars_delisted,
+                'pages_scraped': run.pages_scraped,
+                'pages_capped': pages_capped,
+                'shards': run.shards,
+                'routed': run.routed,
+                'requests_made': run.requests_made,
+                'request_rate': log_entry.request_rate,
+                'stages': log_entry.stage_metrics,
                 'duration_seconds': log_entry.duration_seconds
             }
             
             logger.info(f"Scraping completed for search {search.name}: {result}")
             return result
             
+        except asyncio.CancelledError:
+            # Timed out or shut down. Writers hold the lock until a page
+            # saving in a worker thread is done with the session.
+            if run is not None:
+                async with run.db_lock:
+                    pass
+            self.db.rollback()
+            self._fail_log(log_entry, run, "Cancelled")
+            logger.warning(f"Scraping cancelled for search {search.name}")
+            raise
         except Exception as e:
-            # Update log entry with error
-            log_entry.completed_at = datetime.now()
-            log_entry.status = 'failed'
-            log_entry.error_message = str(e)
-            log_entry.duration_seconds = (log_entry.completed_at - log_entry.started_at).total_seconds()
-            
-            self.db.commit()
-            
+            self._fail_log(log_entry, run, str(e))
             logger.error(f"Scraping failed for search {search.name}: {e}")
             raise
+        finally:
+            await self.close()
 
-    def _make_request(self, url: str, retries: int = 3) -> requests.Response:
-        """Make HTTP request with retries"""
-        for attempt in range(retries):
+    def _fail_log(self, log_entry: ScrapingLog, run: Optional[CrawlRun], message: str) -> None:
+        """Close the run's log entry as failed; its cursor keeps it resumable"""
+        log_entry.completed_at = datetime.now()
+        log_entry.status = 'failed'
+        log_entry.error_message = message
+        log_entry.duration_seconds = (log_entry.completed_at - log_entry.started_at.replace(tzinfo=None)).total_seconds()
+        if run is not None:
+            self._save_page_profiles(run)
+        self.db.commit()
+
+    async def _crawl_pages(self, run: CrawlRun, search_url: str, page: int = 1,
+                           keep_cursor: bool = True, stop_when_saturated: bool = False) -> CrawlOutcome:
+        """Page through one result URL, saving listings as pages arrive.
+        
+        Pages stream through a fetch -> parse -> write pipeline and are saved
+        in page order. Page 1 goes alone. When it tells how many pages there
+        are, a full crawl schedules all the rest at once; otherwise (or when
+        the count falls short) pages are fetched page_concurrency ahead of
+        the last one saved, until a page says it is the last. An incremental
+        crawl looks no further ahead than the pages that could complete its
+        known-page streak. The host rate limiter in the fetcher paces the
+        actual requests.
+        
+        With keep_cursor the run's resume cursor follows the pages; shard
+        crawls only report progress. Listings the run has already seen
+        (in another shard, or before a resume) are not saved again.
+        
+        With stop_when_saturated, stop after page 1 if its result count says
+        the rest would not fit in MAX_PAGES.
+        """
+        # known_pages_streak: consecutive pages holding nothing new or changed
+        state = {'known_pages_streak': 0, 'reached_last_page': False, 'saturated': False,
+                 'has_more_pages': True, 'last_page': page - 1, 'page_count': None}
+        lookahead = max(1, settings.page_concurrency)
+        
+        async def fetch(page_no: int) -> FetchResponse:
+            started = time.perf_counter()
+            try:
+                response = await self._fetch_page(search_url, page_no)
+            except Exception:
+                # Lookahead fetches cancelled when the crawl stops are not recorded
+                profile = run.page_profile(self._page_url(search_url, page_no), page_no)
+                profile.update(fetch_seconds=time.perf_counter() - started, attempts=settings.max_retries)
+                raise
+            run.requests_made += 1
+            profile = run.page_profile(self._page_url(search_url, page_no), page_no)
+            profile.update(fetch_seconds=time.perf_counter() - started, status_code=response.status_code,
+                           not_modified=response.not_modified, attempts=response.attempts,
+                           response_bytes=response.wire_bytes)
+            return response
+        
+        async def parse(page_no: int, response: FetchResponse) -> Tuple[FetchResponse, Optional[Dict[str, Any]]]:
+            started = time.perf_counter()
+            parsed = await self._parse_response(response, page_no)
+            if parsed is not None:
+                profile = run.page_profile(self._page_url(search_url, page_no), page_no)
+                profile['parse_seconds'] = time.perf_counter() - started
+            return response, parsed
+        
+        def save(page_no: int, response: FetchResponse, parsed: Optional[Dict[str, Any]]) -> Tuple[bool, Optional[int], int]:
+            """Persist one page; returns (has next page, total results, page size).
+            
+            Runs in a worker thread so commits never block the event loop.
+            The run's db_lock keeps it to one page at a time across shards.
+            """
+            profile = run.page_profile(self._page_url(search_url, page_no), page_no)
+            started = time.perf_counter()
+            if response.not_modified and response.cache_meta:
+                # Page unchanged since the last run: skip parsing and DB writes
+                logger.info(f"Page {page_no} not modified, skipping")
+                cached_ids = response.cache_meta.get('external_ids', [])
+                fresh_ids = [external_id for external_id in cached_ids
+                             if external_id not in run.seen_external_ids]
+                self._touch_listings(fresh_ids, run.known_index)
+                # Member routing for these listings was recorded when the page last changed
+                run.seen_external_ids.update(fresh_ids)
+                run.cars_found += len(fresh_ids)
+                run.cars_unchanged += len(fresh_ids)
+                run.pages_scraped += 1
+                self._save_progress(run, page_no if keep_cursor else None,
+                                    cached_ids[-1] if cached_ids else None)
+                state['known_pages_streak'] += 1
+                profile['listings'] = len(cached_ids)
+                profile['write_seconds'] = time.perf_counter() - started
+                return (response.cache_meta.get('has_next_page', True),
+                        response.cache_meta.get('total_results'), len(cached_ids))
+            
+            car_listings = parsed['listings']
+            fresh = [listing for listing in car_listings
+                     if listing['external_id'] not in run.seen_external_ids]
+            counts = self._process_listings(fresh, run.search.id, run.known_index)
+            run.seen_external_ids.update(listing['external_id'] for listing in fresh)
+            if run.members:
+                self._route_listings(fresh, run.search.id, run.member_params, run.routed)
+            run.cars_found += counts['cars_found']
+            run.cars_new += counts['cars_new']
+            run.cars_updated += counts['cars_updated']
+            run.cars_unchanged += counts['cars_unchanged']
+            run.pages_scraped += 1
+            self._save_progress(run, page_no if keep_cursor else None, car_listings[-1]['external_id'])
+            if counts['cars_unchanged'] == counts['cars_found']:
+                state['known_pages_streak'] += 1
+            else:
+                state['known_pages_streak'] = 0
+            profile['listings'] = len(car_listings)
+            profile['write_seconds'] = time.perf_counter() - started
+            
+            # Check if there's a next page
+            has_more_pages = parsed['has_next_page']
+            total_results = parsed.get('total_results')
+            if self.fetcher.cache is not None:
+                self.fetcher.cache.annotate(
+                    self._page_url(search_url, page_no),
+                    external_ids=[listing['external_id'] for listing in car_listings],
+                    has_next_page=has_more_pages,
+                    total_results=total_results
+                )
+            return has_more_pages, total_results, len(car_listings)
+        
+        async def write(page_no: int, result) -> Optional[int]:
+            state['last_page'] = page_no
             try:
-                # Rotate User-Agent for each request
-                self.session.headers['User-Agent'] = self.ua.random
+                if isinstance(result, Exception):
+                    raise result
+                response, parsed = result
                 
-                response = self.session.get(url, timeout=30)
+                if run.archive is not None and response.content:
+                    await asyncio.to_thread(
+                        run.archive.add, self._page_url(search_url, page_no), page_no, response.content
+                    )
+                
+                if not (response.not_modified and response.cache_meta):
+                    if response.status_code not in (200, 304):
+                        logger.warning(f"Failed to fetch page {page_no}: {response.status_code}")
+                        run.interrupted = run.interrupted or f"Page {page_no} returned HTTP {response.status_code}"
+                        state['has_more_pages'] = False
+                        return None
+                    
+                    if not parsed['listings']:
+                        state['has_more_pages'] = False
+                        if page_no == 1 and parsed.get('total_results') == 0:
+                            logger.info("Search has no results")
+                            state['reached_last_page'] = True
+                        else:
+                            # The previous page promised more: an interstitial or a layout
+                            # change, not the end, so nothing may be swept as delisted
+                            logger.warning(f"No car listings found on page {page_no}, stopping")
+                            run.interrupted = run.interrupted or f"Page {page_no} had no listings"
+                        return None
+                
+                async with run.db_lock:
+                    saving = asyncio.ensure_future(asyncio.to_thread(save, page_no, response, parsed))
+                    try:
+                        has_more_pages, total_results, page_size = await asyncio.shield(saving)
+                    except asyncio.CancelledError:
+                        # The thread carries on with the session: hold the lock until it is done
+                        await asyncio.wait([saving])
+                        raise
+                
+                state['has_more_pages'] = has_more_pages
+                state['reached_last_page'] = not has_more_pages
+                if page_no == 1 and stop_when_saturated and self._saturated(total_results, page_size):
+                    state['saturated'] = True
+                    return None
+                if not has_more_pages or self._at_known_frontier(run.crawl_mode, state['known_pages_streak'], page_no):
+                    state['has_more_pages'] = False
+                    return None
+                
+                if page_no == 1 and run.crawl_mode == CRAWL_FULL:
+                    state['page_count'] = self._page_count(total_results, page_size)
+                    if state['page_count']:
+                        logger.info(f"Page 1 reports {state['page_count']} pages, fetching them in parallel")
+                if state['page_count'] and page_no < state['page_count']:
+                    return state['page_count']
+                # No count, or results grew past it: keep a few pages ahead
+                frontier = page_no + lookahead
+                if run.crawl_mode == CRAWL_INCREMENTAL:
+                    # Nothing past the page that could complete the known-page streak
+                    remaining = settings.incremental_stop_after_pages - state['known_pages_streak']
+                    frontier = min(frontier, page_no + max(1, remaining))
+                return frontier
+                
+            except Exception as e:
+                logger.error(f"Error scraping page {page_no}: {e}")
+                run.interrupted = run.interrupted or f"Page {page_no} failed: {e}"
+                state['has_more_pages'] = False
+                return None
+        
+        pipeline = PagePipeline(
+            fetch, parse, write,
+            fetch_workers=settings.max_requests_in_flight,
+            parse_workers=settings.parser_workers,
+            queue_size=settings.pipeline_queue_size,
+            metrics=run.stage_metrics
+        )
+        await pipeline.run(page, MAX_PAGES)
+        
+        saturated = state['saturated']
+        return CrawlOutcome(
+            reached_last_page=state['reached_last_page'] and not saturated,
+            # Results continue past the last page AutoScout24 serves
+            pages_capped=state['has_more_pages'] and not saturated and state['last_page'] >= MAX_PAGES,
+            saturated=saturated
+        )
+
+    async def _crawl_shards(self, run: CrawlRun, shard: Shard) -> bool:
+        """Crawl a saturated shard as sub-ranges, splitting further while they saturate.
+        
+        Sub-ranges are crawled in parallel, up to shard_concurrency at a time.
+        Returns True if every listing of the shard was paged through.
+        """
+        async def crawl(part: Shard) -> bool:
+            splittable = split_shard(part) is not None
+            async with run.shard_semaphore:
+                run.shards += 1
+                outcome = await self._crawl_pages(
+                    run, self._build_search_url(run.search, part),
+                    keep_cursor=False, stop_when_saturated=splittable
+                )
+            if outcome.saturated or outcome.pages_capped:
+                if splittable:
+                    return await self._crawl_shards(run, part)
+                logger.warning(f"Shard {part} of search {run.search.name} cannot be split further, "
+                               f"results past page {MAX_PAGES} are missed")
+            return outcome.reached_last_page
+        
+        return all(await asyncio.gather(*(crawl(part) for part in split_shard(shard))))
+
+    async def reparse_run(self, log_id: int) -> Dict[str, Any]:
+        """Re-run extraction over a run's page archive, without network.
+        
+        Fields the stored cars are missing are backfilled; nothing about
+        their availability or price changes.
+        """
+        log_entry = self.db.query(ScrapingLog).filter(ScrapingLog.id == log_id).first()
+        if not log_entry:
+            raise ValueError(f"Scraping log with ID {log_id} not found")
+        
+        archive = PageArchive(log_id)
+        if not archive.exists():
+            raise ValueError(f"No page archive for scraping log {log_id}")
+        
+        started_at = datetime.now()
+        writer = ListingWriter(self.db)
+        totals = {'cars_found': 0, 'cars_updated': 0}
+        pages_parsed = 0
+        seen_pages = set()
+        
+        # Parse a batch of pages in parallel, then persist it in page order
+        batch_size = max(1, settings.parser_workers) * 2
+        batch: List[Tuple[bytes, Optional[int]]] = []
+        pages = archive.iter_pages()
+        while True:
+            entry_body = next(pages, None)
+            if entry_body is not None:
+                entry, body = entry_body
+                # The same body may be indexed twice (e.g. a 304 replay)
+                if entry['sha256'] not in seen_pages:
+                    seen_pages.add(entry['sha256'])
+                    batch.append((body, entry.get('page')))
+                if len(batch) < batch_size:
+                    continue
+            if not batch:
+                break
+            
+            parsed_pages = await asyncio.gather(*(self._parse_page(body, page) for body, page in batch))
+            for parsed in parsed_pages:
+                counts = writer.backfill(parsed['listings'])
+                for key in totals:
+                    totals[key] += counts[key]
+                pages_parsed += 1
+            batch = []
+        
+        result = {
+            'status': 'success',
+            'source_log_id': log_id,
+            'pages_parsed': pages_parsed,
+            **totals,
+            'duration_seconds': (datetime.now() - started_at).total_seconds()
+        }
+        logger.info(f"Reparse of scraping log {log_id} completed: {result}")
+        return result
+
+    async def _sweep_unseen(self, search_id: int, seen_external_ids: Set[str]) -> int:
+        """Delist the search's cars a complete run did not see.
+        
+        With liveness checks on, only cars whose detail page is confirmed
+        gone are delisted; listings that merely dropped out of the results
+        (or could not be checked this run) stay available.
+        """
+        writer = ListingWriter(self.db)
+        if not settings.liveness_check_enabled:
+            return writer.sweep_unseen(search_id, seen_external_ids)
+        
+        verified_before = datetime.now() - timedelta(hours=settings.liveness_verdict_ttl_hours)
+        candidates = writer.unseen_cars(search_id, seen_external_ids, verified_before, settings.liveness_max_checks)
+        if not candidates:
+            return 0
+        
+        verdicts = await LivenessVerifier(self.fetcher).verify(candidates)
+        writer.mark_verified([
+            candidate.car_id for candidate in candidates if verdicts[candidate.external_id] == ALIVE
+        ])
+        return writer.delist([
+            candidate.car_id for candidate in candidates if verdicts[candidate.external_id] == GONE
+        ])
+
+    def _route_listings(self, listings: List[Dict[str, Any]], search_id: int,
+                        member_params: List[Tuple[Search, Dict[str, Any]]], routed: Dict[int, int]) -> None:
+        """Record a page's listings under the crawled search and each member they match"""
+        routes = {search_id: [listing['external_id'] for listing in listings]}
+        for member, params in member_params:
+            matching = [listing['external_id'] for listing in listings if listing_matches(params, listing)]
+            routes[member.id] = matching
+            routed[member.id] += len(matching)
+        try:
+            ListingWriter(self.db).add_to_searches(routes)
+        except Exception as e:
+            logger.error(f"Error routing listings to member searches: {e}")
+
+    def _find_resumable_run(self, search: Search, exclude_id: Optional[int] = None) -> Optional[ScrapingLog]:
+        """The search's latest run if it stopped part-way recently, else None"""
+        if not settings.resume_interrupted_runs:
+            return None
+        query = self.db.query(ScrapingLog).filter(
+            ScrapingLog.search_id == search.id,
+            ScrapingLog.status != 'queued'
+        )
+        if exclude_id is not None:
+            query = query.filter(ScrapingLog.id != exclude_id)
+        latest = query.order_by(ScrapingLog.started_at.desc(), ScrapingLog.id.desc()).first()
+        if latest is None or latest.status == 'success' or not latest.last_page:
+            return None
+        
+        age = datetime.now() - latest.started_at.replace(tzinfo=None)
+        if age > timedelta(hours=settings.resume_window_hours):
+            return None
+        # A run still marked running may be alive on another worker
+        if latest.status == 'running' and age < timedelta(minutes=settings.search_timeout_minutes):
+            return None
+        return latest
+
+    def _seen_since(self, search_ids: List[int], resumed: ScrapingLog) -> Set[str]:
+        """Listings of the crawled searches the interrupted run (and any run it resumed) already saw"""
+        origin = resumed
+        while origin.resumed_from_id is not None:
+            previous = self.db.query(ScrapingLog).filter(ScrapingLog.id == origin.resumed_from_id).first()
+            if previous is None:
+                break
+            origin = previous
+        rows = self.db.execute(
+            select(Car.external_id).where(
+                or_(*(Car.in_search(search_id) for search_id in search_ids)),
+                Car.last_seen >= origin.started_at
+            )
+        )
+        return set(rows.scalars())
+
+    def _save_progress(self, run: CrawlRun, page_no: Optional[int], last_external_id: Optional[str]) -> None:
+        """Persist the run's running totals once a page's listings are committed.
+        
+        With page_no, the resume cursor moves to that page too.
+        """
+        log_entry = run.log_entry
+        if page_no is not None:
+            log_entry.last_page = page_no
+            log_entry.last_external_id = last_external_id
+        log_entry.pages_scraped = run.pages_scraped
+        log_entry.cars_found = run.cars_found
+        log_entry.cars_new = run.cars_new
+        log_entry.cars_updated = run.cars_updated
+        log_entry.stage_metrics = self._stage_report(run)
+        self.db.commit()
+
+    def _save_page_profiles(self, run: CrawlRun) -> None:
+        """Store the run's per-page timings and sizes, for its profile"""
+        self.db.add_all([
+            ScrapePageMetric(scraping_log_id=run.log_entry.id, **profile)
+            for profile in run.page_profiles.values()
+        ])
+
+    @staticmethod
+    def _stage_report(run: CrawlRun) -> Dict[str, Dict[str, Any]]:
+        return {name: metrics.as_dict() for name, metrics in run.stage_metrics.items()}
+
+    @staticmethod
+    def _page_count(total_results: Optional[int], per_page: int) -> Optional[int]:
+        """Result pages page 1's count implies, capped at MAX_PAGES; None if unknown"""
+        if total_results is None or per_page <= 0:
+            return None
+        return min(-(-total_results // per_page), MAX_PAGES)
+
+    @staticmethod
+    def _saturated(total_results: Optional[int], per_page: int) -> bool:
+        """True if page 1's result count is more than MAX_PAGES can show"""
+        return total_results is not None and per_page > 0 and total_results > MAX_PAGES * per_page
+
+    def _at_known_frontier(self, crawl_mode: str, known_pages_streak: int, page_no: int) -> bool:
+        """True when an incremental crawl has reached listings it already has"""
+        if crawl_mode != CRAWL_INCREMENTAL or known_pages_streak < settings.incremental_stop_after_pages:
+            return False
+        logger.info(f"Reached known listings frontier at page {page_no}, stopping incremental crawl")
+        return True
+
+    def _page_url(self, search_url: str, page: int) -> str:
+        """URL of a given result page"""
+        return f"{search_url}&page={page}"
+
+    async def _fetch_page(self, search_url: str, page: int) -> FetchResponse:
+        """Fetch a single result page"""
+        page_url = self._page_url(search_url, page)
+        logger.info(f"Scraping page {page}: {page_url}")
+        return await self._make_request(page_url)
+
+    async def _parse_response(self, response: FetchResponse, page: int) -> Optional[Dict[str, Any]]:
+        """Parse a fetched result page unless the cache says it is unchanged"""
+        if response.status_code == 200 or (response.not_modified and not response.cache_meta):
+            return await self._parse_page(response.content, page)
+        return None
+
+    async def _parse_page(self, content: bytes, page: Optional[int] = None) -> Dict[str, Any]:
+        """Parse a result page in the process pool, or inline when it is disabled"""
+        pool = get_parse_pool()
+        if pool is None:
+            return self.parser.parse(content, page)
+        return await pool.parse(content, self.base_url, page)
+
+    async def _make_request(self, url: str, retries: Optional[int] = None) -> FetchResponse:
+        """Make HTTP request with retries and jittered exponential backoff"""
+        retries = retries or settings.max_retries
+        for attempt in range(retries):
+            try:
+                # User-Agent is rotated by the fetcher on each request
+                response = await self.fetcher.get(url)
                 
-                if response.status_code == 200:
+                if response.status_code == 200 or response.not_modified:
+                    response.attempts = attempt + 1
                     return response
-                elif response.status_code == 429:
-                    # Rate limited, wait longer
-                    wait_time = (attempt + 1) * 5
-                    logger.warning(f"Rate limited, waiting {wait_time} seconds")
-                    time.sleep(wait_time)
+                elif response.status_code == 429 or response.status_code >= 500:
+                    # The host limiter has already cut its rate and will hold
+                    # requests for any Retry-After; back off before retrying
+                    wait_time = with_jitter(2 ** attempt)
+                    logger.warning(
+                        f"HTTP {response.status_code} for {url}, retrying in {wait_time:.1f}s "
+                        f"(rate now {host_rate(url):.2f} req/s)"
+                    )
+                    await asyncio.sleep(wait_time)
                 else:
                     logger.warning(f"Request failed with status {response.status_code}")
                     
             except Exception as e:
                 logger.warning(f"Request attempt {attempt + 1} failed: {e}")
                 if attempt < retries - 1:
-                    time.sleep((attempt + 1) * 2)
+                    await asyncio.sleep(with_jitter(2 ** attempt))
         
         raise Exception(f"Failed to fetch {url} after {retries} attempts")
 
-    def _extract_car_listings(self, soup: BeautifulSoup) -> List[Dict[str, Any]]:
-        """Extract car listings from page HTML"""
-        listings = []
-        
-        # AutoScout24 uses various selectors, try multiple approaches
-        car_containers = soup.find_all('div', {'data-item-name': 'result-item'}) or \
-                        soup.find_all('article', class_=re.compile(r'.*listing.*')) or \
-                        soup.find_all('div', class_=re.compile(r'.*result.*item.*'))
-        
-        if not car_containers:
-            # Fallback: look for any div with car-related data attributes
-            car_containers = soup.find_all('div', attrs={'data-id': True}) or \
-                           soup.find_all('a', href=re.compile(r'/auto/'))
-        
-        logger.info(f"Found {len(car_containers)} potential car containers")
-        
-        for container in car_containers:
+    def _process_listings(self, car_listings: List[Dict[str, Any]], search_id: int,
+                          known_index: Optional[KnownListingIndex] = None) -> Dict[str, int]:
+        """Save a page of listings and return new/updated/unchanged counts"""
+        if self.writer is not None:
             try:
-                listing_data = self._extract_listing_data(container)
-                if listing_data and listing_data.get('external_id'):
-                    listings.append(listing_data)
+                return self.writer.write_page(car_listings, search_id, known_index)
             except Exception as e:
-                logger.warning(f"Error extracting listing data: {e}")
-                continue
-        
-        logger.info(f"Successfully extracted {len(listings)} car listings")
-        return listings
-
-    def _extract_listing_data(self, container) -> Optional[Dict[str, Any]]:
-        """Extract data from a single car listing container"""
-        data = {}
-        
-        # Extract external ID from various possible locations
-        external_id = container.get('data-id') or \
-                     container.get('data-item-id') or \
-                     container.get('id')
+                logger.error(f"Bulk upsert failed, saving listings one by one: {e}")
         
-        if not external_id:
-            # Try to extract from URL
-            link = container.find('a', href=re.compile(r'/auto/'))
-            if link:
-                href = link.get('href', '')
-                id_match = re.search(r'/auto/[^/]+/([^/]+)', href)
-                if id_match:
-                    external_id = id_match.group(1)
-        
-        if not external_id:
-            return None
-        
-        data['external_id'] = external_id
-        
-        # Extract URL
-        link = container.find('a', href=re.compile(r'/auto/'))
-        if link:
-            href = link.get('href', '')
-            if href.startswith('/'):
-                data['url'] = self.base_url + href
-            else:
-                data['url'] = href
-        else:
-            data['url'] = f"{self.base_url}/auto/{external_id}"
-        
-        # Extract basic information using various selectors
-        data.update(self._extract_car_details(container))
-        
-        return data
-
-    def _extract_car_details(self, container) -> Dict[str, Any]:
-        """Extract car details from container using multiple selector strategies"""
-        details = {}
-        
-        # Try to extract title which usually contains brand and model
-        title_selectors = [
-            'h2', 'h3', '.title', '.listing-title', 
-            '[data-testid="ad-title"]', '.cldt-summary-title'
-        ]
-        
-        title_text = ""
-        for selector in title_selectors:
-            title_elem = container.select_one(selector)
-            if title_elem:
-                title_text = title_elem.get_text(strip=True)
-                break
-        
-        if title_text:
-            # Parse brand and model from title
-            brand_model = self._parse_brand_model(title_text)
-            details.update(brand_model)
-            details['variant'] = title_text
-        
-        # Extract price
-        price_selectors = [
-            '.price', '.listing-price', '[data-testid="price"]',
-            '.cldt-price', '.price-block'
-        ]
-        
-        for selector in price_selectors:
-            price_elem = container.select_one(selector)
-            if price_elem:
-                price_text = price_elem.get_text(strip=True)
-                price = self._parse_price(price_text)
-                if price:
-                    details['price'] = price
-                    break
-        
-        # Extract specifications (year, mileage, fuel, etc.)
-        spec_text = container.get_text()
-        details.update(self._parse_specifications(spec_text))
-        
-        return details
-
-    def _parse_brand_model(self, title: str) -> Dict[str, str]:
-        """Parse brand and model from title"""
-        # Common Italian car brands
-        brands = [
-            'ALFA ROMEO', 'AUDI', 'BMW', 'FIAT', 'FORD', 'MERCEDES', 'MERCEDES-BENZ',
-            'NISSAN', 'OPEL', 'PEUGEOT', 'RENAULT', 'TOYOTA', 'VOLKSWAGEN', 'VOLVO',
-            'CITROEN', 'HYUNDAI', 'KIA', 'MAZDA', 'MITSUBISHI', 'SEAT', 'SKODA',
-            'SUZUKI', 'HONDA', 'JEEP', 'LAND ROVER', 'JAGUAR', 'MINI', 'SMART',
-            'LANCIA', 'DACIA', 'TESLA'
-        ]
-        
-        title_upper = title.upper()
-        
-        for brand in brands:
-            if brand in title_upper:
-                # Extract model (everything after brand)
-                brand_index = title_upper.find(brand)
-                model_part = title[brand_index + len(brand):].strip()
-                model = model_part.split()[0] if model_part else ""
-                
-                return {
-                    'brand': brand.title(),
-                    'model': model
-                }
-        
-        # Fallback: use first word as brand, second as model
-        words = title.split()
-        return {
-            'brand': words[0] if words else "",
-            'model': words[1] if len(words) > 1 else ""
-        }
-
-    def _parse_price(self, price_text: str) -> Optional[float]:
-        """Parse price from text"""
-        # Remove currency symbols and spaces
-        price_clean = re.sub(r'[€$£\s]', '', price_text)
-        # Extract numbers
-        price_match = re.search(r'(\d+(?:\.\d+)*)', price_clean.replace(',', ''))
-        
-        if price_match:
+        counts = {'cars_found': 0, 'cars_new': 0, 'cars_updated': 0, 'cars_unchanged': 0}
+        for listing_data in car_listings:
             try:
-                return float(price_match.group(1))
-            except ValueError:
-                pass
-        
-        return None
-
-    def _parse_specifications(self, text: str) -> Dict[str, Any]:
-        """Parse specifications from text"""
-        specs = {}
-        
-        # Year
-        year_match = re.search(r'\b(19|20)\d{2}\b', text)
-        if year_match:
-            specs['year'] = int(year_match.group())
-        
-        # Mileage
-        km_match = re.search(r'(\d+(?:\.\d+)*)\s*(?:km|KM)', text.replace(',', ''))
-        if km_match:
-            specs['mileage'] = int(float(km_match.group(1)))
-        
-        # Fuel type
-        fuel_types = ['benzina', 'diesel', 'gpl', 'metano', 'elettrica', 'ibrida']
-        for fuel in fuel_types:
-            if fuel.lower() in text.lower():
-                specs['fuel_type'] = fuel.title()
-                break
-        
-        # Power
-        cv_match = re.search(r'(\d+)\s*(?:cv|CV|hp|HP)', text)
-        if cv_match:
-            specs['power_cv'] = int(cv_match.group(1))
-        
-        kw_match = re.search(r'(\d+)\s*(?:kw|KW)', text)
-        if kw_match:
-            specs['power_kw'] = int(kw_match.group(1))
-        
-        # Transmission
-        if any(word in text.lower() for word in ['automatico', 'automatic']):
-            specs['transmission'] = 'Automatico'
-        elif any(word in text.lower() for word in ['manuale', 'manual']):
-            specs['transmission'] = 'Manuale'
-        
-        return specs
+                car_result = self._process_car_listing(listing_data, search_id)
+                if car_result['is_new']:
+                    counts['cars_new'] += 1
+                else:
+                    counts['cars_updated'] += 1
+                counts['cars_found'] += 1
+            except Exception as e:
+                logger.error(f"Error processing car listing: {e}")
+                continue
+        return counts
 
-    def _has_next_page(self, soup: BeautifulSoup) -> bool:
-        """Check if there's a next page"""
-        next_buttons = soup.find_all('a', {'aria-label': 'Next page'}) or \
-                      soup.find_all('a', string=re.compile(r'Successiv|Next|>')) or \
-                      soup.select('.pagination .next:not(.disabled)')
-        
-        return len(next_buttons) > 0
+    def _touch_listings(self, external_ids: List[str], known_index: KnownListingIndex) -> None:
+        """Bump last_seen for listings known to be unchanged, without rewriting them"""
+        car_ids = [known.car_id for known in map(known_index.get, external_ids) if known is not None]
+        try:
+            ListingWriter(self.db).touch(car_ids)
+        except Exception as e:
+            logger.error(f"Error updating last_seen for unchanged listings: {e}")
 
     def _process_car_listing(self, listing_data: Dict[str, Any], search_id: int) -> Dict[str, Any]:
         """Process and save a car listing"""
@@ -450,8 +791,12 @@ class AutoScout24Scraper:
             power_cv=listing_data.get('power_cv'),
             power_kw=listing_data.get('power_kw'),
             transmission=listing_data.get('transmission'),
+            province=listing_data.get('province'),
+            region=listing_data.get('region'),
+            seller_type=listing_data.get('seller_type'),
             search_id=search_id,
-            raw_data=listing_data
+            raw_data=listing_data,
+            content_hash=listing_content_hash(listing_data)
         )
         
         self.db.add(car)
@@ -472,6 +817,15 @@ class AutoScout24Scraper:
 
     def _update_car(self, car: Car, listing_data: Dict[str, Any]) -> Car:
         """Update existing car record"""
+        content_hash = listing_content_hash(listing_data)
+        if car.content_hash == content_hash:
+            # Nothing changed: only record that the car is still listed
+            car.last_seen = datetime.now()
+            car.is_available = True
+            car.delisted_at = None
+            self.db.commit()
+            return car
+        
         old_price = car.price
         new_price = listing_data.get('price', car.price)
         
@@ -482,6 +836,9 @@ class AutoScout24Scraper:
         car.price = new_price
         car.last_seen = datetime.now()
         car.raw_data = listing_data
+        car.content_hash = content_hash
+        car.is_available = True
+        car.delisted_at = None
         
         # Add price history entry if price changed
         if old_price != new_price:
@@ -0,0 +1,123 @@
+import logging
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from app.models.models import Search
+
+logger = logging.getLogger(__name__)
+
+# Exact-match filters: AutoScout24 query parameter -> (Search column, listing field).
+# The listing field is None unless both parser paths (JSON and DOM) reliably
+# set it: the DOM path keeps only the first word of the model and has no
+# province, so those filters cannot be checked on scraped listings either.
+EXACT_FILTERS = {
+    'make': ('brand', 'brand'),
+    'model': ('model', None),
+    'fuel': ('fuel_type', 'fuel_type'),
+    'transmission': ('transmission', 'transmission'),
+    'body': ('body_type', None),
+    'color': ('color', None),
+    'region': ('province', None),
+}
+
+# Range filters: parameter -> (Search column, listing field, is lower bound)
+RANGE_FILTERS = {
+    'yearfrom': ('year_min', 'year', True),
+    'yearto': ('year_max', 'year', False),
+    'kmfrom': ('mileage_min', 'mileage', True),
+    'kmto': ('mileage_max', 'mileage', False),
+    'pricefrom': ('price_min', 'price', True),
+    'priceto': ('price_max', 'price', False),
+    'powerfrom': ('power_min', 'power_cv', True),
+    'powerto': ('power_max', 'power_cv', False),
+}
+
+def search_params(search: Search) -> Dict[str, Any]:
+    """AutoScout24 filter parameters for a saved search, unset filters omitted"""
+    params = {}
+    for param, (column, _) in EXACT_FILTERS.items():
+        value = getattr(search, column)
+        if value:
+            params[param] = value
+    for param, (column, _, _) in RANGE_FILTERS.items():
+        value = getattr(search, column)
+        if value:
+            params[param] = int(value)
+    return params
+
+def canonical_params(search: Search) -> Dict[str, Any]:
+    """search_params normalised for comparison (trimmed, case-folded)"""
+    return {
+        param: value.strip().casefold() if isinstance(value, str) else value
+        for param, value in search_params(search).items()
+    }
+
+def _locally_checkable(params: Dict[str, Any]) -> bool:
+    return all(EXACT_FILTERS[param][1] is not None for param in params if param in EXACT_FILTERS)
+
+def covers(broad: Dict[str, Any], narrow: Dict[str, Any]) -> bool:
+    """True if every result of the narrow search is also a result of the broad one,
+    and the narrow search's extra filters can be checked on scraped listings."""
+    for param, value in broad.items():
+        if param not in narrow:
+            return False
+        if param in RANGE_FILTERS:
+            lower = RANGE_FILTERS[param][2]
+            if (narrow[param] < value) if lower else (narrow[param] > value):
+                return False
+        elif narrow[param] != value:
+            return False
+    return _locally_checkable({param: value for param, value in narrow.items() if param not in broad})
+
+def residual_params(broad: Dict[str, Any], narrow: Dict[str, Any]) -> Dict[str, Any]:
+    """The narrow search's filters that the broad search's results do not already satisfy"""
+    return {param: value for param, value in narrow.items() if broad.get(param) != value}
+
+def listing_matches(params: Dict[str, Any], listing: Dict[str, Any]) -> bool:
+    """Evaluate canonical search parameters against a scraped listing.
+
+    A listing missing a filtered field does not match, since the filter
+    cannot be confirmed. Pass residual_params of a covered search, so
+    filters the crawl itself applied are not checked again.
+    """
+    for param, expected in params.items():
+        if param in EXACT_FILTERS:
+            field = EXACT_FILTERS[param][1]
+            value = listing.get(field) if field is not None else None
+            if not isinstance(value, str) or value.strip().casefold() != expected:
+                return False
+        else:
+            _, field, lower = RANGE_FILTERS[param]
+            value = listing.get(field)
+            if value is None or (value < expected if lower else value > expected):
+                return False
+    return True
+
+class CrawlGroup(NamedTuple):
+    """One crawl of the root search, whose results also feed the members"""
+    root: Search
+    members: List[Search]
+
+def plan_crawls(searches: List[Search]) -> List[CrawlGroup]:
+    """Group searches so each broad search is fetched once for all searches it covers.
+
+    Broadest searches (fewest filters) become roots; a search covered by an
+    existing root joins its group instead of being crawled on its own.
+    """
+    roots: List[CrawlGroup] = []
+    root_params: List[Dict[str, Any]] = []
+    for search in sorted(searches, key=lambda s: (len(search_params(s)), s.id or 0)):
+        params = canonical_params(search)
+        group: Optional[CrawlGroup] = next(
+            (group for group, broad in zip(roots, root_params) if covers(broad, params)),
+            None
+        )
+        if group is not None:
+            group.members.append(search)
+        else:
+            roots.append(CrawlGroup(search, []))
+            root_params.append(params)
+
+    merged = sum(len(group.members) for group in roots)
+    if merged:
+        logger.info(f"Crawl plan: {len(roots)} crawls cover {len(searches)} searches")
+    return roots
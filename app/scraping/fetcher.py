@@ -0,0 +1,152 @@
+import aiohttp
+import asyncio
+import logging
+import time
+from fake_useragent import UserAgent
+from multidict import CIMultiDict
+from typing import Any, Dict, Mapping, Optional
+
+from app.core.config import settings
+from app.scraping.http_cache import HttpCache
+from app.scraping.proxy_pool import ProxyPool
+from app.scraping.rate_limiter import get_rate_limiter, parse_retry_after
+
+logger = logging.getLogger(__name__)
+
+class FetchResponse:
+    """Fully-read HTTP response returned by AsyncFetcher"""
+
+    def __init__(self, url: str, status_code: int, headers: Mapping[str, str], content: bytes,
+                 cache_meta: Optional[Dict[str, Any]] = None):
+        self.url = url
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+        # Body length as received; content may later be the cached copy of a 304
+        self.wire_bytes = len(content or b'')
+        # Annotations stored with the cached copy, set on 304 responses
+        self.cache_meta = cache_meta
+        # Requests it took to get this response, set by callers that retry
+        self.attempts = 1
+
+    @property
+    def not_modified(self) -> bool:
+        """True when the server confirmed our cached copy is current"""
+        return self.status_code == 304
+
+    @property
+    def text(self) -> str:
+        return self.content.decode('utf-8', errors='replace')
+
+class AsyncFetcher:
+    """Non-blocking HTTP client with a pooled connector, optional HTTP cache
+    and optional proxy pool"""
+
+    def __init__(self, pool_size: Optional[int] = None, timeout: Optional[float] = None,
+                 cache: Optional[HttpCache] = None, proxies: Optional[ProxyPool] = None):
+        self.ua = UserAgent()
+        self.pool_size = pool_size or settings.http_pool_size
+        self.timeout = timeout or settings.request_timeout
+        self.cache = cache
+        self.proxies = proxies
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    def _default_headers(self) -> Dict[str, str]:
+        """Default browser-like headers sent with every request"""
+        return {
+            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+            'Accept-Language': 'it-IT,it;q=0.8,en-US;q=0.5,en;q=0.3',
+            'Accept-Encoding': 'gzip, deflate',
+            'DNT': '1',
+            'Upgrade-Insecure-Requests': '1',
+        }
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Create the client session lazily so it binds to the running loop"""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.pool_size, ttl_dns_cache=300)
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                headers=self._default_headers(),
+                timeout=aiohttp.ClientTimeout(total=self.timeout)
+            )
+        return self._session
+
+    async def get(self, url: str, headers: Optional[Dict[str, str]] = None) -> FetchResponse:
+        """GET a URL within the host's shared politeness budget.
+
+        With a cache, the request is made conditional on the cached
+        validators; a 304 comes back with the cached body and annotations.
+        """
+        cached = None
+        if self.cache is not None:
+            cached = await asyncio.to_thread(self.cache.get, url)
+            if cached is not None:
+                headers = {**cached.conditional_headers(), **(headers or {})}
+
+        response = await self._limited('GET', url, headers)
+
+        if self.cache is not None:
+            if response.not_modified and cached is not None:
+                response.content = cached.body
+                response.cache_meta = cached.meta
+            elif response.status_code == 200:
+                await asyncio.to_thread(self.cache.store, url, response.headers, response.content)
+        return response
+
+    async def head(self, url: str, headers: Optional[Dict[str, str]] = None) -> FetchResponse:
+        """HEAD a URL within the host's politeness budget, without following redirects"""
+        return await self._limited('HEAD', url, headers, allow_redirects=False)
+
+    async def _limited(self, method: str, url: str, headers: Optional[Dict[str, str]] = None,
+                       **kwargs: Any) -> FetchResponse:
+        """Make a request in a rate limiter slot and feed back the outcome"""
+        proxy = self.proxies.choose() if self.proxies is not None else None
+        limiter = get_rate_limiter(url, proxy)
+        async with limiter.slot():
+            started = time.monotonic()
+            try:
+                response = await self._request(method, url, headers, proxy=proxy, **kwargs)
+            except Exception:
+                if proxy is not None:
+                    self.proxies.record(proxy)
+                raise
+        if proxy is not None:
+            self.proxies.record(proxy, time.monotonic() - started, response.status_code)
+
+        # Feed the host's adaptive rate controller
+        if response.status_code == 429 or response.status_code >= 500:
+            limiter.record_throttle(response.status_code, parse_retry_after(response.headers.get('Retry-After')))
+        elif response.status_code < 400:
+            limiter.record_success()
+        return response
+
+    async def _request(self, method: str, url: str, headers: Optional[Dict[str, str]] = None,
+                       **kwargs: Any) -> FetchResponse:
+        """Make a request and read the whole body without blocking the event loop"""
+        request_headers = {'User-Agent': self.ua.random}
+        if headers:
+            request_headers.update(headers)
+
+        session = self._get_session()
+        async with session.request(method, url, headers=request_headers, **kwargs) as response:
+            content = await response.read()
+            return FetchResponse(
+                url=str(response.url),
+                status_code=response.status,
+                # Keep case-insensitive lookup, servers vary header casing
+                headers=CIMultiDict(response.headers),
+                content=content
+            )
+
+    async def close(self) -> None:
+        """Close the underlying connection pool"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def __aenter__(self) -> "AsyncFetcher":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.close()
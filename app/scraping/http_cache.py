@@ -0,0 +1,101 @@
+import hashlib
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, Mapping, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+class CacheEntry:
+    """Validators, body and page annotations cached for one URL"""
+
+    def __init__(self, url: str, etag: Optional[str], last_modified: Optional[str],
+                 body: bytes, meta: Optional[Dict[str, Any]] = None):
+        self.url = url
+        self.etag = etag
+        self.last_modified = last_modified
+        self.body = body
+        self.meta = meta or {}
+
+    def conditional_headers(self) -> Dict[str, str]:
+        """Headers turning the next GET of this URL into a conditional request"""
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+class HttpCache:
+    """On-disk response cache keyed by URL.
+
+    Each entry is a JSON metadata file (validators plus annotations left by
+    the scraper, e.g. the external IDs found on the page) next to the raw
+    body. Only responses carrying an ETag or Last-Modified are stored.
+    Methods do blocking file IO; async callers should use asyncio.to_thread.
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None):
+        self.cache_dir = os.path.join(cache_dir or settings.cache_dir, 'http')
+
+    def _paths(self, url: str):
+        key = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        directory = os.path.join(self.cache_dir, key[:2])
+        return directory, os.path.join(directory, f"{key}.json"), os.path.join(directory, f"{key}.body")
+
+    def get(self, url: str) -> Optional[CacheEntry]:
+        """Load the cached entry for a URL, if any"""
+        _, meta_path, body_path = self._paths(url)
+        try:
+            with open(meta_path, 'r') as f:
+                record = json.load(f)
+            with open(body_path, 'rb') as f:
+                body = f.read()
+        except (OSError, ValueError):
+            return None
+        return CacheEntry(url, record.get('etag'), record.get('last_modified'), body, record.get('meta'))
+
+    def store(self, url: str, headers: Mapping[str, str], body: bytes) -> bool:
+        """Cache a 200 response if it carries validators"""
+        etag = headers.get('ETag')
+        last_modified = headers.get('Last-Modified')
+        if not etag and not last_modified:
+            return False
+
+        directory, meta_path, body_path = self._paths(url)
+        try:
+            os.makedirs(directory, exist_ok=True)
+            self._write(body_path, body)
+            self._write(meta_path, json.dumps({
+                'url': url,
+                'etag': etag,
+                'last_modified': last_modified,
+                'stored_at': time.time(),
+                'meta': {}
+            }).encode('utf-8'))
+        except OSError as e:
+            logger.warning(f"Could not cache {url}: {e}")
+            return False
+        return True
+
+    def annotate(self, url: str, **meta: Any) -> None:
+        """Attach derived page data so a later 304 can skip parsing"""
+        _, meta_path, _ = self._paths(url)
+        try:
+            with open(meta_path, 'r') as f:
+                record = json.load(f)
+            record.setdefault('meta', {}).update(meta)
+            self._write(meta_path, json.dumps(record).encode('utf-8'))
+        except (OSError, ValueError):
+            # Nothing cached for this URL (no validators), nothing to annotate
+            pass
+
+    def _write(self, path: str, data: bytes) -> None:
+        """Write atomically so readers never see a half-written entry"""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
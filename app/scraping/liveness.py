@@ -0,0 +1,64 @@
+import asyncio
+import logging
+from typing import Dict, Iterable, NamedTuple, Optional
+from urllib.parse import urljoin
+
+from app.scraping.fetcher import AsyncFetcher
+
+logger = logging.getLogger(__name__)
+
+ALIVE = 'alive'
+GONE = 'gone'
+UNKNOWN = 'unknown'
+
+class LivenessCandidate(NamedTuple):
+    car_id: int
+    external_id: str
+    url: str
+
+class LivenessVerifier:
+    """Confirms whether listings that dropped out of the results are really gone.
+
+    Each candidate's detail page gets a HEAD request (falling back to a GET
+    when HEAD is refused) through the shared fetcher, so the host's rate
+    limiter paces the checks. Anything ambiguous is reported as unknown
+    and the car is left alone.
+    """
+
+    def __init__(self, fetcher: AsyncFetcher):
+        self.fetcher = fetcher
+
+    async def verify(self, candidates: Iterable[LivenessCandidate]) -> Dict[str, str]:
+        """Check candidates concurrently; returns a verdict per external_id"""
+        candidates = list(candidates)
+        verdicts = await asyncio.gather(*(self._check(candidate) for candidate in candidates))
+        result = {candidate.external_id: verdict for candidate, verdict in zip(candidates, verdicts)}
+        logger.info(f"Verified {len(result)} unseen listings: "
+                    f"{sum(v == GONE for v in verdicts)} gone, {sum(v == ALIVE for v in verdicts)} alive, "
+                    f"{sum(v == UNKNOWN for v in verdicts)} unknown")
+        return result
+
+    async def _check(self, candidate: LivenessCandidate) -> str:
+        if not candidate.url:
+            return UNKNOWN
+        try:
+            response = await self.fetcher.head(candidate.url)
+            if response.status_code in (405, 501):
+                response = await self.fetcher.get(candidate.url)
+        except Exception as e:
+            logger.warning(f"Liveness check failed for {candidate.url}: {e}")
+            return UNKNOWN
+        return classify_response(candidate, response.status_code, response.headers.get('Location'))
+
+def classify_response(candidate: LivenessCandidate, status_code: int, location: Optional[str]) -> str:
+    """Map a detail-page response to a verdict"""
+    if 200 <= status_code < 300 or status_code == 304:
+        return ALIVE
+    if status_code in (404, 410):
+        return GONE
+    if 300 <= status_code < 400 and location:
+        # Sold listings redirect away from their detail page; a canonical
+        # redirect still carries the listing ID
+        target = urljoin(candidate.url, location)
+        return ALIVE if candidate.external_id in target else GONE
+    return UNKNOWN
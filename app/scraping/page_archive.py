@@ -0,0 +1,81 @@
+import gzip
+import hashlib
+import json
+import logging
+import os
+import threading
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+class PageArchive:
+    """Compressed, content-addressed archive of the raw pages of one run.
+
+    Layout under ARCHIVE_DIR/<scraping_log_id>/:
+      segment-00000.gz, ...  concatenated gzip members, one per distinct body
+      index.jsonl            one line per fetched page: url, page, sha256,
+                             segment, offset, length
+    Identical bodies are stored once and referenced by every index line.
+    """
+
+    INDEX_FILE = 'index.jsonl'
+
+    def __init__(self, log_id: int, archive_dir: Optional[str] = None):
+        self.log_id = log_id
+        self.path = os.path.join(archive_dir or settings.archive_dir, str(log_id))
+        self.segment_bytes = settings.archive_segment_bytes
+        self._locations: Dict[str, Tuple[str, int, int]] = {}
+        self._segment_no = 0
+        # Pages of concurrent shards are added from several threads
+        self._lock = threading.Lock()
+
+    def add(self, url: str, page: int, body: bytes) -> str:
+        """Archive a page body and return its sha256"""
+        sha = hashlib.sha256(body).hexdigest()
+        with self._lock:
+            location = self._locations.get(sha)
+            if location is None:
+                location = self._append(gzip.compress(body, compresslevel=6))
+                self._locations[sha] = location
+
+            segment, offset, length = location
+            with open(os.path.join(self.path, self.INDEX_FILE), 'a') as f:
+                f.write(json.dumps({
+                    'url': url,
+                    'page': page,
+                    'sha256': sha,
+                    'segment': segment,
+                    'offset': offset,
+                    'length': length
+                }) + '\n')
+        return sha
+
+    def _append(self, member: bytes) -> Tuple[str, int, int]:
+        """Append a gzip member to the current segment, rolling over when full"""
+        os.makedirs(self.path, exist_ok=True)
+        segment = f"segment-{self._segment_no:05d}.gz"
+        segment_path = os.path.join(self.path, segment)
+        if os.path.exists(segment_path) and os.path.getsize(segment_path) >= self.segment_bytes:
+            self._segment_no += 1
+            segment = f"segment-{self._segment_no:05d}.gz"
+            segment_path = os.path.join(self.path, segment)
+
+        with open(segment_path, 'ab') as f:
+            offset = f.tell()
+            f.write(member)
+        return segment, offset, len(member)
+
+    def exists(self) -> bool:
+        return os.path.exists(os.path.join(self.path, self.INDEX_FILE))
+
+    def iter_pages(self) -> Iterator[Tuple[Dict[str, Any], bytes]]:
+        """Yield (index entry, body) for each archived page in fetch order"""
+        with open(os.path.join(self.path, self.INDEX_FILE), 'r') as index:
+            for line in index:
+                entry = json.loads(line)
+                with open(os.path.join(self.path, entry['segment']), 'rb') as f:
+                    f.seek(entry['offset'])
+                    body = gzip.decompress(f.read(entry['length']))
+                yield entry, body
@@ -0,0 +1,56 @@
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Optional
+
+from app.core.config import settings
+from app.scraping.parser import ListingParser
+
+logger = logging.getLogger(__name__)
+
+# One parser per worker process, so each worker keeps its own selector plan
+_worker_parser: Optional[ListingParser] = None
+
+def _parse_in_worker(content: bytes, base_url: str, page: Optional[int]) -> Dict[str, Any]:
+    global _worker_parser
+    if _worker_parser is None or _worker_parser.base_url != base_url:
+        _worker_parser = ListingParser(base_url)
+    return _worker_parser.parse(content, page)
+
+class ParsePool:
+    """Parses raw page bytes in worker processes, off the event loop and the GIL"""
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        # spawn rather than fork: the parent runs an event loop and threads
+        self._executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context('spawn')
+        )
+        logger.info(f"Started parse pool with {workers} workers")
+
+    async def parse(self, content: bytes, base_url: str, page: Optional[int] = None) -> Dict[str, Any]:
+        """Parse a page in a worker; returns plain listing dicts"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, _parse_in_worker, content, base_url, page)
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+_pool: Optional[ParsePool] = None
+
+def get_parse_pool() -> Optional[ParsePool]:
+    """Process-wide parse pool, or None when parsing runs inline (PARSER_WORKERS=0)"""
+    global _pool
+    if settings.parser_workers <= 0:
+        return None
+    if _pool is None:
+        _pool = ParsePool(settings.parser_workers)
+    return _pool
+
+def shutdown_parse_pool() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown()
+        _pool = None
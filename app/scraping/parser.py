@@ -0,0 +1,444 @@
+import json
+import logging
+import re
+from typing import Any, Dict, List, Optional
+
+from lxml import etree, html
+
+logger = logging.getLogger(__name__)
+
+EXSLT_NS = {'re': 'http://exslt.org/regular-expressions'}
+
+def _has_class(name: str) -> str:
+    """XPath predicate matching a whole class token"""
+    return f'contains(concat(" ", normalize-space(@class), " "), " {name} ")'
+
+# Strategies are tried in order; the first one that matches is remembered
+CONTAINER_STRATEGIES = [
+    ('result-item', '//div[@data-item-name="result-item"]'),
+    ('article-listing', '//article[contains(@class, "listing")]'),
+    ('div-result-item', '//div[contains(@class, "result") and contains(@class, "item")]'),
+    ('data-id', '//div[@data-id]'),
+    ('auto-link', '//a[contains(@href, "/auto/")]'),
+]
+
+TITLE_STRATEGIES = [
+    ('h2', './/h2'),
+    ('h3', './/h3'),
+    ('.title', f'.//*[{_has_class("title")}]'),
+    ('.listing-title', f'.//*[{_has_class("listing-title")}]'),
+    ('ad-title', './/*[@data-testid="ad-title"]'),
+    ('.cldt-summary-title', f'.//*[{_has_class("cldt-summary-title")}]'),
+]
+
+PRICE_STRATEGIES = [
+    ('.price', f'.//*[{_has_class("price")}]'),
+    ('.listing-price', f'.//*[{_has_class("listing-price")}]'),
+    ('price-testid', './/*[@data-testid="price"]'),
+    ('.cldt-price', f'.//*[{_has_class("cldt-price")}]'),
+    ('.price-block', f'.//*[{_has_class("price-block")}]'),
+]
+
+NEXT_PAGE_XPATH = etree.XPath(
+    '//a[@aria-label="Next page"]'
+    ' | //a[re:test(normalize-space(.), "Successiv|Next|>")]'
+    f' | //*[{_has_class("pagination")}]//*[{_has_class("next")} and not({_has_class("disabled")})]',
+    namespaces=EXSLT_NS
+)
+AUTO_LINK_XPATH = etree.XPath('.//a[contains(@href, "/auto/")]')
+# Headings that carry the result count, e.g. "1.234 risultati"
+RESULT_COUNT_XPATH = etree.XPath('//h1 | //*[@data-testid="results-count"]')
+
+def _compile(strategies):
+    return [(name, etree.XPath(path)) for name, path in strategies]
+
+_CONTAINERS = _compile(CONTAINER_STRATEGIES)
+_TITLES = _compile(TITLE_STRATEGIES)
+_PRICES = _compile(PRICE_STRATEGIES)
+
+BRANDS = [
+    'ALFA ROMEO', 'AUDI', 'BMW', 'FIAT', 'FORD', 'MERCEDES', 'MERCEDES-BENZ',
+    'NISSAN', 'OPEL', 'PEUGEOT', 'RENAULT', 'TOYOTA', 'VOLKSWAGEN', 'VOLVO',
+    'CITROEN', 'HYUNDAI', 'KIA', 'MAZDA', 'MITSUBISHI', 'SEAT', 'SKODA',
+    'SUZUKI', 'HONDA', 'JEEP', 'LAND ROVER', 'JAGUAR', 'MINI', 'SMART',
+    'LANCIA', 'DACIA', 'TESLA'
+]
+
+AUTO_ID_RE = re.compile(r'/auto/[^/]+/([^/?#]+)')
+# Italian formatting groups thousands with '.', e.g. "€ 12.300,-" or "120.000 km"
+NUMBER_RE = r"\d{1,3}(?:[.,]\d{3})+|\d+"
+PRICE_RE = re.compile(rf'({NUMBER_RE})')
+MILEAGE_RE = re.compile(rf'({NUMBER_RE})\s*km\b', re.IGNORECASE)
+REGISTRATION_RE = re.compile(r'\b\d{2}/((?:19|20)\d{2})\b')
+YEAR_RE = re.compile(r'\b(?:19|20)\d{2}\b')
+RESULT_COUNT_RE = re.compile(rf'({NUMBER_RE})\s+(?:risultati|annunci|offerte)\b', re.IGNORECASE)
+CV_RE = re.compile(r'(\d+)\s*(?:cv|hp)\b', re.IGNORECASE)
+KW_RE = re.compile(r'(\d+)\s*kw\b', re.IGNORECASE)
+FUEL_TYPES = ['benzina', 'diesel', 'gpl', 'metano', 'elettrica', 'ibrida']
+
+def _to_int(number: str) -> int:
+    return int(re.sub(r'[.,\s]', '', number))
+
+def parse_brand_model(title: str) -> Dict[str, str]:
+    """Parse brand and model from title"""
+    title_upper = title.upper()
+
+    for brand in BRANDS:
+        if brand in title_upper:
+            # Extract model (everything after brand)
+            brand_index = title_upper.find(brand)
+            model_part = title[brand_index + len(brand):].strip()
+            model = model_part.split()[0] if model_part else ""
+
+            return {
+                'brand': brand.title(),
+                'model': model
+            }
+
+    # Fallback: use first word as brand, second as model
+    words = title.split()
+    return {
+        'brand': words[0] if words else "",
+        'model': words[1] if len(words) > 1 else ""
+    }
+
+def parse_price(price_text: str) -> Optional[float]:
+    """Parse price from text"""
+    price_match = PRICE_RE.search(price_text)
+    if price_match:
+        return float(_to_int(price_match.group(1)))
+    return None
+
+def parse_specifications(text: str) -> Dict[str, Any]:
+    """Parse specifications from text"""
+    specs = {}
+
+    # Year: prefer the registration date (MM/YYYY)
+    year_match = REGISTRATION_RE.search(text)
+    if year_match:
+        specs['year'] = int(year_match.group(1))
+    else:
+        year_match = YEAR_RE.search(text)
+        if year_match:
+            specs['year'] = int(year_match.group())
+
+    # Mileage
+    km_match = MILEAGE_RE.search(text)
+    if km_match:
+        specs['mileage'] = _to_int(km_match.group(1))
+
+    # Fuel type
+    text_lower = text.lower()
+    for fuel in FUEL_TYPES:
+        if fuel in text_lower:
+            specs['fuel_type'] = fuel.title()
+            break
+
+    # Power
+    cv_match = CV_RE.search(text)
+    if cv_match:
+        specs['power_cv'] = int(cv_match.group(1))
+
+    kw_match = KW_RE.search(text)
+    if kw_match:
+        specs['power_kw'] = int(kw_match.group(1))
+
+    # Transmission
+    if any(word in text_lower for word in ['automatico', 'automatic']):
+        specs['transmission'] = 'Automatico'
+    elif any(word in text_lower for word in ['manuale', 'manual']):
+        specs['transmission'] = 'Manuale'
+
+    return specs
+
+# Next.js pages embed their state as JSON; we locate it without building a DOM
+NEXT_DATA_RE = re.compile(rb'<script[^>]*\bid=["\']__NEXT_DATA__["\'][^>]*>')
+FIRST_REGISTRATION_RE = re.compile(r'((?:19|20)\d{2})')
+
+def extract_next_data(content: bytes) -> Optional[Dict[str, Any]]:
+    """Decode the __NEXT_DATA__ JSON blob of a page, if present"""
+    match = NEXT_DATA_RE.search(content)
+    if not match:
+        return None
+    end = content.find(b'</script>', match.end())
+    if end == -1:
+        return None
+    try:
+        data = json.loads(content[match.end():end])
+    except ValueError:
+        logger.warning("Malformed __NEXT_DATA__ blob, falling back to DOM parsing")
+        return None
+    return data if isinstance(data, dict) else None
+
+def _find_listing_array(node: Any, depth: int = 0) -> Optional[List[Dict[str, Any]]]:
+    """Locate the listings array: a list of dicts with an id and vehicle data"""
+    if depth > 8:
+        return None
+    if isinstance(node, list):
+        if node and all(isinstance(item, dict) and 'id' in item and 'vehicle' in item for item in node):
+            return node
+        children = node
+    elif isinstance(node, dict):
+        children = node.values()
+    else:
+        return None
+    for child in children:
+        found = _find_listing_array(child, depth + 1)
+        if found is not None:
+            return found
+    return None
+
+def _first_int(*values: Any) -> Optional[int]:
+    """First value that reads as an integer, tolerating "12.300" style strings"""
+    for value in values:
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            return int(value)
+        if isinstance(value, str):
+            match = PRICE_RE.search(value)
+            if match:
+                return _to_int(match.group(1))
+    return None
+
+def map_json_listing(item: Dict[str, Any], base_url: str) -> Optional[Dict[str, Any]]:
+    """Map one __NEXT_DATA__ listing onto the scraper's listing dict"""
+    external_id = item.get('id')
+    if not external_id:
+        return None
+
+    vehicle = item.get('vehicle') or {}
+    tracking = item.get('tracking') or {}
+    price = item.get('price') or {}
+    location = item.get('location') or {}
+    seller = item.get('seller') or {}
+
+    href = item.get('url') or f"/auto/{external_id}"
+    data = {
+        'external_id': str(external_id),
+        'url': base_url + href if href.startswith('/') else href,
+        'brand': vehicle.get('make') or '',
+        'model': vehicle.get('model') or '',
+    }
+
+    variant = ' '.join(part for part in (
+        vehicle.get('make'), vehicle.get('model'), vehicle.get('modelVersionInput')
+    ) if part)
+    if variant:
+        data['variant'] = variant
+
+    price_value = _first_int(tracking.get('price'), price.get('priceFormatted'))
+    if price_value is not None:
+        data['price'] = float(price_value)
+
+    mileage = _first_int(tracking.get('mileage'), vehicle.get('mileageInKm'))
+    if mileage is not None:
+        data['mileage'] = mileage
+
+    registration = tracking.get('firstRegistration') or vehicle.get('firstRegistration') or ''
+    year_match = FIRST_REGISTRATION_RE.search(str(registration))
+    if year_match:
+        data['year'] = int(year_match.group(1))
+
+    if vehicle.get('fuel'):
+        data['fuel_type'] = vehicle['fuel']
+    if vehicle.get('transmission'):
+        data['transmission'] = vehicle['transmission']
+
+    # Power is only published as display text, e.g. "110 kW (150 CV)"
+    details = ' '.join(str(detail.get('data', '')) for detail in item.get('vehicleDetails') or []
+                       if isinstance(detail, dict))
+    for key in ('power_cv', 'power_kw'):
+        value = parse_specifications(details).get(key)
+        if value is not None:
+            data[key] = value
+
+    province = location.get('province') or location.get('city')
+    if province:
+        data['province'] = province
+    if location.get('region'):
+        data['region'] = location['region']
+    if seller.get('type'):
+        data['seller_type'] = seller['type']
+
+    return data
+
+def _text(element) -> str:
+    """Whitespace-normalised text of an element"""
+    return ' '.join(' '.join(element.itertext()).split())
+
+def _result_count(tree) -> Optional[int]:
+    """Total results from the page heading, or None if it does not show one"""
+    for element in RESULT_COUNT_XPATH(tree):
+        match = RESULT_COUNT_RE.search(_text(element))
+        if match:
+            return _to_int(match.group(1))
+    return None
+
+class ListingParser:
+    """Result-page parser built on lxml with a cached selector plan.
+
+    Pages embedding Next.js state (__NEXT_DATA__) are mapped straight from
+    the JSON without building a DOM; DOM scraping is the fallback. On the
+    DOM path the first page that yields listings fixes which container, title and
+    price strategies matched. Later pages apply only that compiled plan and
+    fall back to probing every strategy when it stops matching, so a layout
+    change costs one slow page rather than a failed run.
+    """
+
+    def __init__(self, base_url: str):
+        self.base_url = base_url
+        self.plan: Dict[str, Optional[int]] = {'container': None, 'title': None, 'price': None}
+
+    def parse(self, content: bytes, page: Optional[int] = None) -> Dict[str, Any]:
+        """Parse a result page into listing dicts and a next-page flag"""
+        if not content or not content.strip():
+            return {'listings': [], 'has_next_page': False, 'total_results': None}
+
+        parsed = self._parse_next_data(content, page)
+        if parsed is not None:
+            return parsed
+
+        tree = html.fromstring(content)
+
+        listings = []
+        for container in self._find_containers(tree):
+            try:
+                listing_data = self._extract_listing_data(container)
+                if listing_data and listing_data.get('external_id'):
+                    listings.append(listing_data)
+            except Exception as e:
+                logger.warning(f"Error extracting listing data: {e}")
+                continue
+
+        logger.info(f"Successfully extracted {len(listings)} car listings")
+        return {
+            'listings': listings,
+            'has_next_page': bool(NEXT_PAGE_XPATH(tree)),
+            'total_results': _result_count(tree),
+        }
+
+    def _parse_next_data(self, content: bytes, page: Optional[int]) -> Optional[Dict[str, Any]]:
+        """JSON fast path; None means the page has no usable embedded state"""
+        data = extract_next_data(content)
+        if data is None:
+            return None
+        page_props = (data.get('props') or {}).get('pageProps') or {}
+        items = page_props.get('listings')
+        if not isinstance(items, list):
+            items = _find_listing_array(data)
+        if not items:
+            return None
+
+        listings = []
+        for item in items:
+            try:
+                listing_data = map_json_listing(item, self.base_url)
+                if listing_data:
+                    listings.append(listing_data)
+            except Exception as e:
+                logger.warning(f"Error mapping JSON listing: {e}")
+                continue
+
+        number_of_pages = _first_int(page_props.get('numberOfPages'))
+        if page is not None and number_of_pages is not None:
+            has_next_page = page < number_of_pages
+        else:
+            # Page position unknown: only the DOM can tell
+            has_next_page = bool(NEXT_PAGE_XPATH(html.fromstring(content)))
+
+        logger.info(f"Extracted {len(listings)} car listings from page JSON")
+        return {
+            'listings': listings,
+            'has_next_page': has_next_page,
+            'total_results': _first_int(page_props.get('numberOfResults')),
+        }
+
+    def _find_containers(self, tree) -> List[Any]:
+        planned = self.plan['container']
+        if planned is not None:
+            containers = _CONTAINERS[planned][1](tree)
+            if containers:
+                return containers
+
+        for index, (name, xpath) in enumerate(_CONTAINERS):
+            containers = xpath(tree)
+            if containers:
+                if planned != index:
+                    logger.info(f"Selector plan: containers via '{name}' ({len(containers)} found)")
+                    self.plan['container'] = index
+                return containers
+        return []
+
+    def _select(self, container, strategies, slot: str, accept=None):
+        """First element matched by the planned strategy, else by probing"""
+        planned = self.plan[slot]
+        if planned is not None:
+            for element in strategies[planned][1](container)[:1]:
+                if accept is None or accept(element):
+                    return element
+
+        for index, (name, xpath) in enumerate(strategies):
+            if index == planned:
+                continue
+            for element in xpath(container)[:1]:
+                if accept is None or accept(element):
+                    if planned is None:
+                        logger.info(f"Selector plan: {slot} via '{name}'")
+                        self.plan[slot] = index
+                    return element
+        return None
+
+    def _extract_listing_data(self, container) -> Optional[Dict[str, Any]]:
+        """Extract data from a single car listing container"""
+        data = {}
+
+        links = AUTO_LINK_XPATH(container)
+        if container.tag == 'a' and '/auto/' in container.get('href', ''):
+            links = [container] + links
+        link = links[0] if links else None
+
+        # Extract external ID from various possible locations
+        external_id = container.get('data-id') or \
+                     container.get('data-item-id') or \
+                     container.get('id')
+
+        if not external_id and link is not None:
+            id_match = AUTO_ID_RE.search(link.get('href', ''))
+            if id_match:
+                external_id = id_match.group(1)
+
+        if not external_id:
+            return None
+
+        data['external_id'] = external_id
+
+        # Extract URL
+        if link is not None:
+            href = link.get('href', '')
+            data['url'] = self.base_url + href if href.startswith('/') else href
+        else:
+            data['url'] = f"{self.base_url}/auto/{external_id}"
+
+        data.update(self._extract_car_details(container))
+        return data
+
+    def _extract_car_details(self, container) -> Dict[str, Any]:
+        """Extract title, price and specifications using the selector plan"""
+        details = {}
+
+        title_elem = self._select(container, _TITLES, 'title')
+        title_text = _text(title_elem) if title_elem is not None else ""
+        if title_text:
+            details.update(parse_brand_model(title_text))
+            details['variant'] = title_text
+
+        price_elem = self._select(
+            container, _PRICES, 'price',
+            accept=lambda element: parse_price(_text(element)) is not None
+        )
+        if price_elem is not None:
+            details['price'] = parse_price(_text(price_elem))
+
+        # Extract specifications (year, mileage, fuel, etc.)
+        details.update(parse_specifications(_text(container)))
+
+        return details
@@ -0,0 +1,390 @@
+from sqlalchemy import Column, MetaData, String, Table, bindparam, func, insert, or_, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional
+from contextlib import contextmanager
+from datetime import datetime
+import hashlib
+import json
+import logging
+
+from app.models.models import Car, PriceHistory, search_cars
+from app.scraping.liveness import LivenessCandidate
+
+logger = logging.getLogger(__name__)
+
+# Descriptive columns refreshed on conflict only when the new listing has a
+# value, so a sparser extraction never erases data; a reparse fills the
+# ones still empty
+COALESCED_COLUMNS = [
+    'variant', 'year', 'mileage', 'fuel_type', 'power_cv', 'power_kw',
+    'transmission', 'province', 'region', 'seller_type'
+]
+
+# Per-connection scratch table for the availability sweep
+_seen_listings = Table(
+    'seen_listings', MetaData(),
+    Column('external_id', String(100), primary_key=True),
+    prefixes=['TEMPORARY']
+)
+
+def listing_content_hash(listing: Dict[str, Any]) -> str:
+    """Stable hash of everything extracted for a listing"""
+    encoded = json.dumps(listing, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha1(encoded.encode('utf-8')).hexdigest()
+
+class KnownListing(NamedTuple):
+    car_id: int
+    price: float
+    mileage: Optional[int]
+    content_hash: Optional[str]
+
+class KnownListingIndex:
+    """In-memory map of a search's stored cars, loaded once per run.
+
+    Classifying a scraped listing as new, changed or unchanged is then a
+    dict lookup instead of a query per listing.
+    """
+
+    NEW = 'new'
+    CHANGED = 'changed'
+    UNCHANGED = 'unchanged'
+
+    def __init__(self, entries: Optional[Dict[str, KnownListing]] = None):
+        self.entries = entries or {}
+
+    @classmethod
+    def load(cls, db: Session, search_id: int, member_ids: Iterable[int] = ()) -> "KnownListingIndex":
+        """Known listings of a search and of the member searches its crawl covers"""
+        search_ids = [search_id, *member_ids]
+        rows = db.execute(
+            select(Car.external_id, Car.id, Car.price, Car.mileage, Car.content_hash)
+            .where(or_(*(Car.in_search(known_id) for known_id in search_ids)))
+        )
+        index = cls({row.external_id: KnownListing(row.id, row.price, row.mileage, row.content_hash) for row in rows})
+        logger.info(f"Loaded {len(index.entries)} known listings for searches {search_ids}")
+        return index
+
+    def get(self, external_id: str) -> Optional[KnownListing]:
+        return self.entries.get(external_id)
+
+    def classify(self, listing: Dict[str, Any], content_hash: str) -> str:
+        known = self.entries.get(listing['external_id'])
+        if known is None:
+            return self.NEW
+        return self.UNCHANGED if known.content_hash == content_hash else self.CHANGED
+
+    def remember(self, external_id: str, known: KnownListing) -> None:
+        self.entries[external_id] = known
+
+class ListingWriter:
+    """Persists a whole page of listings in one transaction.
+
+    With a KnownListingIndex, unchanged listings are skipped and stored
+    prices come from the index; a SELECT ... IN is only needed for
+    listings the index does not know. One INSERT ... ON CONFLICT
+    (external_id) DO UPDATE ... RETURNING upserts the rest, and one
+    multi-row INSERT records the price history.
+    """
+
+    SUPPORTED_DIALECTS = {'postgresql': postgresql.insert, 'sqlite': sqlite.insert}
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    @classmethod
+    def supports(cls, db: Session) -> bool:
+        return db.get_bind().dialect.name in cls.SUPPORTED_DIALECTS
+
+    def write_page(self, listings: List[Dict[str, Any]], search_id: int,
+                   index: Optional[KnownListingIndex] = None) -> Dict[str, int]:
+        """Upsert a page of listings and return new/updated/unchanged counts"""
+        # Last occurrence wins if a listing is repeated on the page
+        by_external_id = {listing['external_id']: listing for listing in listings}
+        hashes = {external_id: listing_content_hash(listing) for external_id, listing in by_external_id.items()}
+        counts = {'cars_found': len(by_external_id), 'cars_new': 0, 'cars_updated': 0, 'cars_unchanged': 0}
+
+        existing: Dict[str, float] = {}
+        unchanged_ids: List[int] = []
+        if index is not None:
+            for external_id, listing in list(by_external_id.items()):
+                status = index.classify(listing, hashes[external_id])
+                if status == KnownListingIndex.UNCHANGED:
+                    del by_external_id[external_id]
+                    unchanged_ids.append(index.get(external_id).car_id)
+                elif status == KnownListingIndex.CHANGED:
+                    existing[external_id] = index.get(external_id).price
+        counts['cars_unchanged'] = len(unchanged_ids)
+        if not by_external_id:
+            self.touch(unchanged_ids)
+            return counts
+
+        upserted = []
+        history = []
+        try:
+            # Unchanged cars only get last_seen bumped, in the page's transaction
+            self.touch(unchanged_ids, commit=False)
+
+            # Listings the index does not know may still be stored under another search
+            unknown = [external_id for external_id in by_external_id if external_id not in existing]
+            if unknown:
+                existing.update(
+                    (row.external_id, row.price)
+                    for row in self.db.execute(
+                        select(Car.external_id, Car.price).where(Car.external_id.in_(unknown))
+                    )
+                )
+
+            now = datetime.now()
+            rows = [
+                self._car_row(listing, search_id, existing.get(external_id), hashes[external_id], now)
+                for external_id, listing in by_external_id.items()
+            ]
+
+            upsert = self.SUPPORTED_DIALECTS[self.db.get_bind().dialect.name](Car).values(rows)
+            excluded = upsert.excluded
+            columns = Car.__table__.c
+            update = {
+                'url': excluded.url,
+                'price': excluded.price,
+                'last_seen': excluded.last_seen,
+                'raw_data': excluded.raw_data,
+                'content_hash': excluded.content_hash,
+                'is_available': True,
+                'delisted_at': None,
+            }
+            update.update({
+                name: func.coalesce(getattr(excluded, name), columns[name])
+                for name in COALESCED_COLUMNS
+            })
+            upsert = upsert.on_conflict_do_update(
+                index_elements=[Car.external_id],
+                set_=update
+            ).returning(Car.id, Car.external_id, Car.price, Car.mileage)
+
+            for row in self.db.execute(upsert):
+                old_price = existing.get(row.external_id)
+                if row.external_id not in existing or old_price != row.price:
+                    history.append({'car_id': row.id, 'price': row.price, 'mileage': row.mileage})
+                upserted.append(row)
+
+            if history:
+                self.db.execute(insert(PriceHistory).values(history))
+
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+
+        # Only update the index once the transaction is durable
+        if index is not None:
+            for row in upserted:
+                index.remember(row.external_id, KnownListing(row.id, row.price, row.mileage, hashes[row.external_id]))
+
+        counts['cars_new'] = len(by_external_id) - len(existing)
+        counts['cars_updated'] = len(existing)
+        logger.info(f"Upserted page: {counts['cars_new']} new, {counts['cars_updated']} changed, "
+                    f"{counts['cars_unchanged']} unchanged, {len(history)} price changes")
+        return counts
+
+    def touch(self, car_ids: List[int], commit: bool = True) -> None:
+        """Mark cars as seen now with one set-based UPDATE, leaving the row otherwise untouched"""
+        if not car_ids:
+            return
+        try:
+            self.db.execute(
+                update(Car)
+                .where(Car.id.in_(car_ids))
+                .values(last_seen=datetime.now(), is_available=True, delisted_at=None)
+                .execution_options(synchronize_session=False)
+            )
+            if commit:
+                self.db.commit()
+        except Exception:
+            if commit:
+                self.db.rollback()
+            raise
+
+    def backfill(self, listings: List[Dict[str, Any]]) -> Dict[str, int]:
+        """Fill extracted fields still empty on stored cars from re-parsed listings.
+        
+        Only COALESCED_COLUMNS and raw_data are written, and only where they
+        are NULL. Listings that are not stored are skipped; liveness,
+        last_seen, price and price history are left alone, since archived
+        pages say nothing about the car today.
+        """
+        by_external_id = {listing['external_id']: listing for listing in listings}
+        counts = {'cars_found': len(by_external_id), 'cars_updated': 0}
+        if not by_external_id:
+            return counts
+        try:
+            stored = set(self.db.execute(
+                select(Car.external_id).where(Car.external_id.in_(by_external_id))
+            ).scalars())
+            if stored:
+                columns = Car.__table__.c
+                backfill = (
+                    update(Car.__table__)
+                    .where(columns.external_id == bindparam('b_external_id'))
+                    .values({
+                        name: func.coalesce(columns[name], bindparam(f'b_{name}', type_=columns[name].type))
+                        for name in COALESCED_COLUMNS + ['raw_data']
+                    })
+                )
+                rows = [
+                    {'b_external_id': external_id, 'b_raw_data': by_external_id[external_id],
+                     **{f'b_{name}': by_external_id[external_id].get(name) for name in COALESCED_COLUMNS}}
+                    for external_id in stored
+                ]
+                self.db.connection().execute(backfill, rows)
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+        counts['cars_updated'] = len(stored)
+        return counts
+
+    def sweep_unseen(self, search_id: int, seen_external_ids: Iterable[str]) -> int:
+        """Mark the search's available cars missing from a complete run as delisted.
+        
+        The seen IDs go into a temporary table so the whole sweep is one
+        UPDATE ... WHERE external_id NOT IN (SELECT ...), whatever the
+        size of the result set. Returns the number of cars delisted.
+        """
+        try:
+            with self._seen_table(seen_external_ids) as seen:
+                result = self.db.execute(
+                    update(Car)
+                    .where(
+                        Car.search_id == search_id,
+                        Car.is_available == True,
+                        Car.external_id.not_in(select(seen.c.external_id))
+                    )
+                    .values(is_available=False, delisted_at=datetime.now())
+                    .execution_options(synchronize_session=False)
+                )
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+        
+        logger.info(f"Marked {result.rowcount} cars of search {search_id} as no longer available")
+        return result.rowcount
+
+    def unseen_cars(self, search_id: int, seen_external_ids: Iterable[str],
+                    verified_before: Optional[datetime] = None,
+                    limit: Optional[int] = None) -> List[LivenessCandidate]:
+        """Available cars of the search missing from seen_external_ids, longest unseen first.
+        
+        Cars confirmed alive at or after verified_before are left out.
+        """
+        with self._seen_table(seen_external_ids) as seen:
+            query = (
+                select(Car.id, Car.external_id, Car.url)
+                .where(
+                    Car.search_id == search_id,
+                    Car.is_available == True,
+                    Car.external_id.not_in(select(seen.c.external_id))
+                )
+                .order_by(Car.last_seen)
+                .limit(limit)
+            )
+            if verified_before is not None:
+                query = query.where(or_(Car.verified_at.is_(None), Car.verified_at < verified_before))
+            candidates = [LivenessCandidate(row.id, row.external_id, row.url) for row in self.db.execute(query)]
+        self.db.commit()
+        return candidates
+
+    def add_to_searches(self, routes: Dict[int, List[str]]) -> None:
+        """Record which searches each stored listing matched (search_id -> external_ids)"""
+        external_ids = {external_id for ids in routes.values() for external_id in ids}
+        if not external_ids:
+            return
+        try:
+            car_ids = dict(self.db.execute(
+                select(Car.external_id, Car.id).where(Car.external_id.in_(external_ids))
+            ).all())
+            pairs = {
+                (search_id, car_ids[external_id])
+                for search_id, ids in routes.items()
+                for external_id in ids if external_id in car_ids
+            }
+            existing = set(self.db.execute(
+                select(search_cars.c.search_id, search_cars.c.car_id)
+                .where(search_cars.c.car_id.in_({car_id for _, car_id in pairs}))
+            ).all())
+            rows = [{'search_id': search_id, 'car_id': car_id} for search_id, car_id in pairs - existing]
+            if rows:
+                self.db.execute(insert(search_cars), rows)
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+
+    def delist(self, car_ids: List[int]) -> int:
+        """Mark specific cars as no longer available"""
+        if not car_ids:
+            return 0
+        try:
+            result = self.db.execute(
+                update(Car)
+                .where(Car.id.in_(car_ids), Car.is_available == True)
+                .values(is_available=False, delisted_at=datetime.now())
+                .execution_options(synchronize_session=False)
+            )
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+        logger.info(f"Marked {result.rowcount} cars as no longer available")
+        return result.rowcount
+
+    def mark_verified(self, car_ids: List[int]) -> None:
+        """Record that the cars' detail pages were confirmed live just now"""
+        if not car_ids:
+            return
+        try:
+            self.db.execute(
+                update(Car)
+                .where(Car.id.in_(car_ids))
+                .values(verified_at=datetime.now())
+                .execution_options(synchronize_session=False)
+            )
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+
+    @contextmanager
+    def _seen_table(self, external_ids: Iterable[str]) -> Iterator[Table]:
+        """Load IDs into the temporary seen_listings table for the duration of the block"""
+        rows = [{'external_id': external_id} for external_id in set(external_ids)]
+        connection = self.db.connection()
+        _seen_listings.create(connection, checkfirst=True)
+        try:
+            connection.execute(_seen_listings.delete())
+            if rows:
+                connection.execute(_seen_listings.insert(), rows)
+            yield _seen_listings
+        finally:
+            _seen_listings.drop(connection)
+
+    def _car_row(self, listing: Dict[str, Any], search_id: int, stored_price,
+                 content_hash: str, now: datetime) -> Dict[str, Any]:
+        external_id = listing['external_id']
+        row = {
+            'external_id': external_id,
+            'url': listing.get('url', ''),
+            'brand': listing.get('brand', ''),
+            'model': listing.get('model', ''),
+            # Keep the stored price if this extraction missed it
+            'price': listing.get('price', stored_price if stored_price is not None else 0),
+            'search_id': search_id,
+            'raw_data': listing,
+            'content_hash': content_hash,
+            'last_seen': now,
+            'is_available': True,
+        }
+        for name in COALESCED_COLUMNS:
+            row[name] = listing.get(name)
+        return row
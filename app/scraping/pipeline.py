@@ -0,0 +1,153 @@
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+class StageMetrics:
+    """Throughput and input queue depth of one pipeline stage"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.items = 0
+        # Time spent working on items, summed over the stage's workers
+        self.busy_seconds = 0.0
+        self.depth_samples = 0
+        self.depth_total = 0
+        self.max_depth = 0
+        self.started = None
+        self.finished = None
+
+    def took(self, depth: int) -> float:
+        """Record taking an item off a queue of the given depth; returns the start time"""
+        now = time.monotonic()
+        if self.started is None:
+            self.started = now
+        self.depth_samples += 1
+        self.depth_total += depth
+        self.max_depth = max(self.max_depth, depth)
+        return now
+
+    def done(self, started: float) -> None:
+        """Record an item finished that was started at the given time"""
+        now = time.monotonic()
+        self.items += 1
+        self.busy_seconds += now - started
+        self.finished = now
+
+    def as_dict(self) -> Dict[str, Any]:
+        elapsed = (self.finished - self.started) if self.items else 0.0
+        return {
+            'items': self.items,
+            'busy_seconds': round(self.busy_seconds, 3),
+            'items_per_second': round(self.items / elapsed, 2) if elapsed > 0 else None,
+            'avg_queue_depth': round(self.depth_total / self.depth_samples, 2) if self.depth_samples else 0.0,
+            'max_queue_depth': self.max_depth,
+        }
+
+def stage_metrics() -> Dict[str, StageMetrics]:
+    """Fresh metrics for the fetch, parse and write stages"""
+    return {name: StageMetrics(name) for name in ('fetch', 'parse', 'write')}
+
+class PagePipeline:
+    """Result pages streamed through fetch -> parse -> write stages.
+
+    Stages are joined by bounded queues and at most max_ahead pages are in
+    the pipeline at once, so a slow stage holds back the ones before it
+    instead of letting pages pile up in memory. Fetch and parse run in
+    several workers; the single writer gets pages back in page order.
+
+    A fetch or parse error travels down the pipeline in place of its page
+    and is handed to write. write(page, item) returns the last page worth
+    fetching so far (the crawl's frontier), or None to stop after this page.
+    """
+
+    def __init__(self, fetch: Callable[[int], Awaitable[Any]], parse: Callable[[int, Any], Awaitable[Any]],
+                 write: Callable[[int, Any], Awaitable[Optional[int]]], fetch_workers: int, parse_workers: int,
+                 queue_size: int, metrics: Optional[Dict[str, StageMetrics]] = None):
+        self.fetch = fetch
+        self.parse = parse
+        self.write = write
+        self.fetch_workers = max(1, fetch_workers)
+        self.parse_workers = max(1, parse_workers)
+        self.queue_size = max(1, queue_size)
+        self.max_ahead = self.fetch_workers + self.parse_workers + 2 * self.queue_size
+        self.metrics = metrics if metrics is not None else stage_metrics()
+
+    async def run(self, first_page: int, last_page: int) -> None:
+        """Crawl from first_page, never past last_page"""
+        fetch_queue: asyncio.Queue = asyncio.Queue(self.queue_size)
+        parse_queue: asyncio.Queue = asyncio.Queue(self.queue_size)
+        write_queue: asyncio.Queue = asyncio.Queue(self.queue_size)
+        changed = asyncio.Condition()
+        # Pages issued to the fetchers, the writer's progress and its frontier
+        state = {'issued': first_page - 1, 'written': first_page - 1, 'frontier': first_page}
+
+        def can_issue() -> bool:
+            return (state['issued'] < state['frontier']
+                    and state['issued'] - state['written'] < self.max_ahead)
+
+        async def feed() -> None:
+            while True:
+                async with changed:
+                    await changed.wait_for(can_issue)
+                    state['issued'] += 1
+                    page = state['issued']
+                await fetch_queue.put(page)
+
+        async def fetch_worker() -> None:
+            metrics = self.metrics['fetch']
+            while True:
+                page = await fetch_queue.get()
+                started = metrics.took(fetch_queue.qsize())
+                try:
+                    item = await self.fetch(page)
+                except Exception as e:
+                    item = e
+                metrics.done(started)
+                await parse_queue.put((page, item))
+
+        async def parse_worker() -> None:
+            metrics = self.metrics['parse']
+            while True:
+                page, item = await parse_queue.get()
+                started = metrics.took(parse_queue.qsize())
+                if not isinstance(item, Exception):
+                    try:
+                        item = await self.parse(page, item)
+                    except Exception as e:
+                        item = e
+                metrics.done(started)
+                await write_queue.put((page, item))
+
+        async def write_in_order() -> None:
+            metrics = self.metrics['write']
+            # Pages that arrived ahead of the one the writer needs next
+            arrived: Dict[int, Any] = {}
+            page = first_page
+            while True:
+                while page not in arrived:
+                    done_page, item = await write_queue.get()
+                    arrived[done_page] = item
+                started = metrics.took(write_queue.qsize() + len(arrived) - 1)
+                frontier = await self.write(page, arrived.pop(page))
+                metrics.done(started)
+                if frontier is None or frontier <= page or page >= last_page:
+                    return
+                async with changed:
+                    state['written'] = page
+                    state['frontier'] = max(state['frontier'], min(frontier, last_page))
+                    changed.notify_all()
+                page += 1
+
+        workers = [asyncio.ensure_future(feed())]
+        workers += [asyncio.ensure_future(fetch_worker()) for _ in range(self.fetch_workers)]
+        workers += [asyncio.ensure_future(parse_worker()) for _ in range(self.parse_workers)]
+        try:
+            await write_in_order()
+        finally:
+            # Pages still in flight are past where the crawl stopped
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
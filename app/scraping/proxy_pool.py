@@ -0,0 +1,115 @@
+import logging
+import random
+import time
+from typing import Any, Dict, List, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Weight of the newest latency sample in the moving average
+LATENCY_ALPHA = 0.2
+
+class ProxyHealth:
+    """Rolling health of one proxy exit"""
+
+    def __init__(self, url: str):
+        self.url = url
+        self.requests = 0
+        self.errors = 0
+        self.throttles = 0
+        self.latency = None  # exponential moving average, seconds
+        self.consecutive_failures = 0
+        self.quarantined_until = 0.0
+
+    @property
+    def quarantined(self) -> bool:
+        return time.monotonic() < self.quarantined_until
+
+    @property
+    def score(self) -> float:
+        """Relative share of traffic: fewer errors, 429s and faster answers score higher"""
+        # Laplace smoothing so a new proxy starts with a fair share
+        error_rate = (self.errors + 1) / (self.requests + 2)
+        throttle_rate = (self.throttles + 1) / (self.requests + 2)
+        latency = self.latency if self.latency is not None else 1.0
+        return (1 - error_rate) * (1 - throttle_rate) / (0.1 + latency)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            'url': self.url,
+            'requests': self.requests,
+            'errors': self.errors,
+            'throttles': self.throttles,
+            'latency': round(self.latency, 3) if self.latency is not None else None,
+            'score': round(self.score, 3),
+            'quarantined': self.quarantined,
+        }
+
+class ProxyPool:
+    """Spreads requests over proxy exits by health score.
+
+    Each request picks an exit at random, weighted by score. After
+    quarantine_failures consecutive failures (connection errors, 429, 403
+    or 5xx) an exit is left out for quarantine_seconds, then gets a fresh
+    chance.
+    """
+
+    def __init__(self, proxies: List[str], quarantine_failures: Optional[int] = None,
+                 quarantine_seconds: Optional[float] = None):
+        if not proxies:
+            raise ValueError("A proxy pool needs at least one proxy")
+        self.proxies = {url: ProxyHealth(url) for url in proxies}
+        self.quarantine_failures = quarantine_failures or settings.proxy_quarantine_failures
+        self.quarantine_seconds = quarantine_seconds or settings.proxy_quarantine_seconds
+
+    def choose(self) -> str:
+        """Pick an exit for the next request"""
+        healthy = [proxy for proxy in self.proxies.values() if not proxy.quarantined]
+        if not healthy:
+            # Everything is quarantined: use the exit closest to release
+            return min(self.proxies.values(), key=lambda proxy: proxy.quarantined_until).url
+        return random.choices(healthy, weights=[proxy.score for proxy in healthy])[0].url
+
+    def record(self, url: str, latency: Optional[float] = None, status: Optional[int] = None) -> None:
+        """Record a request's outcome; status None means the request itself failed"""
+        proxy = self.proxies.get(url)
+        if proxy is None:
+            return
+        proxy.requests += 1
+        if latency is not None:
+            proxy.latency = latency if proxy.latency is None else (
+                LATENCY_ALPHA * latency + (1 - LATENCY_ALPHA) * proxy.latency
+            )
+
+        failed = status is None or status == 429 or status == 403 or status >= 500
+        if status is None or status >= 500:
+            proxy.errors += 1
+        elif status in (403, 429):
+            proxy.throttles += 1
+        if not failed:
+            proxy.consecutive_failures = 0
+            return
+
+        proxy.consecutive_failures += 1
+        if proxy.consecutive_failures >= self.quarantine_failures:
+            proxy.quarantined_until = time.monotonic() + self.quarantine_seconds
+            proxy.consecutive_failures = 0
+            logger.warning(f"Quarantined proxy {url} for {self.quarantine_seconds:.0f}s "
+                           f"({proxy.errors} errors, {proxy.throttles} throttles in {proxy.requests} requests)")
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        return [proxy.as_dict() for proxy in self.proxies.values()]
+
+_pool: Optional[ProxyPool] = None
+
+def get_proxy_pool() -> Optional[ProxyPool]:
+    """Process-wide proxy pool from PROXY_URLS, or None to connect directly"""
+    global _pool
+    if not settings.proxy_urls:
+        return None
+    if _pool is None:
+        proxies = [url.strip() for url in settings.proxy_urls.split(',') if url.strip()]
+        _pool = ProxyPool(proxies)
+        logger.info(f"Proxy pool with {len(proxies)} exits")
+    return _pool
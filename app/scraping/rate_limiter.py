@@ -0,0 +1,169 @@
+import asyncio
+import logging
+import random
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import AsyncIterator, Dict, Optional
+from urllib.parse import urlparse
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+class TokenBucket:
+    """Token bucket pacing requests to a sustained rate with short bursts"""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def set_rate(self, rate: float) -> None:
+        """Change the sustained rate without losing accrued tokens"""
+        self._refill()
+        self.rate = rate
+
+    def try_take(self) -> float:
+        """Take a token if available, otherwise return seconds until one is"""
+        self._refill()
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header (delta-seconds or HTTP-date) into seconds"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        seconds = float(value)
+    else:
+        try:
+            retry_at = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        if retry_at.tzinfo is None:
+            retry_at = retry_at.replace(tzinfo=timezone.utc)
+        seconds = (retry_at - datetime.now(timezone.utc)).total_seconds()
+    return min(max(seconds, 0.0), settings.retry_after_max_seconds)
+
+def with_jitter(seconds: float) -> float:
+    """Spread a delay by up to +/-20% so retries do not synchronise"""
+    return seconds * random.uniform(0.8, 1.2)
+
+class HostRateLimiter:
+    """Politeness budget for one host: a token bucket plus an in-flight cap.
+
+    The bucket rate is adjusted AIMD-style: throttling responses (429/5xx)
+    cut it multiplicatively, every run of successful responses raises it
+    additively, so the crawl converges near the host's real limit.
+    """
+
+    def __init__(self, host: str, rate: float, burst: int, max_in_flight: int):
+        self.host = host
+        self.bucket = TokenBucket(rate, burst)
+        self.max_in_flight = max_in_flight
+        self.min_rate = min(rate, settings.rate_limit_min_per_second)
+        self.max_rate = max(rate, settings.rate_limit_max_per_second)
+        self.success_streak = 0
+        self.paused_until = 0.0
+        self.last_decrease = 0.0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock: Optional[asyncio.Lock] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    def _bind_loop(self) -> None:
+        """(Re)create asyncio primitives for the running loop"""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._lock = asyncio.Lock()
+            self._semaphore = asyncio.Semaphore(self.max_in_flight)
+
+    @property
+    def rate(self) -> float:
+        """Current sustained request rate in requests per second"""
+        return self.bucket.rate
+
+    def record_success(self) -> None:
+        """Additive increase after a sustained run of successful responses"""
+        self.success_streak += 1
+        if self.success_streak >= settings.rate_limit_success_window and self.rate < self.max_rate:
+            self.bucket.set_rate(min(self.max_rate, self.rate + settings.rate_limit_increase))
+            self.success_streak = 0
+            logger.info(f"Rate for {self.host} raised to {self.rate:.2f} req/s")
+
+    def record_throttle(self, status_code: int, retry_after: Optional[float] = None) -> None:
+        """Multiplicative decrease on 429/5xx, pausing the host for Retry-After"""
+        self.success_streak = 0
+        now = time.monotonic()
+        # Responses to requests already in flight describe the same overload,
+        # so cut at most once per token interval
+        if now - self.last_decrease >= 1.0 / self.rate:
+            self.bucket.set_rate(max(self.min_rate, self.rate * settings.rate_limit_decrease_factor))
+            self.last_decrease = now
+        if retry_after:
+            # Jitter only lengthens the pause: the host asked for at least this long
+            self.paused_until = max(self.paused_until, time.monotonic() + retry_after * random.uniform(1.0, 1.2))
+        logger.warning(f"HTTP {status_code} from {self.host}, rate cut to {self.rate:.2f} req/s"
+                       + (f", pausing {retry_after:.0f}s" if retry_after else ""))
+
+    async def acquire_token(self) -> None:
+        """Wait until the bucket allows another request"""
+        self._bind_loop()
+        async with self._lock:
+            while True:
+                pause = self.paused_until - time.monotonic()
+                if pause > 0:
+                    await asyncio.sleep(pause)
+                    continue
+                wait = self.bucket.try_take()
+                if wait <= 0:
+                    return
+                await asyncio.sleep(wait)
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """Hold an in-flight slot and a token for the duration of a request"""
+        self._bind_loop()
+        async with self._semaphore:
+            await self.acquire_token()
+            yield
+
+_limiters: Dict[str, HostRateLimiter] = {}
+
+def get_rate_limiter(url: str, exit: Optional[str] = None) -> HostRateLimiter:
+    """Return the process-wide limiter shared by every request to the URL's host.
+    
+    Requests leaving through a proxy get a budget per (host, proxy) pair,
+    since the site sees and throttles each exit separately.
+    """
+    host = urlparse(url).netloc
+    key = host if exit is None else f"{host} via {exit}"
+    limiter = _limiters.get(key)
+    if limiter is None:
+        rate = settings.rate_limit_per_second or 1.0 / max(settings.request_delay, 0.001)
+        limiter = HostRateLimiter(
+            host,
+            rate=rate,
+            burst=settings.rate_limit_burst,
+            max_in_flight=settings.max_requests_in_flight
+        )
+        _limiters[key] = limiter
+        logger.info(f"Rate limiter for {key}: {rate:.2f} req/s, burst {settings.rate_limit_burst}, "
+                    f"{settings.max_requests_in_flight} in flight")
+    return limiter
+
+def host_rate(url: str) -> float:
+    """Combined current rate of every exit's limiter for the URL's host"""
+    host = urlparse(url).netloc
+    return sum(limiter.rate for key, limiter in _limiters.items() if key == host or key.startswith(f"{host} via "))
@@ -0,0 +1,56 @@
+"""
+Offline re-extraction over archived scraping runs.
+
+Usage:
+    python -m app.scraping.reparse 12 13 14       # specific ScrapingLog IDs
+    python -m app.scraping.reparse --search-id 3  # every archived run of a search
+"""
+
+import argparse
+import asyncio
+import logging
+import sys
+
+from app.core.database import SessionLocal
+from app.models.models import ScrapingLog
+from app.scraping.autoscout24_scraper import AutoScout24Scraper
+from app.scraping.page_archive import PageArchive
+
+logger = logging.getLogger(__name__)
+
+async def reparse(log_ids, search_id=None) -> int:
+    """Reparse the given runs oldest first, returning the number that failed"""
+    db = SessionLocal()
+    failures = 0
+    try:
+        if search_id is not None:
+            runs = db.query(ScrapingLog.id).filter(ScrapingLog.search_id == search_id).all()
+            log_ids = [run.id for run in runs if PageArchive(run.id).exists()]
+
+        scraper = AutoScout24Scraper(db)
+        for log_id in sorted(log_ids):
+            try:
+                result = await scraper.reparse_run(log_id)
+                print(result)
+            except Exception as e:
+                logger.error(f"Reparse of scraping log {log_id} failed: {e}")
+                failures += 1
+        await scraper.close()
+    finally:
+        db.close()
+    return failures
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Re-extract cars from archived scraping runs")
+    parser.add_argument('log_ids', nargs='*', type=int, help="ScrapingLog IDs to reparse")
+    parser.add_argument('--search-id', type=int, help="Reparse every archived run of this search")
+    args = parser.parse_args()
+
+    if not args.log_ids and args.search_id is None:
+        parser.error("give at least one ScrapingLog ID or --search-id")
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    return 1 if asyncio.run(reparse(args.log_ids, args.search_id)) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
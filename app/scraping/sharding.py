@@ -0,0 +1,51 @@
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from app.models.models import Search
+
+# Prices above this go to one open-ended shard, split by year if needed
+PRICE_CEILING = 200_000
+# Narrower price shards are split by year instead
+MIN_PRICE_SPAN = 500
+# Registrations before this year share one open-ended shard
+YEAR_FLOOR = 1990
+
+Shard = Dict[str, int]
+
+def root_shard(search: Search) -> Shard:
+    """The search's own price and year bounds, as shard parameters"""
+    shard = {}
+    for param, column in (('pricefrom', 'price_min'), ('priceto', 'price_max'),
+                          ('yearfrom', 'year_min'), ('yearto', 'year_max')):
+        value = getattr(search, column)
+        if value:
+            shard[param] = int(value)
+    return shard
+
+def split_shard(shard: Shard) -> Optional[List[Shard]]:
+    """Split a saturated shard in two, by price first and then by year.
+
+    Returns None when the shard is already a single year in a narrow price
+    band, so it cannot be split further. Bounds are inclusive and the halves
+    never overlap.
+    """
+    low = shard.get('pricefrom', 0)
+    high = shard.get('priceto')
+    if high is None and low < PRICE_CEILING:
+        return [{**shard, 'pricefrom': low, 'priceto': PRICE_CEILING},
+                {**shard, 'pricefrom': PRICE_CEILING + 1}]
+    if high is not None and high - low >= 2 * MIN_PRICE_SPAN:
+        middle = (low + high) // 2
+        return [{**shard, 'pricefrom': low, 'priceto': middle},
+                {**shard, 'pricefrom': middle + 1, 'priceto': high}]
+
+    first = shard.get('yearfrom')
+    last = shard.get('yearto', datetime.now().year + 1)
+    if first is None and last >= YEAR_FLOOR:
+        return [{**shard, 'yearto': YEAR_FLOOR - 1},
+                {**shard, 'yearfrom': YEAR_FLOOR, 'yearto': last}]
+    if first is not None and last > first:
+        middle = (first + last) // 2
+        return [{**shard, 'yearfrom': first, 'yearto': middle},
+                {**shard, 'yearfrom': middle + 1, 'yearto': last}]
+    return None
@@ -76,7 +76,7 @@ class AnalyticsService:
         query = self.db.query(Car).filter(Car.is_available == True)
         
         if search_id:
-            query = query.filter(Car.search_id == search_id)
+            query = query.filter(Car.in_search(search_id))
         if brand:
             query = query.filter(Car.brand.ilike(f"%{brand}%"))
         if model:
@@ -33,7 +33,7 @@ class CarService:
         if available_only:
             query = query.filter(Car.is_available == True)
         if search_id:
-            query = query.filter(Car.search_id == search_id)
+            query = query.filter(Car.in_search(search_id))
         if brand:
             query = query.filter(Car.brand.ilike(f"%{brand}%"))
         if model:
@@ -69,7 +69,7 @@ class CarService:
         available_only: bool = True
     ) -> List[CarResponse]:
         """Get all cars for a specific search"""
-        query = self.db.query(Car).filter(Car.search_id == search_id)
+        query = self.db.query(Car).filter(Car.in_search(search_id))
         
         if available_only:
             query = query.filter(Car.is_available == True)
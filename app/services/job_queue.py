@@ -0,0 +1,145 @@
+import json
+import logging
+import time
+import uuid
+from typing import Any, Dict, List, NamedTuple, Optional
+
+import redis
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+CRAWL_JOB = 'crawl'
+
+class Job(NamedTuple):
+    id: str
+    kind: str
+    payload: Dict[str, Any]
+    attempts: int
+
+class RedisJobQueue:
+    """Reliable scrape job queue shared by worker processes on any node.
+
+    Keys under "carscraping:<name>":
+      pending  list of job IDs waiting for a worker
+      leases   sorted set of claimed job IDs, scored by lease expiry
+      dead     list of job IDs that used up their attempts
+      job:<id> hash with kind, payload, attempts and last error
+
+    A claim moves a job from pending to leases in one WATCH/MULTI
+    transaction. A worker that dies stops renewing its lease, and once it
+    expires the job goes back to pending (or to dead after max_attempts).
+    """
+
+    def __init__(self, client: Optional[redis.Redis] = None, name: Optional[str] = None,
+                 visibility_timeout: Optional[float] = None, max_attempts: Optional[int] = None):
+        self.redis = client or redis.from_url(settings.redis_url, decode_responses=True)
+        prefix = f"carscraping:{name or settings.job_queue_name}"
+        self.pending_key = f"{prefix}:pending"
+        self.leases_key = f"{prefix}:leases"
+        self.dead_key = f"{prefix}:dead"
+        self.job_prefix = f"{prefix}:job:"
+        self.visibility_timeout = visibility_timeout or settings.job_visibility_timeout_seconds
+        self.max_attempts = max_attempts or settings.job_max_attempts
+
+    def enqueue(self, kind: str, payload: Dict[str, Any]) -> str:
+        """Add a job and return its ID"""
+        job_id = uuid.uuid4().hex
+        with self.redis.pipeline() as pipe:
+            pipe.hset(self.job_prefix + job_id, mapping={
+                'kind': kind,
+                'payload': json.dumps(payload),
+                'attempts': 0,
+                'enqueued_at': time.time(),
+            })
+            pipe.lpush(self.pending_key, job_id)
+            pipe.execute()
+        return job_id
+
+    def claim(self) -> Optional[Job]:
+        """Lease the oldest pending job, or return None if there is none"""
+        self.requeue_expired()
+        with self.redis.pipeline() as pipe:
+            while True:
+                try:
+                    pipe.watch(self.pending_key)
+                    job_id = pipe.lindex(self.pending_key, -1)
+                    if job_id is None:
+                        return None
+                    pipe.multi()
+                    pipe.rpop(self.pending_key)
+                    pipe.zadd(self.leases_key, {job_id: time.time() + self.visibility_timeout})
+                    pipe.hincrby(self.job_prefix + job_id, 'attempts', 1)
+                    pipe.hgetall(self.job_prefix + job_id)
+                    data = pipe.execute()[-1]
+                    break
+                except redis.WatchError:
+                    # Another worker claimed it first
+                    continue
+        return Job(job_id, data['kind'], json.loads(data['payload']), int(data['attempts']))
+
+    def extend(self, job: Job) -> bool:
+        """Renew a job's lease; False if it was already lost to expiry"""
+        # XX: never recreate a lease that expired; CH: count the score update
+        return bool(self.redis.zadd(self.leases_key, {job.id: time.time() + self.visibility_timeout}, xx=True, ch=True))
+
+    def complete(self, job: Job) -> None:
+        with self.redis.pipeline() as pipe:
+            pipe.zrem(self.leases_key, job.id)
+            pipe.delete(self.job_prefix + job.id)
+            pipe.execute()
+
+    def fail(self, job: Job, error: str) -> None:
+        """Release a failed job for another attempt, or dead-letter it"""
+        if not self.redis.zrem(self.leases_key, job.id):
+            # The lease already expired and the job was requeued
+            return
+        self._release(job.id, job.attempts, error)
+
+    def requeue_expired(self) -> int:
+        """Return jobs whose lease expired to pending (or dead); returns how many"""
+        requeued = 0
+        for job_id in self.redis.zrangebyscore(self.leases_key, 0, time.time()):
+            # Whoever removes the lease owns the requeue
+            if self.redis.zrem(self.leases_key, job_id):
+                attempts = int(self.redis.hget(self.job_prefix + job_id, 'attempts') or 0)
+                self._release(job_id, attempts, 'lease expired')
+                requeued += 1
+        return requeued
+
+    def _release(self, job_id: str, attempts: int, error: str) -> None:
+        dead = attempts >= self.max_attempts
+        with self.redis.pipeline() as pipe:
+            pipe.hset(self.job_prefix + job_id, 'last_error', error)
+            pipe.lpush(self.dead_key if dead else self.pending_key, job_id)
+            pipe.execute()
+        if dead:
+            logger.error(f"Job {job_id} dead-lettered after {attempts} attempts: {error}")
+        else:
+            logger.warning(f"Job {job_id} failed (attempt {attempts}), requeued: {error}")
+
+    def dead_letters(self) -> List[Dict[str, Any]]:
+        """Jobs that exhausted their attempts, newest first"""
+        return [
+            {'id': job_id, **self.redis.hgetall(self.job_prefix + job_id)}
+            for job_id in self.redis.lrange(self.dead_key, 0, -1)
+        ]
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'pending': self.redis.llen(self.pending_key),
+            'leased': self.redis.zcard(self.leases_key),
+            'dead': self.redis.llen(self.dead_key),
+        }
+
+def enqueue_crawl(queue: RedisJobQueue, search_id: int, member_ids: Optional[List[int]] = None,
+                  log_id: Optional[int] = None) -> str:
+    """Queue a crawl of a search, routing its listings to the covered member searches.
+
+    log_id is a ScrapingLog already created for the run to report on.
+    """
+    payload = {'search_id': search_id, 'member_ids': list(member_ids or [])}
+    if log_id is not None:
+        payload['log_id'] = log_id
+    return queue.enqueue(CRAWL_JOB, payload)
@@ -1,13 +1,17 @@
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.interval import IntervalTrigger
 from sqlalchemy.orm import sessionmaker
+from typing import Any, Dict, List, Optional, Tuple
 import logging
 import asyncio
+import time
 
 from app.core.database import engine
 from app.core.config import settings
 from app.models.models import Search
 from app.scraping.autoscout24_scraper import AutoScout24Scraper
+from app.scraping.crawl_planner import plan_crawls
+from app.services.job_queue import RedisJobQueue, enqueue_crawl
 
 logger = logging.getLogger(__name__)
 
@@ -25,36 +29,159 @@ async def run_scheduled_scraping():
     
     logger.info("Starting scheduled scraping for all active searches")
     
-    db = SessionLocal()
     try:
-        # Get all active searches
-        active_searches = db.query(Search).filter(Search.is_active == True).all()
-        
-        if not active_searches:
-            logger.info("No active searches found")
+        if settings.job_queue_enabled:
+            # Scrape workers on any node pick the crawls up from Redis
+            crawls, stats = await asyncio.to_thread(_enqueue_active_searches, SessionLocal)
+            logger.info(f"Queued {crawls} crawl jobs: {stats}")
             return
         
-        logger.info(f"Found {len(active_searches)} active searches")
-        
-        # Run scraping for each search
-        for search in active_searches:
+        summary = await scrape_active_searches()
+        logger.info(f"Completed scheduled scraping for all searches: {summary}")
+    except Exception as e:
+        logger.error(f"Error in scheduled scraping: {e}")
+
+async def scrape_active_searches(session_factory: sessionmaker = SessionLocal,
+                                 concurrency: Optional[int] = None) -> Dict[str, Any]:
+    """Crawl all active searches with a pool of workers and return a run summary.
+    
+    Each worker uses its own database session; politeness towards the site
+    is enforced by the shared per-host rate limiter, not by pausing
+    between searches.
+    """
+    started_at = time.monotonic()
+    searches, plan = _plan_active_searches(session_factory)
+    
+    summary = {
+        'searches': searches, 'crawls': 0, 'succeeded': 0, 'failed': 0, 'timed_out': 0,
+        'pages_scraped': 0, 'cars_found': 0, 'cars_new': 0
+    }
+    if not plan:
+        return summary
+    
+    queue: asyncio.Queue = asyncio.Queue()
+    for job in plan:
+        queue.put_nowait(job)
+    
+    async def worker() -> None:
+        while True:
+            search_id, member_ids = await queue.get()
             try:
-                logger.info(f"Starting scraping for search: {search.name}")
-                scraper = AutoScout24Scraper(db)
-                result = await scraper.scrape_search(search)
-                logger.info(f"Completed scraping for search {search.name}: {result}")
-                
-                # Small delay between searches to be respectful
-                await asyncio.sleep(5)
-                
-            except Exception as e:
-                logger.error(f"Error scraping search {search.name}: {e}")
-                continue
+                await _run_crawl(session_factory, search_id, member_ids, queue, summary)
+            finally:
+                queue.task_done()
+    
+    workers = [
+        asyncio.create_task(worker())
+        for _ in range(min(concurrency or settings.scraping_concurrency, len(plan)))
+    ]
+    try:
+        await queue.join()
+    finally:
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+    
+    duration = time.monotonic() - started_at
+    summary['duration_seconds'] = round(duration, 2)
+    summary['pages_per_second'] = round(summary['pages_scraped'] / duration, 2) if duration else 0.0
+    summary['cars_per_second'] = round(summary['cars_found'] / duration, 2) if duration else 0.0
+    return summary
+
+def _plan_active_searches(session_factory: sessionmaker) -> Tuple[int, List[Tuple[int, List[int]]]]:
+    """Plan crawls for the active searches as (search_id, member_ids) pairs"""
+    db = session_factory()
+    try:
+        active_searches = db.query(Search).filter(Search.is_active == True).all()
+        # Searches covered by a broader one are served from its crawl
+        plan = [
+            (group.root.id, [member.id for member in group.members])
+            for group in plan_crawls(active_searches)
+        ]
+    finally:
+        db.close()
+    
+    if not active_searches:
+        logger.info("No active searches found")
+    else:
+        logger.info(f"Found {len(active_searches)} active searches, planned {len(plan)} crawls")
+    return len(active_searches), plan
+
+def _enqueue_active_searches(session_factory: sessionmaker) -> Tuple[int, Dict[str, int]]:
+    """Plan the active searches into the job queue; returns the crawls queued and queue stats.
+    
+    Blocks on the database and Redis, so async callers should use asyncio.to_thread.
+    """
+    _, plan = _plan_active_searches(session_factory)
+    queue = RedisJobQueue()
+    for search_id, member_ids in plan:
+        enqueue_crawl(queue, search_id, member_ids)
+    return len(plan), queue.stats()
+
+async def _run_crawl(session_factory: sessionmaker, search_id: int, member_ids: List[int],
+                     queue: asyncio.Queue, summary: Dict[str, Any]) -> None:
+    """Run one planned crawl for the worker pool and fold its outcome into the summary"""
+    try:
+        result = await crawl_search(session_factory, search_id, member_ids)
+    except asyncio.TimeoutError:
+        summary['crawls'] += 1
+        summary['timed_out'] += 1
+        return
+    except Exception:
+        summary['crawls'] += 1
+        summary['failed'] += 1
+        return
+    if result is None:
+        return
+    
+    summary['crawls'] += 1
+    summary['succeeded'] += 1
+    summary['pages_scraped'] += result['pages_scraped']
+    summary['cars_found'] += result['cars_found']
+    summary['cars_new'] += result['cars_new']
+    
+    # A capped crawl did not see all results, so its members need their own
+    if result.get('pages_capped'):
+        for member_id in member_ids:
+            queue.put_nowait((member_id, []))
+
+async def crawl_search(session_factory: sessionmaker, search_id: int,
+                       member_ids: Optional[List[int]] = None,
+                       log_id: Optional[int] = None) -> Optional[Dict[str, Any]]:
+    """Crawl one planned search in its own session, within the per-search timeout.
+    
+    Returns the scrape result, or None if the search no longer exists;
+    failures and timeouts are logged and re-raised. log_id is the queued
+    ScrapingLog of a background job, if any.
+    """
+    db = session_factory()
+    try:
+        search = db.query(Search).filter(Search.id == search_id).first()
+        if search is None:
+            return None
+        members = db.query(Search).filter(Search.id.in_(member_ids)).all() if member_ids else []
         
-        logger.info("Completed scheduled scraping for all searches")
+        logger.info(f"Starting scraping for search: {search.name}"
+                    + (f" (covering {len(members)} more)" if members else ""))
+        scraper = AutoScout24Scraper(db)
+        try:
+            result = await asyncio.wait_for(
+                scraper.scrape_search(search, members=members, log_id=log_id),
+                timeout=settings.search_timeout_minutes * 60
+            )
+        except asyncio.TimeoutError:
+            logger.error(f"Scraping search {search.name} timed out after {settings.search_timeout_minutes} minutes")
+            # The cancelled run has closed its log and is done with the session
+            if scraper.log_entry is not None:
+                scraper.log_entry.error_message = f"Timed out after {settings.search_timeout_minutes} minutes"
+                db.commit()
+            raise
+        except Exception as e:
+            logger.error(f"Error scraping search {search.name}: {e}")
+            raise
         
-    except Exception as e:
-        logger.error(f"Error in scheduled scraping: {e}")
+        logger.info(f"Completed scraping for search {search.name}: {result}")
+        return result
     finally:
         db.close()
 
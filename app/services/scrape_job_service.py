@@ -0,0 +1,193 @@
+from sqlalchemy.orm import Session
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+import asyncio
+import logging
+import math
+
+from app.core.config import settings
+from app.models.models import ScrapePageMetric, ScrapingLog, Search
+from app.models.schemas import ScrapeJobProgress, ScrapeJobResponse, ScrapePageProfile, ScrapeRunProfile
+from app.services.job_queue import RedisJobQueue, enqueue_crawl
+from app.services.scheduler import SessionLocal, crawl_search
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = ('queued', 'running')
+
+# Background runs started by this process, by search ID. Holding the task
+# keeps it from being garbage collected while it runs.
+_tasks: Dict[int, asyncio.Task] = {}
+
+class ScrapeJobService:
+    """Manual scrape runs as background jobs, tracked through their ScrapingLog"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    async def start_search_run(self, search_id: int) -> Tuple[ScrapeJobResponse, bool]:
+        """Queue a run of a search unless one is already active.
+
+        Returns the job and whether it was newly created. If the job cannot
+        be queued, its log is marked failed and the error re-raised.
+        """
+        search = self.db.query(Search).filter(Search.id == search_id).first()
+        if not search:
+            raise ValueError(f"Search with ID {search_id} not found")
+
+        active = self._active_job(search_id)
+        if active is not None:
+            logger.info(f"Search {search.name} already has job {active.id} {active.status}, not starting another")
+            return self._job_response(active, deduplicated=True), False
+
+        log_entry = ScrapingLog(search_id=search_id, status='queued', started_at=datetime.now())
+        self.db.add(log_entry)
+        self.db.commit()
+
+        if settings.job_queue_enabled:
+            try:
+                await asyncio.to_thread(enqueue_crawl, RedisJobQueue(), search_id, log_id=log_entry.id)
+            except Exception as e:
+                logger.error(f"Could not queue scraping job {log_entry.id} for search {search.name}: {e}")
+                self._fail_job(log_entry, f"Could not queue job: {e}")
+                raise
+        else:
+            task = asyncio.create_task(self._run(search_id, log_entry.id))
+            _tasks[search_id] = task
+            task.add_done_callback(lambda _: _tasks.pop(search_id, None))
+
+        logger.info(f"Queued scraping job {log_entry.id} for search {search.name}")
+        return self._job_response(log_entry), True
+
+    def get_job(self, job_id: int) -> Optional[ScrapeJobResponse]:
+        log_entry = self.db.query(ScrapingLog).filter(ScrapingLog.id == job_id).first()
+        if log_entry is None:
+            return None
+        return self._job_response(log_entry)
+
+    def get_progress(self, job_id: int) -> Optional[ScrapeJobProgress]:
+        log_entry = self.db.query(ScrapingLog).filter(ScrapingLog.id == job_id).first()
+        if log_entry is None:
+            return None
+        end = log_entry.completed_at or datetime.now()
+        elapsed = (end.replace(tzinfo=None) - log_entry.started_at.replace(tzinfo=None)).total_seconds()
+        pages = log_entry.pages_scraped or 0
+        return ScrapeJobProgress(
+            job_id=log_entry.id,
+            status=log_entry.status,
+            done=log_entry.status not in ACTIVE_STATUSES,
+            last_page=log_entry.last_page,
+            pages_scraped=pages,
+            cars_found=log_entry.cars_found or 0,
+            elapsed_seconds=round(elapsed, 1),
+            pages_per_minute=round(pages / elapsed * 60, 1) if elapsed > 0 else 0.0
+        )
+
+    def get_run_profile(self, run_id: int) -> Optional[ScrapeRunProfile]:
+        """Where a run's time went: fetch, parse and DB write metrics per page and overall"""
+        log_entry = self.db.query(ScrapingLog).filter(ScrapingLog.id == run_id).first()
+        if log_entry is None:
+            return None
+        pages = self.db.query(ScrapePageMetric).filter(
+            ScrapePageMetric.scraping_log_id == run_id
+        ).order_by(ScrapePageMetric.id).all()
+
+        fetch_times = [page.fetch_seconds for page in pages if page.fetch_seconds is not None]
+        parse_times = [page.parse_seconds for page in pages if page.parse_seconds is not None]
+        write_times = [page.write_seconds for page in pages if page.write_seconds is not None]
+        listings = [page.listings for page in pages if page.listings is not None]
+        response_bytes = sum(page.response_bytes or 0 for page in pages)
+
+        return ScrapeRunProfile(
+            run_id=log_entry.id,
+            search_id=log_entry.search_id,
+            status=log_entry.status,
+            duration_seconds=log_entry.duration_seconds,
+            pages_scraped=log_entry.pages_scraped or 0,
+            requests_made=log_entry.requests_made or 0,
+            retries=sum((page.attempts or 1) - 1 for page in pages),
+            fetch={
+                'pages': len(pages),
+                'not_modified': sum(1 for page in pages if page.not_modified),
+                'p50_seconds': _percentile(fetch_times, 50),
+                'p90_seconds': _percentile(fetch_times, 90),
+                'p99_seconds': _percentile(fetch_times, 99),
+                'max_seconds': round(max(fetch_times), 4) if fetch_times else None,
+                'total_bytes': response_bytes,
+                'avg_bytes': round(response_bytes / len(pages)) if pages else 0,
+            },
+            parse={
+                'pages': len(parse_times),
+                **_totals(parse_times),
+                'listings': sum(listings),
+                'listings_per_page': round(sum(listings) / len(listings), 1) if listings else 0.0,
+            },
+            write={'pages': len(write_times), **_totals(write_times)},
+            stages=log_entry.stage_metrics,
+            pages=[ScrapePageProfile.model_validate(page) for page in pages]
+        )
+
+    def _active_job(self, search_id: int) -> Optional[ScrapingLog]:
+        """A queued or running job of the search, ignoring ones stuck past the search timeout"""
+        if search_id in _tasks:
+            # Started here: trust the task over the log's timestamps
+            return self.db.query(ScrapingLog).filter(
+                ScrapingLog.search_id == search_id,
+                ScrapingLog.status.in_(ACTIVE_STATUSES)
+            ).order_by(ScrapingLog.id.desc()).first()
+
+        cutoff = datetime.now() - timedelta(minutes=settings.search_timeout_minutes)
+        return self.db.query(ScrapingLog).filter(
+            ScrapingLog.search_id == search_id,
+            ScrapingLog.status.in_(ACTIVE_STATUSES),
+            ScrapingLog.started_at >= cutoff
+        ).order_by(ScrapingLog.id.desc()).first()
+
+    def _fail_job(self, log_entry: ScrapingLog, message: str) -> None:
+        """Close the log of a job that never started"""
+        now = datetime.now()
+        log_entry.status = 'failed'
+        log_entry.error_message = message
+        log_entry.completed_at = now
+        log_entry.duration_seconds = (now - log_entry.started_at.replace(tzinfo=None)).total_seconds()
+        self.db.commit()
+
+    @staticmethod
+    async def _run(search_id: int, log_id: int) -> None:
+        try:
+            await crawl_search(SessionLocal, search_id, log_id=log_id)
+        except Exception as e:
+            # crawl_search has logged it and closed the ScrapingLog
+            logger.error(f"Scraping job {log_id} failed: {e}")
+
+    @staticmethod
+    def _job_response(log_entry: ScrapingLog, deduplicated: bool = False) -> ScrapeJobResponse:
+        return ScrapeJobResponse(
+            job_id=log_entry.id,
+            search_id=log_entry.search_id,
+            status=log_entry.status,
+            crawl_mode=log_entry.crawl_mode,
+            started_at=log_entry.started_at,
+            completed_at=log_entry.completed_at,
+            pages_scraped=log_entry.pages_scraped or 0,
+            cars_found=log_entry.cars_found or 0,
+            cars_new=log_entry.cars_new or 0,
+            cars_updated=log_entry.cars_updated or 0,
+            error_message=log_entry.error_message,
+            deduplicated=deduplicated
+        )
+
+def _percentile(values: List[float], percent: float) -> Optional[float]:
+    """Nearest-rank percentile, None for no values"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(percent / 100 * len(ordered)))
+    return round(ordered[rank - 1], 4)
+
+def _totals(values: List[float]) -> Dict[str, Any]:
+    total = sum(values)
+    return {
+        'total_seconds': round(total, 4),
+        'avg_seconds': round(total / len(values), 4) if values else None,
+    }
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Scrape worker consuming crawl jobs from the Redis job queue.
+
+Run any number of these, on any node sharing the database and Redis:
+    python -m app.services.scrape_worker
+"""
+
+import asyncio
+import logging
+import signal
+from typing import Optional
+
+from sqlalchemy.orm import sessionmaker
+
+from app.services.job_queue import CRAWL_JOB, Job, RedisJobQueue, enqueue_crawl
+from app.services.scheduler import SessionLocal, crawl_search
+
+logger = logging.getLogger(__name__)
+
+async def _keep_leased(queue: RedisJobQueue, job: Job, crawl: asyncio.Task) -> None:
+    """Renew the job's lease while it runs so no other worker picks it up.
+
+    Once the lease is lost the job may already be running elsewhere, so
+    the crawl is cancelled rather than left to run twice.
+    """
+    while True:
+        await asyncio.sleep(queue.visibility_timeout / 3)
+        if not await asyncio.to_thread(queue.extend, job):
+            logger.warning(f"Lost the lease on job {job.id}, cancelling its crawl")
+            crawl.cancel()
+            return
+
+async def process_job(queue: RedisJobQueue, job: Job, session_factory: sessionmaker = SessionLocal) -> None:
+    """Run one claimed job, then acknowledge or fail it"""
+    if job.kind != CRAWL_JOB:
+        await asyncio.to_thread(queue.fail, job, f"Unknown job kind {job.kind!r}")
+        return
+
+    crawl = asyncio.create_task(crawl_search(
+        session_factory, job.payload['search_id'], job.payload.get('member_ids'), job.payload.get('log_id')
+    ))
+    heartbeat = asyncio.create_task(_keep_leased(queue, job, crawl))
+    try:
+        result = await crawl
+    except BaseException as e:
+        heartbeat.cancel()
+        if heartbeat.done() and not heartbeat.cancelled():
+            # The heartbeat gave up the job: it is another worker's to finish
+            return
+        await asyncio.to_thread(queue.fail, job, str(e) or type(e).__name__)
+        if not isinstance(e, Exception):
+            raise
+        return
+    heartbeat.cancel()
+
+    # A capped crawl did not see all results, so its members need their own
+    if result is not None and result.get('pages_capped'):
+        for member_id in job.payload.get('member_ids', []):
+            await asyncio.to_thread(enqueue_crawl, queue, member_id)
+    await asyncio.to_thread(queue.complete, job)
+
+async def run_worker(queue: Optional[RedisJobQueue] = None, session_factory: sessionmaker = SessionLocal,
+                     stop: Optional[asyncio.Event] = None, poll_interval: float = 1.0) -> None:
+    """Claim and run jobs until stop is set"""
+    queue = queue or RedisJobQueue()
+    stop = stop or asyncio.Event()
+    logger.info(f"Scrape worker started on queue {queue.pending_key}")
+    while not stop.is_set():
+        job = await asyncio.to_thread(queue.claim)
+        if job is None:
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            continue
+        logger.info(f"Claimed job {job.id} ({job.kind}, attempt {job.attempts}): {job.payload}")
+        await process_job(queue, job, session_factory)
+    logger.info("Scrape worker stopped")
+
+async def main() -> None:
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    await run_worker(stop=stop)
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    asyncio.run(main())
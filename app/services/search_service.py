@@ -4,7 +4,6 @@ import logging
 
 from app.models.models import Search
 from app.models.schemas import SearchCreate, SearchUpdate, SearchResponse
-from app.scraping.autoscout24_scraper import AutoScout24Scraper
 
 logger = logging.getLogger(__name__)
 
@@ -65,15 +64,3 @@ class SearchService:
         
         logger.info(f"Deleted search: {search.name} (ID: {search.id})")
         return True
-
-    async def run_search_scraping(self, search_id: int) -> dict:
-        """Manually trigger scraping for a specific search"""
-        search = self.db.query(Search).filter(Search.id == search_id).first()
-        if not search:
-            raise ValueError(f"Search with ID {search_id} not found")
-
-        scraper = AutoScout24Scraper(self.db)
-        result = await scraper.scrape_search(search)
-        
-        logger.info(f"Manual scraping completed for search {search.name}: {result}")
-        return result
\ No newline at end of file
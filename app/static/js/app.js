@@ -562,9 +562,17 @@ async function runSearchScraping(searchId) {
         
         if (!response.ok) throw new Error('Failed to run scraping');
         
-        const result = await response.json();
+        // Scraping runs in the background: poll the job until it finishes
+        const job = await response.json();
+        if (job.deduplicated) {
+            showLoading('Scraping già in corso per questa ricerca...');
+        }
+        await waitForScrapingJob(job.job_id);
+        
+        const result = await (await fetch(`${API_BASE}/scraping/jobs/${job.job_id}`)).json();
         hideLoading();
         
+        if (result.status === 'failed') throw new Error(result.error_message || 'Scraping failed');
         showAlert(`Scraping completato: ${result.cars_found} auto trovate, ${result.cars_new} nuove`, 'success');
         
         // Refresh data
@@ -580,6 +588,20 @@ async function runSearchScraping(searchId) {
     }
 }
 
+// Poll a background scraping job until it is done
+async function waitForScrapingJob(jobId) {
+    while (true) {
+        await new Promise(resolve => setTimeout(resolve, 2000));
+        const response = await fetch(`${API_BASE}/scraping/jobs/${jobId}/progress`);
+        if (!response.ok) throw new Error('Failed to get scraping progress');
+        
+        const progress = await response.json();
+        if (progress.done) return progress;
+        document.getElementById('loading-message').textContent =
+            `Scraping in corso: ${progress.pages_scraped} pagine, ${progress.cars_found} auto trovate...`;
+    }
+}
+
 // Run general search
 async function runSearch() {
     await applyFilters();
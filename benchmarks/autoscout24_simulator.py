@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for AutoScout24 result pages, for load-testing the scraper.
+
+Serves deterministic synthetic listings at /risultati in the markup the
+scraper's selectors expect, with configurable page count, latency, 429
+injection and layout variants. The pricefrom/priceto/yearfrom/yearto
+filters narrow the result set. Listing detail pages answer 200 while the
+listing is live and 410 once it is sold.
+
+Usage:
+    python -m benchmarks.autoscout24_simulator --port 8900 --results 1000 --latency-ms 80
+"""
+
+import argparse
+import asyncio
+import functools
+import hashlib
+import json
+import random
+from typing import Dict, List, Optional, Tuple
+
+import aiohttp
+from aiohttp import web
+
+# 'nextjs' embeds the listings as __NEXT_DATA__ JSON next to classic markup
+LAYOUTS = ('classic', 'article', 'nextjs')
+
+BRANDS = [
+    ('BMW', ['Serie 3', 'X1', 'X3', 'X5']),
+    ('Audi', ['A3', 'A4', 'A6', 'Q5']),
+    ('Fiat', ['Panda', 'Tipo', 'Punto']),
+    ('Volkswagen', ['Golf', 'Polo', 'Tiguan', 'Passat']),
+    ('Toyota', ['Yaris', 'Corolla', 'RAV4']),
+    ('Renault', ['Clio', 'Captur', 'Megane']),
+]
+FUELS = ['Benzina', 'Diesel', 'GPL', 'Ibrida', 'Elettrica']
+TRANSMISSIONS = ['Manuale', 'Automatico']
+LOCATIONS = [('Milano', 'Lombardia'), ('Roma', 'Lazio'), ('Torino', 'Piemonte'),
+             ('Napoli', 'Campania'), ('Bologna', 'Emilia-Romagna')]
+SELLER_TYPES = ['Dealer', 'Private']
+
+class SimulatorConfig:
+    """Knobs for the simulated site"""
+
+    def __init__(self, results: int = 1000, per_page: int = 20, latency_ms: float = 0.0,
+                 latency_jitter_ms: float = 0.0, rate_limit_probability: float = 0.0,
+                 retry_after: int = 1, layout: str = 'classic', etag: bool = False,
+                 unlisted: int = 0, fail_pages=(), seed: int = 42):
+        self.results = results
+        # Listings past the result set whose detail pages are still live
+        self.unlisted = unlisted
+        # Result pages answered with 503, to simulate a run dying part-way
+        self.fail_pages = set(fail_pages)
+        self.per_page = per_page
+        self.latency_ms = latency_ms
+        self.latency_jitter_ms = latency_jitter_ms
+        self.rate_limit_probability = rate_limit_probability
+        self.retry_after = retry_after
+        self.layout = layout
+        self.etag = etag
+        self.seed = seed
+
+    @property
+    def pages(self) -> int:
+        return max(1, -(-self.results // self.per_page))
+
+def listing_id(seed: int, index: int) -> str:
+    return hashlib.md5(f"{seed}-{index}".encode()).hexdigest()[:12]
+
+def make_listing(seed: int, index: int) -> dict:
+    """Deterministic synthetic listing for a result position"""
+    rng = random.Random(seed * 1_000_003 + index)
+    brand, models = rng.choice(BRANDS)
+    kw = rng.randint(50, 220)
+    return {
+        'id': listing_id(seed, index),
+        'brand': brand,
+        'model': rng.choice(models),
+        'year': rng.randint(2005, 2024),
+        'mileage': rng.randint(1, 300) * 1000,
+        'price': rng.randint(20, 800) * 100,
+        'fuel': rng.choice(FUELS),
+        'kw': kw,
+        'cv': round(kw * 1.36),
+        'transmission': rng.choice(TRANSMISSIONS),
+        'location': rng.choice(LOCATIONS),
+        'seller_type': rng.choice(SELLER_TYPES),
+    }
+
+def listing_json(listing: dict) -> dict:
+    """A listing shaped like AutoScout24's Next.js page state"""
+    slug = f"{listing['brand']}-{listing['model']}".lower()
+    city, region = listing['location']
+    return {
+        'id': listing['id'],
+        'url': f"/auto/{slug}/{listing['id']}",
+        'vehicle': {
+            'make': listing['brand'],
+            'model': listing['model'],
+            'modelVersionInput': 'Business',
+            'fuel': listing['fuel'],
+            'transmission': listing['transmission'],
+            'mileageInKm': f"{listing['mileage']:,} km".replace(',', '.'),
+        },
+        'price': {'priceFormatted': f"€ {listing['price']:,},-".replace(',', '.', 1)},
+        'tracking': {
+            'price': str(listing['price']),
+            'mileage': str(listing['mileage']),
+            'firstRegistration': f"03-{listing['year']}",
+        },
+        'vehicleDetails': [{'data': f"{listing['kw']} kW ({listing['cv']} CV)"}],
+        'location': {'city': city, 'region': region, 'countryCode': 'IT'},
+        'seller': {'type': listing['seller_type']},
+    }
+
+def render_listing(listing: dict, layout: str) -> str:
+    slug = f"{listing['brand']}-{listing['model']}".lower()
+    href = f"/auto/{slug}/{listing['id']}"
+    title = f"{listing['brand']} {listing['model']} Business"
+    price = f"{listing['price']:,}".replace(',', '.')
+    mileage = f"{listing['mileage']:,}".replace(',', '.')
+    specs = (f"<ul><li>{mileage} km</li><li>{listing['fuel']}</li>"
+             f"<li>{listing['kw']} kW ({listing['cv']} CV)</li><li>{listing['transmission']}</li>"
+             f"<li>Immatricolazione 03/{listing['year']}</li></ul>")
+    if layout == 'article':
+        return (f'<article class="cldt-summary-full-item listing-card" id="{listing["id"]}">'
+                f'<a href="{href}"><h3>{title}</h3></a>'
+                f'<p data-testid="price">€ {price},-</p>{specs}</article>')
+    return (f'<div data-item-name="result-item" data-id="{listing["id"]}">'
+            f'<a href="{href}"><h2>{title}</h2></a>'
+            f'<span class="price">€ {price},-</span>{specs}</div>')
+
+# Range filters the simulator honours: query parameter -> (listing field, is lower bound)
+RANGE_FILTERS = {
+    'pricefrom': ('price', True),
+    'priceto': ('price', False),
+    'yearfrom': ('year', True),
+    'yearto': ('year', False),
+}
+
+@functools.lru_cache(maxsize=4)
+def all_listings(seed: int, results: int) -> Tuple[dict, ...]:
+    return tuple(make_listing(seed, index) for index in range(results))
+
+def matching_listings(config: SimulatorConfig, filters: Dict[str, int]) -> List[dict]:
+    """The result set narrowed by price/year range filters"""
+    listings = all_listings(config.seed, config.results)
+    for param, bound in filters.items():
+        field, lower = RANGE_FILTERS[param]
+        listings = [listing for listing in listings
+                    if (listing[field] >= bound if lower else listing[field] <= bound)]
+    return list(listings)
+
+def render_page(config: SimulatorConfig, page: int, filters: Optional[Dict[str, int]] = None) -> str:
+    first = (page - 1) * config.per_page
+    if filters:
+        matching = matching_listings(config, filters)
+        results = len(matching)
+        listings: List[dict] = matching[first:first + config.per_page]
+    else:
+        results = config.results
+        listings = [
+            make_listing(config.seed, index)
+            for index in range(first, min(first + config.per_page, config.results))
+        ] if page <= config.pages else []
+    pages = max(1, -(-results // config.per_page))
+
+    items = ''.join(render_listing(listing, config.layout) for listing in listings)
+    if config.layout == 'nextjs':
+        state = {'props': {'pageProps': {
+            'listings': [listing_json(listing) for listing in listings],
+            'numberOfResults': results,
+            'numberOfPages': pages,
+        }}}
+        items += f'<script id="__NEXT_DATA__" type="application/json">{json.dumps(state)}</script>'
+    total = f"{results:,}".replace(',', '.')
+    pagination = '<nav class="pagination">'
+    if page < pages:
+        pagination += f'<a aria-label="Next page" href="/risultati?page={page + 1}">Successiva</a>'
+    pagination += '</nav>'
+    return (f'<!DOCTYPE html><html><head><title>Auto usate</title></head><body>'
+            f'<header><h1>{total} risultati</h1></header>'
+            f'<main>{items}</main>{pagination}</body></html>')
+
+def create_app(config: SimulatorConfig) -> web.Application:
+    rng = random.Random(config.seed)
+
+    async def results(request: web.Request) -> web.Response:
+        if config.latency_ms or config.latency_jitter_ms:
+            delay = config.latency_ms + rng.uniform(0, config.latency_jitter_ms)
+            await asyncio.sleep(delay / 1000)
+
+        if config.rate_limit_probability and rng.random() < config.rate_limit_probability:
+            request.app['stats']['rate_limited'] += 1
+            return web.Response(status=429, headers={'Retry-After': str(config.retry_after)})
+
+        page = int(request.query.get('page', '1'))
+        if page in config.fail_pages:
+            return web.Response(status=503)
+        request.app['stats']['pages_served'] += 1
+        filters = {param: int(request.query[param]) for param in RANGE_FILTERS if param in request.query}
+        shard = '-'.join(f"{param}{value}" for param, value in sorted(filters.items()))
+        etag = f'"{config.seed}-{config.layout}-{shard}-{page}"' if config.etag else None
+        if etag and request.headers.get('If-None-Match') == etag:
+            return web.Response(status=304, headers={'ETag': etag})
+
+        headers = {'ETag': etag} if etag else {}
+        return web.Response(text=render_page(config, page, filters), content_type='text/html', headers=headers)
+
+    async def detail(request: web.Request) -> web.Response:
+        request.app['stats']['details_served'] += 1
+        live = {listing_id(config.seed, index) for index in range(config.results + config.unlisted)}
+        if request.match_info['listing_id'] not in live:
+            return web.Response(status=410)
+        return web.Response(text='<!DOCTYPE html><html><body></body></html>', content_type='text/html')
+
+    app = web.Application()
+    app['stats'] = {'pages_served': 0, 'rate_limited': 0, 'details_served': 0}
+    app.router.add_get('/risultati', results)
+    app.router.add_get('/auto/{slug}/{listing_id}', detail)
+    return app
+
+async def start_simulator(config: SimulatorConfig, host: str = '127.0.0.1', port: int = 0):
+    """Start the simulator on the running loop; returns (runner, base_url)"""
+    runner = web.AppRunner(create_app(config), access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    bound_port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://{host}:{bound_port}"
+
+async def start_forward_proxy(host: str = '127.0.0.1', port: int = 0, latency_ms: float = 0.0,
+                              fail_status: Optional[int] = None):
+    """Start a plain HTTP forward proxy on the running loop; returns (runner, proxy_url).
+
+    Stands in for a proxy exit: it relays absolute-URI requests, optionally
+    slower or answering every request with fail_status instead.
+    """
+    async def relay(request: web.Request) -> web.Response:
+        request.app['stats']['requests'] += 1
+        if latency_ms:
+            await asyncio.sleep(latency_ms / 1000)
+        if fail_status is not None:
+            return web.Response(status=fail_status)
+        async with request.app['client'].request(request.method, str(request.url),
+                                                 allow_redirects=False) as upstream:
+            body = await upstream.read()
+            headers = {name: value for name, value in upstream.headers.items()
+                       if name.lower() in ('content-type', 'etag', 'last-modified', 'location', 'retry-after')}
+            return web.Response(status=upstream.status, body=body, headers=headers)
+
+    async def close_client(app: web.Application) -> None:
+        await app['client'].close()
+
+    app = web.Application()
+    app['stats'] = {'requests': 0}
+    app['client'] = aiohttp.ClientSession()
+    app.on_cleanup.append(close_client)
+    app.router.add_route('*', '/{path:.*}', relay)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    bound_port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://{host}:{bound_port}"
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument('--results', type=int, default=1000, help="Total listings in the result set")
+    parser.add_argument('--per-page', type=int, default=20)
+    parser.add_argument('--latency-ms', type=float, default=0.0, help="Fixed response latency")
+    parser.add_argument('--latency-jitter-ms', type=float, default=0.0, help="Extra random latency")
+    parser.add_argument('--rate-limit-probability', type=float, default=0.0, help="Share of requests answered 429")
+    parser.add_argument('--retry-after', type=int, default=1, help="Retry-After seconds sent with 429s")
+    parser.add_argument('--layout', choices=LAYOUTS, default='classic')
+    parser.add_argument('--etag', action='store_true', help="Send ETags and answer conditional GETs with 304")
+    parser.add_argument('--seed', type=int, default=42)
+
+def config_from_args(args: argparse.Namespace) -> SimulatorConfig:
+    return SimulatorConfig(
+        results=args.results,
+        per_page=args.per_page,
+        latency_ms=args.latency_ms,
+        latency_jitter_ms=args.latency_jitter_ms,
+        rate_limit_probability=args.rate_limit_probability,
+        retry_after=args.retry_after,
+        layout=args.layout,
+        etag=args.etag,
+        seed=args.seed
+    )
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Local AutoScout24 result-page simulator")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8900)
+    add_arguments(parser)
+    args = parser.parse_args(argv)
+
+    print(f"Serving simulated AutoScout24 on http://{args.host}:{args.port}/risultati")
+    web.run_app(create_app(config_from_args(args)), host=args.host, port=args.port, print=None)
+
+if __name__ == "__main__":
+    main()
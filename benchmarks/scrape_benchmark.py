@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Throughput benchmark for AutoScout24Scraper against the local simulator.
+
+Runs one full scrape_search against a simulator in a separate process and a
+throwaway SQLite database (or --database-url), then reports pages/sec,
+listings/sec, DB writes/sec and peak RSS.
+
+Usage:
+    python -m benchmarks.scrape_benchmark --results 1000 --latency-ms 80 --rate 20
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import resource
+import socket
+import sys
+import tempfile
+import time
+import urllib.request
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from benchmarks.autoscout24_simulator import add_arguments, config_from_args, create_app
+
+def _run_simulator(config, port: int) -> None:
+    from aiohttp import web
+    web.run_app(create_app(config), host='127.0.0.1', port=port, print=None, access_log=None)
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def _wait_until_up(base_url: str, timeout: float = 10.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(f"{base_url}/risultati?page=1", timeout=1).read()
+            return
+        except Exception:
+            time.sleep(0.1)
+    raise RuntimeError(f"Simulator at {base_url} did not start")
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+async def run_benchmark(args: argparse.Namespace, base_url: str) -> dict:
+    from app.core.config import settings
+    from app.core.database import Base
+    from app.models.models import Search
+    from app.scraping.autoscout24_scraper import AutoScout24Scraper
+
+    settings.autoscout24_base_url = base_url
+    settings.rate_limit_per_second = args.rate
+    settings.rate_limit_max_per_second = max(args.rate, settings.rate_limit_max_per_second)
+    settings.rate_limit_burst = args.burst
+    settings.max_requests_in_flight = args.in_flight
+    settings.page_concurrency = args.page_concurrency
+    settings.http_cache_enabled = args.http_cache
+    settings.page_archive_enabled = args.archive
+
+    workdir = tempfile.mkdtemp(prefix='carscraping-bench-')
+    settings.cache_dir = os.path.join(workdir, 'cache')
+    settings.archive_dir = os.path.join(workdir, 'archive')
+    database_url = args.database_url or f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+
+    engine = create_engine(database_url)
+    Base.metadata.create_all(bind=engine)
+
+    db_writes = {'count': 0}
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def count_writes(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().split(' ', 1)[0].upper() in ('INSERT', 'UPDATE', 'DELETE'):
+            db_writes['count'] += len(parameters) if executemany else 1
+
+    db = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    try:
+        search = Search(name='Benchmark', brand='BMW')
+        db.add(search)
+        db.commit()
+
+        runs = []
+        for run_no in range(1, args.runs + 1):
+            writes_before = db_writes['count']
+            started = time.perf_counter()
+            result = await AutoScout24Scraper(db).scrape_search(search)
+            elapsed = time.perf_counter() - started
+            writes = db_writes['count'] - writes_before
+            runs.append({
+                'run': run_no,
+                'seconds': round(elapsed, 3),
+                'pages': result['pages_scraped'],
+                'listings': result['cars_found'],
+                'requests': result['requests_made'],
+                'pages_per_sec': round(result['pages_scraped'] / elapsed, 2),
+                'listings_per_sec': round(result['cars_found'] / elapsed, 2),
+                'db_writes': writes,
+                'db_writes_per_sec': round(writes / elapsed, 2),
+                'final_rate': result.get('request_rate'),
+                'stages': result.get('stages'),
+            })
+    finally:
+        db.close()
+        engine.dispose()
+
+    return {'runs': runs, 'peak_rss_mb': round(_peak_rss_mb(), 1)}
+
+def print_report(report: dict) -> None:
+    columns = ['run', 'seconds', 'pages', 'listings', 'requests', 'pages_per_sec',
+               'listings_per_sec', 'db_writes', 'db_writes_per_sec', 'final_rate']
+    print("  ".join(f"{column:>16}" for column in columns))
+    for run in report['runs']:
+        print("  ".join(f"{str(run[column]):>16}" for column in columns))
+    print(f"Peak RSS: {report['peak_rss_mb']} MB")
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark AutoScout24Scraper against the local simulator")
+    add_arguments(parser)
+    parser.add_argument('--runs', type=int, default=1, help="Consecutive scrape_search runs (later runs hit stored cars)")
+    parser.add_argument('--rate', type=float, default=50.0, help="Initial host rate limit (req/s)")
+    parser.add_argument('--burst', type=int, default=10)
+    parser.add_argument('--in-flight', type=int, default=8)
+    parser.add_argument('--page-concurrency', type=int, default=8)
+    parser.add_argument('--http-cache', action='store_true', help="Enable the conditional-GET cache")
+    parser.add_argument('--archive', action='store_true', help="Enable the raw page archive")
+    parser.add_argument('--database-url', help="Benchmark against this database instead of a temp SQLite file")
+    parser.add_argument('--json', action='store_true', help="Print the report as JSON")
+    args = parser.parse_args()
+
+    port = _free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    simulator = multiprocessing.Process(target=_run_simulator, args=(config_from_args(args), port), daemon=True)
+    simulator.start()
+    try:
+        _wait_until_up(base_url)
+        report = asyncio.run(run_benchmark(args, base_url))
+    finally:
+        simulator.terminate()
+        simulator.join()
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -58,8 +58,8 @@ class TestCarScraping:
             "uvicorn",
             "sqlalchemy", 
             "psycopg2-binary",
-            "requests",
-            "beautifulsoup4",
+            "aiohttp",
+            "lxml",
             "jinja2",
             "pydantic-settings"
         ]
@@ -0,0 +1,230 @@
+import asyncio
+import threading
+import time
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import settings
+from app.core.database import Base
+from app.models.models import Search
+from app.services import scheduler, scrape_worker
+from app.services.job_queue import RedisJobQueue, enqueue_crawl
+from app.services.scrape_worker import process_job
+
+class FakeRedis:
+    """In-process stand-in for the Redis commands the job queue uses"""
+
+    def __init__(self):
+        self.data = {}
+
+    def pipeline(self):
+        return FakePipeline(self)
+
+    def _list(self, key):
+        return self.data.setdefault(key, [])
+
+    def _zset(self, key):
+        return self.data.setdefault(key, {})
+
+    def _hash(self, key):
+        return self.data.setdefault(key, {})
+
+    def hset(self, key, field=None, value=None, mapping=None):
+        values = dict(mapping or {})
+        if field is not None:
+            values[field] = value
+        self._hash(key).update({name: str(item) for name, item in values.items()})
+        return len(values)
+
+    def hget(self, key, field):
+        return self.data.get(key, {}).get(field)
+
+    def hgetall(self, key):
+        return dict(self.data.get(key, {}))
+
+    def hincrby(self, key, field, amount=1):
+        value = int(self._hash(key).get(field, 0)) + amount
+        self._hash(key)[field] = str(value)
+        return value
+
+    def delete(self, key):
+        return int(self.data.pop(key, None) is not None)
+
+    def lpush(self, key, value):
+        self._list(key).insert(0, value)
+        return len(self._list(key))
+
+    def rpop(self, key):
+        items = self._list(key)
+        return items.pop() if items else None
+
+    def lindex(self, key, index):
+        items = self.data.get(key, [])
+        return items[index] if -len(items) <= index < len(items) else None
+
+    def lrange(self, key, start, end):
+        items = self.data.get(key, [])
+        return items[start:None if end == -1 else end + 1]
+
+    def llen(self, key):
+        return len(self.data.get(key, []))
+
+    def zadd(self, key, mapping, xx=False, ch=False):
+        zset = self._zset(key)
+        counted = 0
+        for member, score in mapping.items():
+            if xx and member not in zset:
+                continue
+            counted += member not in zset or (ch and zset[member] != score)
+            zset[member] = score
+        return counted
+
+    def zrem(self, key, member):
+        return int(self._zset(key).pop(member, None) is not None)
+
+    def zrangebyscore(self, key, low, high):
+        return [member for member, score in sorted(self._zset(key).items(), key=lambda item: item[1])
+                if low <= score <= high]
+
+    def zcard(self, key):
+        return len(self.data.get(key, {}))
+
+class FakePipeline:
+    """Runs commands immediately until multi(), then queues them for execute()"""
+
+    def __init__(self, client):
+        self.client = client
+        self.queued = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.queued = None
+
+    def watch(self, *keys):
+        pass
+
+    def multi(self):
+        self.queued = []
+
+    def execute(self):
+        results = [command() for command in self.queued or []]
+        self.queued = None
+        return results
+
+    def __getattr__(self, name):
+        command = getattr(self.client, name)
+
+        def call(*args, **kwargs):
+            if self.queued is None and name in ('lindex', 'hget', 'hgetall'):
+                return command(*args, **kwargs)
+            if self.queued is None:
+                self.queued = []
+            self.queued.append(lambda: command(*args, **kwargs))
+            return self
+        return call
+
+@pytest.fixture
+def queue():
+    return RedisJobQueue(FakeRedis(), name='test', visibility_timeout=60, max_attempts=2)
+
+class TestRedisJobQueue:
+    """Lease, retry and dead-letter behaviour"""
+
+    def test_claim_leases_jobs_in_order(self, queue):
+        first = queue.enqueue('crawl', {'search_id': 1})
+        queue.enqueue('crawl', {'search_id': 2})
+
+        job = queue.claim()
+
+        assert job.id == first and job.payload == {'search_id': 1} and job.attempts == 1
+        assert queue.stats() == {'pending': 1, 'leased': 1, 'dead': 0}
+        queue.complete(job)
+        assert queue.stats() == {'pending': 1, 'leased': 0, 'dead': 0}
+
+    def test_failed_jobs_retry_then_dead_letter(self, queue):
+        queue.enqueue('crawl', {'search_id': 1})
+
+        queue.fail(queue.claim(), 'boom')
+        retried = queue.claim()
+        queue.fail(retried, 'boom again')
+
+        assert retried.attempts == 2
+        assert queue.claim() is None
+        [dead] = queue.dead_letters()
+        assert dead['last_error'] == 'boom again'
+
+    def test_expired_lease_returns_job_to_pending(self, queue):
+        queue.enqueue('crawl', {'search_id': 1})
+        job = queue.claim()
+        # The worker died: its lease runs out without being renewed
+        queue.redis.zadd(queue.leases_key, {job.id: time.time() - 1})
+
+        reclaimed = queue.claim()
+
+        assert reclaimed.id == job.id and reclaimed.attempts == 2
+        assert queue.extend(reclaimed)
+
+    def test_worker_acknowledges_jobs_for_deleted_searches(self, queue, tmp_path):
+        engine = create_engine(f"sqlite:///{tmp_path / 'cars.db'}")
+        Base.metadata.create_all(bind=engine)
+        session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        db = session_factory()
+        search = Search(name='Test')
+        db.add(search)
+        db.commit()
+
+        # The search was deleted after the job was queued
+        enqueue_crawl(queue, search.id + 1)
+        asyncio.run(process_job(queue, queue.claim(), session_factory))
+
+        assert queue.stats() == {'pending': 0, 'leased': 0, 'dead': 0}
+
+    def test_scheduled_run_queues_planned_crawls_off_the_loop(self, queue, tmp_path, monkeypatch):
+        engine = create_engine(f"sqlite:///{tmp_path / 'cars.db'}")
+        Base.metadata.create_all(bind=engine)
+        session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        db = session_factory()
+        db.add_all([Search(name='BMW', brand='BMW'), Search(name='Audi', brand='Audi')])
+        db.commit()
+        threads = []
+
+        def connect():
+            threads.append(threading.get_ident())
+            return queue
+
+        monkeypatch.setattr(settings, 'scraping_enabled', True)
+        monkeypatch.setattr(settings, 'job_queue_enabled', True)
+        monkeypatch.setattr(scheduler, 'SessionLocal', session_factory)
+        monkeypatch.setattr(scheduler, 'RedisJobQueue', connect)
+        asyncio.run(scheduler.run_scheduled_scraping())
+
+        assert queue.stats() == {'pending': 2, 'leased': 0, 'dead': 0}
+        # Planning and the Redis calls ran in a worker thread
+        assert threads and threads[0] != threading.get_ident()
+
+    def test_worker_cancels_the_crawl_when_its_lease_is_lost(self, monkeypatch):
+        queue = RedisJobQueue(FakeRedis(), name='test', visibility_timeout=0.03, max_attempts=2)
+        enqueue_crawl(queue, 1)
+        job = queue.claim()
+        crawl = {'cancelled': False}
+
+        async def slow_crawl(session_factory, search_id, member_ids=None, log_id=None):
+            try:
+                await asyncio.sleep(5)
+            except asyncio.CancelledError:
+                crawl['cancelled'] = True
+                raise
+
+        # Another worker took the job over after the lease ran out
+        monkeypatch.setattr(queue, 'extend', lambda job: False)
+        monkeypatch.setattr(scrape_worker, 'crawl_search', slow_crawl)
+        started = time.monotonic()
+        asyncio.run(process_job(queue, job))
+
+        assert crawl['cancelled'] and time.monotonic() - started < 1
+        # Not failed or acknowledged: the job is the new owner's now
+        assert queue.stats() == {'pending': 0, 'leased': 1, 'dead': 0}
@@ -0,0 +1,47 @@
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import create_engine, inspect
+from sqlalchemy.orm import sessionmaker
+
+from app.core.database import Base
+from app.models.models import Car, ScrapePageMetric, ScrapingLog, Search
+
+def _alembic(url):
+    config = Config()
+    config.set_main_option('script_location', 'app/alembic')
+    config.set_main_option('sqlalchemy.url', url)
+    return config
+
+class TestMigrations:
+    """Alembic revisions against databases built by create_all"""
+
+    def test_upgrade_adds_new_columns_to_existing_tables(self, tmp_path):
+        url = f"sqlite:///{tmp_path / 'cars.db'}"
+        engine = create_engine(url)
+        Base.metadata.create_all(bind=engine)
+        config = _alembic(url)
+        # Back to the tables an install made before these columns existed
+        command.stamp(config, 'head')
+        command.downgrade(config, 'base')
+        assert 'delisted_at' not in {column['name'] for column in inspect(engine).get_columns('cars')}
+
+        command.upgrade(config, 'head')
+
+        db = sessionmaker(bind=engine)()
+        db.add(Search(name='Test'))
+        db.commit()
+        assert db.query(Car).first() is None
+        assert db.query(ScrapingLog).count() == 0 and db.query(ScrapePageMetric).count() == 0
+        assert 'ix_cars_is_available' in {index['name'] for index in inspect(engine).get_indexes('cars')}
+
+    def test_upgrade_is_a_no_op_on_current_tables(self, tmp_path):
+        url = f"sqlite:///{tmp_path / 'cars.db'}"
+        engine = create_engine(url)
+        Base.metadata.create_all(bind=engine)
+        columns = {table: [column['name'] for column in inspect(engine).get_columns(table)]
+                   for table in ('cars', 'scraping_logs')}
+
+        command.upgrade(_alembic(url), 'head')
+
+        assert columns == {table: [column['name'] for column in inspect(engine).get_columns(table)]
+                           for table in ('cars', 'scraping_logs')}
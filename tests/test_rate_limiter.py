@@ -0,0 +1,186 @@
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import pytest
+
+from app.core.config import settings
+from app.scraping import rate_limiter
+from app.scraping.rate_limiter import HostRateLimiter, TokenBucket, get_rate_limiter, host_rate, parse_retry_after
+
+class FakeClock:
+    """Stand-in for the time module, advanced by hand"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(rate_limiter, 'time', fake)
+    return fake
+
+@pytest.fixture(autouse=True)
+def aimd_settings(monkeypatch):
+    monkeypatch.setattr(settings, 'rate_limit_min_per_second', 0.5)
+    monkeypatch.setattr(settings, 'rate_limit_max_per_second', 8.0)
+    monkeypatch.setattr(settings, 'rate_limit_increase', 0.5)
+    monkeypatch.setattr(settings, 'rate_limit_decrease_factor', 0.5)
+    monkeypatch.setattr(settings, 'rate_limit_success_window', 3)
+    monkeypatch.setattr(settings, 'retry_after_max_seconds', 60)
+
+def _http_date(seconds_from_now):
+    return format_datetime(datetime.now(timezone.utc) + timedelta(seconds=seconds_from_now), usegmt=True)
+
+class TestTokenBucket:
+    """Burst capacity and sustained pacing"""
+
+    def test_burst_then_paced_at_rate(self, clock):
+        bucket = TokenBucket(rate=2.0, burst=3)
+
+        assert [bucket.try_take() for _ in range(3)] == [0.0, 0.0, 0.0]
+        assert bucket.try_take() == pytest.approx(0.5)
+        clock.advance(0.5)
+        assert bucket.try_take() == 0.0
+
+    def test_refill_stops_at_capacity(self, clock):
+        bucket = TokenBucket(rate=2.0, burst=2)
+        bucket.try_take()
+        clock.advance(60)
+
+        assert [bucket.try_take() for _ in range(2)] == [0.0, 0.0]
+        assert bucket.try_take() > 0
+
+    def test_rate_change_keeps_accrued_tokens(self, clock):
+        bucket = TokenBucket(rate=1.0, burst=1)
+        bucket.try_take()
+        clock.advance(0.5)
+
+        bucket.set_rate(10.0)
+
+        # Half a token accrued at the old rate, the other half at the new one
+        assert bucket.try_take() == pytest.approx(0.05)
+
+class TestParseRetryAfter:
+    """Delta-seconds and HTTP-date forms"""
+
+    def test_delta_seconds(self):
+        assert parse_retry_after('5') == 5.0
+        assert parse_retry_after(' 12 ') == 12.0
+
+    def test_http_date(self):
+        assert parse_retry_after(_http_date(30)) == pytest.approx(30, abs=2)
+        assert parse_retry_after(_http_date(-30)) == 0.0
+
+    def test_clamped_to_max(self):
+        assert parse_retry_after('3600') == 60.0
+        assert parse_retry_after(_http_date(3600)) == 60.0
+
+    def test_missing_or_malformed(self):
+        assert parse_retry_after(None) is None
+        assert parse_retry_after('') is None
+        assert parse_retry_after('soon') is None
+
+class TestHostRateLimiter:
+    """AIMD rate control, Retry-After pauses and the in-flight cap"""
+
+    def test_throttles_cut_once_per_token_interval(self, clock):
+        limiter = HostRateLimiter('example.com', rate=4.0, burst=1, max_in_flight=4)
+
+        limiter.record_throttle(429)
+        # Same overload, reported by requests that were already in flight
+        limiter.record_throttle(429)
+        assert limiter.rate == 2.0
+
+        clock.advance(0.5)
+        limiter.record_throttle(503)
+        assert limiter.rate == 1.0
+
+    def test_successes_recover_additively(self, clock):
+        limiter = HostRateLimiter('example.com', rate=2.0, burst=1, max_in_flight=4)
+
+        for _ in range(2):
+            limiter.record_success()
+        assert limiter.rate == 2.0
+        limiter.record_success()
+        assert limiter.rate == 2.5
+
+        # A throttle restarts the success window
+        limiter.record_success()
+        clock.advance(1)
+        limiter.record_throttle(429)
+        for _ in range(2):
+            limiter.record_success()
+        assert limiter.rate == 1.25
+
+    def test_rate_is_clamped(self, clock):
+        limiter = HostRateLimiter('example.com', rate=2.0, burst=1, max_in_flight=4)
+
+        for _ in range(10):
+            clock.advance(10)
+            limiter.record_throttle(429)
+        assert limiter.rate == 0.5
+
+        for _ in range(100):
+            limiter.record_success()
+        assert limiter.rate == 8.0
+
+    def test_retry_after_pauses_the_host(self, clock):
+        limiter = HostRateLimiter('example.com', rate=2.0, burst=1, max_in_flight=4)
+
+        limiter.record_throttle(429, parse_retry_after('10'))
+        assert 1010 <= limiter.paused_until <= 1012
+
+        # A later, shorter Retry-After does not shorten the pause
+        limiter.record_throttle(503, parse_retry_after(_http_date(2)))
+        assert limiter.paused_until >= 1010
+
+        clock.advance(30)
+        limiter.record_throttle(503, parse_retry_after(_http_date(20)))
+        assert 1030 + 18 <= limiter.paused_until <= 1030 + 25
+
+    def test_acquire_waits_out_the_pause(self):
+        limiter = HostRateLimiter('example.com', rate=100.0, burst=5, max_in_flight=4)
+        limiter.record_throttle(429, 0.1)
+
+        started = time.monotonic()
+        asyncio.run(limiter.acquire_token())
+
+        assert time.monotonic() - started >= 0.1
+
+    def test_in_flight_cap(self):
+        limiter = HostRateLimiter('example.com', rate=1000.0, burst=10, max_in_flight=2)
+        state = {'in_flight': 0, 'peak': 0}
+
+        async def request():
+            async with limiter.slot():
+                state['in_flight'] += 1
+                state['peak'] = max(state['peak'], state['in_flight'])
+                await asyncio.sleep(0.02)
+                state['in_flight'] -= 1
+
+        async def run():
+            await asyncio.gather(*(request() for _ in range(6)))
+
+        asyncio.run(run())
+
+        assert state['peak'] == 2
+
+    def test_limiters_are_shared_per_host_and_exit(self, monkeypatch):
+        monkeypatch.setattr(rate_limiter, '_limiters', {})
+        monkeypatch.setattr(settings, 'rate_limit_per_second', 2.0)
+
+        limiter = get_rate_limiter('https://example.com/lst?page=1')
+        assert get_rate_limiter('https://example.com/lst?page=2') is limiter
+        proxied = get_rate_limiter('https://example.com/lst', exit='http://proxy:8080')
+        assert proxied is not limiter
+        get_rate_limiter('https://other.com/lst')
+
+        assert host_rate('https://example.com/') == 4.0
@@ -0,0 +1,807 @@
+import asyncio
+import os
+import time
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.core.config import settings
+from app.core.database import Base
+from app.models.models import Car, PriceHistory, ScrapingLog, Search
+from app.scraping import autoscout24_scraper
+from app.scraping.autoscout24_scraper import AutoScout24Scraper
+from app.scraping.crawl_planner import plan_crawls
+from app.scraping.fetcher import AsyncFetcher
+from app.scraping.parser import ListingParser, parse_price, parse_specifications
+from app.scraping.page_archive import PageArchive
+from app.scraping.persistence import KnownListingIndex, ListingWriter
+from app.scraping.pipeline import PagePipeline
+from app.scraping.proxy_pool import ProxyPool
+from app.services import scrape_job_service
+from app.services.scheduler import crawl_search, scrape_active_searches
+from benchmarks.autoscout24_simulator import (
+    SimulatorConfig, make_listing, render_page, start_forward_proxy, start_simulator
+)
+
+def _configure(monkeypatch, tmp_path, base_url):
+    """Point the scraper at the simulator with a fast, isolated setup"""
+    monkeypatch.setattr(settings, 'autoscout24_base_url', base_url)
+    monkeypatch.setattr(settings, 'rate_limit_per_second', 200.0)
+    monkeypatch.setattr(settings, 'max_retries', 2)
+    monkeypatch.setattr(settings, 'cache_dir', str(tmp_path / 'cache'))
+    monkeypatch.setattr(settings, 'archive_dir', str(tmp_path / 'archive'))
+
+def _session():
+    # One shared in-memory database, since pages are saved from worker threads
+    engine = create_engine('sqlite://', poolclass=StaticPool, connect_args={'check_same_thread': False})
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+
+async def _scrape(monkeypatch, tmp_path, config, runs=1, crawl_mode=None):
+    runner, base_url = await start_simulator(config)
+    try:
+        _configure(monkeypatch, tmp_path, base_url)
+        db = _session()
+        search = Search(name='Test', brand='BMW')
+        db.add(search)
+        db.commit()
+        results = [await AutoScout24Scraper(db).scrape_search(search, crawl_mode) for _ in range(runs)]
+        return db, search, results
+    finally:
+        await runner.cleanup()
+
+class TestListingParser:
+    """Parser tests on simulator markup"""
+
+    def test_parses_italian_number_formats(self):
+        assert parse_price("€ 12.300,-") == 12300
+        specs = parse_specifications("€ 12.300,- 120.000 km Diesel 110 kW (150 CV) 03/2018")
+        assert specs['mileage'] == 120000
+        assert specs['year'] == 2018
+        assert specs['power_kw'] == 110
+        assert specs['power_cv'] == 150
+
+    def test_selector_plan_is_learned_per_layout(self):
+        for layout, container_plan in (('classic', 0), ('article', 1)):
+            config = SimulatorConfig(results=30, per_page=20, layout=layout)
+            parser = ListingParser('http://localhost')
+
+            first = parser.parse(render_page(config, 1).encode())
+            last = parser.parse(render_page(config, 2).encode())
+
+            assert parser.plan['container'] == container_plan
+            assert len(first['listings']) == 20 and first['has_next_page']
+            assert len(last['listings']) == 10 and not last['has_next_page']
+            assert first['total_results'] == 30
+            expected = make_listing(config.seed, 0)
+            assert first['listings'][0]['external_id'] == expected['id']
+            assert first['listings'][0]['price'] == expected['price']
+            assert first['listings'][0]['mileage'] == expected['mileage']
+
+    def test_next_data_fast_path(self):
+        config = SimulatorConfig(results=30, per_page=20, layout='nextjs')
+        parser = ListingParser('http://localhost')
+
+        parsed = parser.parse(render_page(config, 1).encode(), page=1)
+
+        # The JSON path never touches the DOM selector plan
+        assert parser.plan['container'] is None
+        assert parsed['has_next_page'] and parsed['total_results'] == 30
+        listing = parsed['listings'][0]
+        expected = make_listing(config.seed, 0)
+        assert listing['price'] == expected['price']
+        assert listing['year'] == expected['year']
+        assert listing['province'] == expected['location'][0]
+        assert listing['seller_type'] == expected['seller_type']
+        assert not parser.parse(render_page(config, 2).encode(), page=2)['has_next_page']
+
+class TestPagePipeline:
+    """Ordering and backpressure of the fetch -> parse -> write stages"""
+
+    def test_slow_writer_holds_fetching_back(self):
+        fetched, written = [], []
+
+        async def fetch(page):
+            fetched.append(page)
+            # Later pages arrive first
+            await asyncio.sleep(0.001 * (20 - page))
+            return page
+
+        async def parse(page, item):
+            return item * 10
+
+        async def write(page, item):
+            assert item == page * 10
+            written.append(page)
+            await asyncio.sleep(0.005)
+            # Everything is in flight ahead of the writer, up to the backpressure bound
+            assert len(fetched) - len(written) <= pipeline.max_ahead
+            return 20
+
+        pipeline = PagePipeline(fetch, parse, write, fetch_workers=4, parse_workers=2, queue_size=2)
+        asyncio.run(pipeline.run(1, 15))
+
+        assert written == list(range(1, 16))
+        assert pipeline.metrics['write'].items == 15
+        assert pipeline.metrics['fetch'].max_depth <= 2
+
+class TestPageArchive:
+    """Raw page archive written from concurrent shard crawls"""
+
+    def test_concurrent_adds_keep_offsets_consistent(self, tmp_path):
+        archive = PageArchive(1, archive_dir=str(tmp_path))
+        bodies = {page: os.urandom(200_000) for page in range(1, 101)}
+
+        async def add_all():
+            await asyncio.gather(*(
+                asyncio.to_thread(archive.add, f'u/{page}', page, body) for page, body in bodies.items()
+            ))
+
+        asyncio.run(add_all())
+
+        archived = {entry['page']: body for entry, body in archive.iter_pages()}
+        assert archived == bodies
+
+class TestAutoScout24Scraper:
+    """End-to-end scraper tests against the local simulator"""
+
+    def test_scrape_search_stores_all_pages(self, monkeypatch, tmp_path):
+        config = SimulatorConfig(results=130, per_page=20)
+        db, search, results = asyncio.run(_scrape(monkeypatch, tmp_path, config))
+
+        assert results[0]['status'] == 'success'
+        assert results[0]['pages_scraped'] == 7
+        assert results[0]['cars_new'] == 130
+        assert db.query(Car).count() == 130
+        assert db.query(PriceHistory).count() == 130
+
+        log_entry = db.query(ScrapingLog).filter(ScrapingLog.search_id == search.id).one()
+        assert log_entry.status == 'success'
+        assert log_entry.pages_scraped == 7
+
+    def test_second_run_updates_existing_cars(self, monkeypatch, tmp_path):
+        config = SimulatorConfig(results=40, per_page=20, layout='article')
+        db, _, results = asyncio.run(_scrape(monkeypatch, tmp_path, config, runs=2))
+
+        assert results[1]['cars_new'] == 0
+        assert results[1]['cars_found'] == 40
+        assert results[1]['cars_unchanged'] == 40
+        assert db.query(Car).count() == 40
+        assert db.query(PriceHistory).count() == 40
+
+    def test_not_modified_pages_skip_parsing(self, monkeypatch, tmp_path):
+        config = SimulatorConfig(results=60, per_page=20, etag=True)
+        db, _, results = asyncio.run(_scrape(monkeypatch, tmp_path, config, runs=2, crawl_mode='full'))
+
+        assert results[1]['cars_found'] == 60
+        assert results[1]['cars_updated'] == 0
+
+    def test_incremental_run_stops_at_known_frontier(self, monkeypatch, tmp_path):
+        config = SimulatorConfig(results=200, per_page=20)
+        fetch_page = AutoScout24Scraper._fetch_page
+        fetched = []
+
+        async def counting_fetch_page(self, search_url, page):
+            fetched.append(page)
+            return await fetch_page(self, search_url, page)
+
+        monkeypatch.setattr(AutoScout24Scraper, '_fetch_page', counting_fetch_page)
+        db, _, results = asyncio.run(_scrape(monkeypatch, tmp_path, config, runs=2))
+
+        assert results[0]['crawl_mode'] == 'full'
+        assert results[0]['pages_scraped'] == 10
+        assert results[1]['crawl_mode'] == 'incremental'
+        assert results[1]['pages_scraped'] == settings.incremental_stop_after_pages
+        assert results[1]['cars_new'] == 0
+        # No pages are requested past the known frontier
+        assert fetched[10:] == [1, 2]
+
+    def test_interrupted_run_resumes_from_last_committed_page(self, monkeypatch, tmp_path):
+        config = SimulatorConfig(results=100, per_page=20, fail_pages={3})
+
+        async def run():
+            runner, base_url = await start_simulator(config)
+            try:
+                _configure(monkeypatch, tmp_path, base_url)
+                monkeypatch.setattr(settings, 'max_retries', 1)
+                db = _session()
+                search = Search(name='Test', brand='BMW')
+                db.add(search)
+                db.commit()
+                first = await AutoScout24Scraper(db).scrape_search(search, 'full')
+                config.fail_pages.clear()
+                second = await AutoScout24Scraper(db).scrape_search(search, 'full')
+                return db, first, second
+            finally:
+                await runner.cleanup()
+
+        db, first, second = asyncio.run(run())
+
+        interrupted = db.query(ScrapingLog).filter(ScrapingLog.status == 'partial').one()
+        assert first['status'] == 'partial' and interrupted.last_page == 2
+        assert second['status'] == 'success' and second['resumed_from'] == interrupted.id
+        # Pages 2-5: the last committed page is fetched again to absorb drift
+        assert second['pages_scraped'] == 4
+        assert second['cars_delisted'] == 0
+        assert db.query(Car).count() == 100
+
+    def test_resumed_crawl_keeps_member_cars_seen_before_the_cursor(self, monkeypatch, tmp_path):
+        config = SimulatorConfig(results=100, per_page=20)
+
+        async def run():
+            runner, base_url = await start_simulator(config)
+            try:
+                _configure(monkeypatch, tmp_path, base_url)
+                monkeypatch.setattr(settings, 'max_retries', 1)
+                monkeypatch.setattr(settings, 'liveness_check_enabled', False)
+                db = _session()
+                root = Search(name='BMW', brand='BMW')
+                member = Search(name='BMW diesel', brand='BMW', fuel_type='diesel')
+                db.add_all([root, member])
+                db.commit()
+                # The member's own crawl stored its cars before it was covered
+                await AutoScout24Scraper(db).scrape_search(member, 'full')
+                config.fail_pages = {3}
+                first = await AutoScout24Scraper(db).scrape_search(root, 'full', members=[member])
+                config.fail_pages = set()
+                second = await AutoScout24Scraper(db).scrape_search(root, 'full', members=[member])
+                return db, first, second
+            finally:
+                await runner.cleanup()
+
+        db, first, second = asyncio.run(run())
+
+        assert first['status'] == 'partial' and second['resumed_from'] is not None
+        assert second['status'] == 'success' and second['cars_delisted'] == 0
+        assert db.query(Car).filter(Car.is_available == True).count() == 100
+
+    def test_full_crawl_fans_out_from_the_first_page_count(self, monkeypatch, tmp_path):
+        config = SimulatorConfig(results=200, per_page=20, latency_ms=20)
+        monkeypatch.setattr(settings, 'page_concurrency', 1)
+        in_flight = {'now': 0, 'peak': 0}
+        fetch_page = AutoScout24Scraper._fetch_page
+
+        async def counting_fetch_page(self, search_url, page):
+            in_flight['now'] += 1
+            in_flight['peak'] = max(in_flight['peak'], in_flight['now'])
+            try:
+                return await fetch_page(self, search_url, page)
+            finally:
+                in_flight['now'] -= 1
+
+        monkeypatch.setattr(AutoScout24Scraper, '_fetch_page', counting_fetch_page)
+        db, _, results = asyncio.run(_scrape(monkeypatch, tmp_path, config))
+
+        # Pages 2-10 were all scheduled once page 1 gave the result count,
+        # as many at a time as the fetch stage has workers
+        assert results[0]['crawl_mode'] == 'full'
+        assert in_flight['peak'] == settings.max_requests_in_flight
+        assert results[0]['pages_scraped'] == 10 and db.query(Car).count() == 200
+        assert results[0]['requests_made'] == 10
+
+        stages = db.query(ScrapingLog).one().stage_metrics
+        assert stages['fetch']['items'] == 10 and stages['write']['items'] == 10
+        assert stages['parse']['items_per_second'] > 0
+
+    def test_slow_commits_do_not_block_the_event_loop(self, monkeypatch, tmp_path):
+        config = SimulatorConfig(results=100, per_page=20)
+        process_listings = AutoScout24Scraper._process_listings
+        writes = []
+
+        def slow_process_listings(self, *args, **kwargs):
+            started = time.perf_counter()
+            time.sleep(0.05)
+            writes.append((started, time.perf_counter()))
+            return process_listings(self, *args, **kwargs)
+
+        monkeypatch.setattr(AutoScout24Scraper, '_process_listings', slow_process_listings)
+
+        async def run():
+            ticks = []
+
+            async def tick():
+                while True:
+                    await asyncio.sleep(0.005)
+                    ticks.append(time.perf_counter())
+
+            ticker = asyncio.create_task(tick())
+            try:
+                db, _, results = await _scrape(monkeypatch, tmp_path, config)
+            finally:
+                ticker.cancel()
+            return db, results, ticks
+
+        db, results, ticks = asyncio.run(run())
+
+        assert results[0]['pages_scraped'] == 5 and db.query(Car).count() == 100
+        # The loop kept running while each page was being saved
+        assert len(writes) == 5
+        assert all(any(started < t < finished for t in ticks) for started, finished in writes)
+
+    def test_run_profile_breaks_down_page_timings(self, monkeypatch, tmp_path):
+        config = SimulatorConfig(results=50, per_page=20)
+        db, _, _ = asyncio.run(_scrape(monkeypatch, tmp_path, config))
+        log_entry = db.query(ScrapingLog).one()
+
+        profile = scrape_job_service.ScrapeJobService(db).get_run_profile(log_entry.id)
+
+        assert [page.page for page in profile.pages] == [1, 2, 3]
+        assert [page.listings for page in profile.pages] == [20, 20, 10]
+        assert all(page.write_seconds is not None for page in profile.pages)
+        assert profile.fetch['p50_seconds'] <= profile.fetch['p99_seconds']
+        assert profile.fetch['total_bytes'] == sum(page.response_bytes for page in profile.pages) > 0
+        assert profile.parse['listings'] == 50 and profile.parse['pages'] == 3
+        assert profile.retries == 0 and profile.stages['write']['items'] == 3
+        assert scrape_job_service.ScrapeJobService(db).get_run_profile(log_entry.id + 1) is None
+
+    def test_run_profile_counts_bytes_received_for_revalidated_pages(self, monkeypatch, tmp_path):
+        config = SimulatorConfig(results=50, per_page=20, etag=True)
+        db, _, _ = asyncio.run(_scrape(monkeypatch, tmp_path, config, runs=2, crawl_mode='full'))
+        first, second = [scrape_job_service.ScrapeJobService(db).get_run_profile(log_entry.id)
+                         for log_entry in db.query(ScrapingLog).order_by(ScrapingLog.id)]
+
+        assert all(page.response_bytes > 0 for page in first.pages)
+        # 304s carry no body; the cached copy served in its place is not counted
+        assert all(page.not_modified for page in second.pages)
+        assert second.fetch['total_bytes'] == 0
+
+    def test_run_profile_skips_cancelled_lookahead_fetches(self, monkeypatch, tmp_path):
+        config = SimulatorConfig(results=200, per_page=20, latency_ms=100, fail_pages={2})
+        fetch_page = AutoScout24Scraper._fetch_page
+        fetched = []
+
+        async def counting_fetch_page(self, search_url, page):
+            fetched.append(page)
+            if page > 2:
+                # Still downloading when page 2 gives up
+                await asyncio.sleep(10)
+            return await fetch_page(self, search_url, page)
+
+        monkeypatch.setattr(AutoScout24Scraper, '_fetch_page', counting_fetch_page)
+        db, _, results = asyncio.run(_scrape(monkeypatch, tmp_path, config, crawl_mode='full'))
+        log_entry = db.query(ScrapingLog).one()
+
+        profile = scrape_job_service.ScrapeJobService(db).get_run_profile(log_entry.id)
+
+        # Page 2 failed and stopped the run, with the pages after it still in flight
+        assert results[0]['status'] == 'partial' and len(fetched) > 2
+        assert sorted(page.page for page in profile.pages) == [1, 2]
+        assert profile.fetch['p50_seconds'] >= 0.1
+
+    def test_saturated_search_is_sharded_by_price(self, monkeypatch, tmp_path):
+        # 15 pages of results against a 5-page cap
+        monkeypatch.setattr(autoscout24_scraper, 'MAX_PAGES', 5)
+        for layout in ('nextjs', 'classic'):
+            config = SimulatorConfig(results=300, per_page=20, layout=layout)
+            db, _, results = asyncio.run(_scrape(monkeypatch, tmp_path / layout, config, crawl_mode='full'))
+
+            assert results[0]['status'] == 'success'
+            assert results[0]['shards'] > 2 and not results[0]['pages_capped']
+            # Listings seen in more than one shard are saved once
+            assert results[0]['cars_found'] == 300
+            assert db.query(Car).count() == 300
+
+    def test_reparse_run_replays_archive(self, monkeypatch, tmp_path):
+        config = SimulatorConfig(results=60, per_page=20)
+        db, _, _ = asyncio.run(_scrape(monkeypatch, tmp_path, config))
+        log_entry = db.query(ScrapingLog).one()
+
+        # Since the archived run: one car sold, one repriced, one lost a field
+        sold, repriced, sparse = db.query(Car).order_by(Car.id).limit(3).all()
+        sold.is_available = False
+        sold.delisted_at = datetime.now()
+        repriced.price += 1000
+        sparse.fuel_type = None
+        db.commit()
+        price = repriced.price
+        history = db.query(PriceHistory).count()
+
+        result = asyncio.run(AutoScout24Scraper(db).reparse_run(log_entry.id))
+
+        assert result['pages_parsed'] == 3
+        assert result['cars_found'] == 60 and result['cars_updated'] == 60
+        db.expire_all()
+        # Only the missing field is backfilled
+        assert sparse.fuel_type is not None
+        assert not sold.is_available and sold.delisted_at is not None
+        assert repriced.price == price
+        assert db.query(PriceHistory).count() == history
+
+    def test_full_run_delists_unseen_cars(self, monkeypatch, tmp_path):
+        config = SimulatorConfig(results=60, per_page=20)
+
+        async def run():
+            runner, base_url = await start_simulator(config)
+            try:
+                _configure(monkeypatch, tmp_path, base_url)
+                db = _session()
+                search = Search(name='Test', brand='BMW')
+                db.add(search)
+                db.commit()
+                await AutoScout24Scraper(db).scrape_search(search, 'full')
+                # The last page's listings drop out between runs; only
+                # some of them are actually sold
+                config.results = 45
+                config.unlisted = 5
+                result = await AutoScout24Scraper(db).scrape_search(search, 'full')
+                return db, result
+            finally:
+                await runner.cleanup()
+
+        db, result = asyncio.run(run())
+
+        assert result['cars_delisted'] == 10
+        assert db.query(Car).filter(Car.is_available == True).count() == 50
+        assert db.query(Car).filter(Car.delisted_at.isnot(None)).count() == 10
+        assert db.query(Car).filter(Car.verified_at.isnot(None)).count() == 5
+
+    def test_empty_page_is_not_taken_for_the_end(self, monkeypatch, tmp_path):
+        config = SimulatorConfig(results=60, per_page=20)
+
+        async def interstitial(self, content, page=None):
+            # Page 1 came back without listings, e.g. an anti-bot page
+            return {'listings': [], 'has_next_page': False, 'total_results': None}
+
+        async def run():
+            runner, base_url = await start_simulator(config)
+            try:
+                _configure(monkeypatch, tmp_path, base_url)
+                monkeypatch.setattr(settings, 'liveness_check_enabled', False)
+                monkeypatch.setattr(settings, 'http_cache_enabled', False)
+                db = _session()
+                search = Search(name='Test', brand='BMW')
+                db.add(search)
+                db.commit()
+                await AutoScout24Scraper(db).scrape_search(search, 'full')
+                with monkeypatch.context() as patched:
+                    patched.setattr(AutoScout24Scraper, '_parse_page', interstitial)
+                    result = await AutoScout24Scraper(db).scrape_search(search, 'full')
+                # A search with no results at all is a finished crawl
+                config.results = 0
+                empty = await AutoScout24Scraper(db).scrape_search(search, 'full')
+                return db, result, empty
+            finally:
+                await runner.cleanup()
+
+        db, result, empty = asyncio.run(run())
+
+        assert result['status'] == 'partial' and result['cars_delisted'] == 0
+        assert empty['status'] == 'success' and empty['cars_delisted'] == 60
+        assert db.query(Car).filter(Car.is_available == True).count() == 0
+
+    def test_broad_crawl_routes_listings_to_covered_searches(self, monkeypatch, tmp_path):
+        config = SimulatorConfig(results=100, per_page=20)
+
+        async def run():
+            runner, base_url = await start_simulator(config)
+            try:
+                _configure(monkeypatch, tmp_path, base_url)
+                db = _session()
+                broad = Search(name='Tutte')
+                narrow = Search(name='BMW diesel', brand='BMW', fuel_type='diesel')
+                db.add_all([broad, narrow])
+                db.commit()
+                [group] = plan_crawls([narrow, broad])
+                result = await AutoScout24Scraper(db).scrape_search(group.root, members=group.members)
+                return db, group, result
+            finally:
+                await runner.cleanup()
+
+        db, group, result = asyncio.run(run())
+
+        expected = [
+            listing for listing in map(lambda i: make_listing(config.seed, i), range(config.results))
+            if listing['brand'] == 'BMW' and listing['fuel'] == 'Diesel'
+        ]
+        assert group.root.name == 'Tutte'
+        assert result['routed'] == {group.members[0].id: len(expected)}
+        assert db.query(Car).filter(Car.in_search(group.members[0].id)).count() == len(expected)
+        assert db.query(Car).filter(Car.in_search(group.root.id)).count() == 100
+
+    def test_multi_word_model_and_province_routing(self, monkeypatch, tmp_path):
+        # Classic markup: the DOM parser reads "Serie 3" as model "Serie" and no province
+        config = SimulatorConfig(results=100, per_page=20)
+
+        async def run():
+            runner, base_url = await start_simulator(config)
+            try:
+                _configure(monkeypatch, tmp_path, base_url)
+                db = _session()
+                model = Search(name='BMW Serie 3', brand='BMW', model='Serie 3')
+                diesel = Search(name='BMW Serie 3 diesel', brand='BMW', model='Serie 3', fuel_type='Diesel')
+                milano = Search(name='BMW Milano', brand='BMW', province='Milano')
+                db.add_all([model, diesel, milano])
+                db.commit()
+                groups = plan_crawls([diesel, milano, model])
+                group = next(group for group in groups if group.root is model)
+                result = await AutoScout24Scraper(db).scrape_search(model, members=group.members)
+                return groups, diesel, result
+            finally:
+                await runner.cleanup()
+
+        groups, diesel, result = asyncio.run(run())
+
+        assert sorted((group.root.name, [m.name for m in group.members]) for group in groups) == [
+            ('BMW Milano', []), ('BMW Serie 3', ['BMW Serie 3 diesel'])
+        ]
+        # The simulator ignores make/model, so every diesel listing counts; the
+        # model filter is applied by the crawl, not re-checked on listings
+        expected = sum(1 for i in range(config.results) if make_listing(config.seed, i)['fuel'] == 'Diesel')
+        assert result['routed'] == {diesel.id: expected} and expected > 0
+
+    def test_scheduler_runs_searches_in_parallel_sessions(self, monkeypatch, tmp_path):
+        config = SimulatorConfig(results=60, per_page=20)
+        engine = create_engine(f"sqlite:///{tmp_path / 'cars.db'}")
+        Base.metadata.create_all(bind=engine)
+        session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        db = session_factory()
+        # Colour cannot be checked locally, so these are two separate crawls
+        db.add_all([Search(name='Rosse', color='Rosso'), Search(name='Blu', color='Blu')])
+        db.commit()
+
+        async def run():
+            runner, base_url = await start_simulator(config)
+            try:
+                _configure(monkeypatch, tmp_path, base_url)
+                return await scrape_active_searches(session_factory, concurrency=2)
+            finally:
+                await runner.cleanup()
+
+        summary = asyncio.run(run())
+
+        assert summary['crawls'] == 2 and summary['succeeded'] == 2
+        assert summary['pages_scraped'] == 6
+        assert summary['pages_per_second'] > 0
+        assert db.query(ScrapingLog).filter(ScrapingLog.status == 'success').count() == 2
+
+    def test_timeout_waits_for_the_page_being_saved(self, monkeypatch, tmp_path):
+        config = SimulatorConfig(results=100, per_page=20)
+        engine = create_engine(f"sqlite:///{tmp_path / 'cars.db'}")
+        Base.metadata.create_all(bind=engine)
+        session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        db = session_factory()
+        search = Search(name='Test')
+        db.add(search)
+        db.commit()
+        # A manual job queued for the same search meanwhile
+        queued = ScrapingLog(search_id=search.id, status='queued', started_at=datetime.now())
+        db.add(queued)
+        db.commit()
+        process_listings = AutoScout24Scraper._process_listings
+        saves = {'started': 0, 'finished': 0}
+
+        def slow_process_listings(self, *args, **kwargs):
+            saves['started'] += 1
+            time.sleep(1.0)
+            result = process_listings(self, *args, **kwargs)
+            saves['finished'] += 1
+            return result
+
+        monkeypatch.setattr(AutoScout24Scraper, '_process_listings', slow_process_listings)
+        monkeypatch.setattr(settings, 'search_timeout_minutes', 0.5 / 60)
+
+        async def run():
+            runner, base_url = await start_simulator(config)
+            try:
+                _configure(monkeypatch, tmp_path, base_url)
+                with pytest.raises(asyncio.TimeoutError):
+                    await crawl_search(session_factory, search.id)
+                # Nothing is left running on the session once the timeout is raised
+                return dict(saves)
+            finally:
+                await runner.cleanup()
+
+        saves_at_timeout = asyncio.run(run())
+
+        assert saves_at_timeout['started'] == saves_at_timeout['finished'] == 1
+        db.expire_all()
+        run_log = db.query(ScrapingLog).filter(ScrapingLog.id != queued.id).one()
+        assert run_log.status == 'failed' and run_log.error_message.startswith('Timed out')
+        assert db.get(ScrapingLog, queued.id).status == 'queued'
+
+    def test_manual_run_is_a_deduplicated_background_job(self, monkeypatch, tmp_path):
+        config = SimulatorConfig(results=60, per_page=20, latency_ms=20)
+        engine = create_engine(f"sqlite:///{tmp_path / 'cars.db'}")
+        Base.metadata.create_all(bind=engine)
+        session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        monkeypatch.setattr(scrape_job_service, 'SessionLocal', session_factory)
+        db = session_factory()
+        search = Search(name='Test')
+        db.add(search)
+        db.commit()
+
+        async def run():
+            runner, base_url = await start_simulator(config)
+            try:
+                _configure(monkeypatch, tmp_path, base_url)
+                service = scrape_job_service.ScrapeJobService(db)
+                job, created = await service.start_search_run(search.id)
+                repeat, repeat_created = await service.start_search_run(search.id)
+                await scrape_job_service._tasks[search.id]
+                db.expire_all()
+                return job, created, repeat, repeat_created, service.get_progress(job.job_id)
+            finally:
+                await runner.cleanup()
+
+        job, created, repeat, repeat_created, progress = asyncio.run(run())
+
+        assert created and job.status == 'queued'
+        assert not repeat_created and repeat.deduplicated and repeat.job_id == job.job_id
+        assert progress.done and progress.status == 'success'
+        assert progress.pages_scraped == 3 and progress.cars_found == 60
+        assert db.query(ScrapingLog).count() == 1
+
+    def test_manual_run_that_cannot_be_queued_fails_its_job(self, monkeypatch, tmp_path):
+        db = _session()
+        search = Search(name='Test')
+        db.add(search)
+        db.commit()
+
+        def enqueue_crawl(queue, search_id, member_ids=None, log_id=None):
+            raise ConnectionError('Redis is down')
+
+        monkeypatch.setattr(settings, 'job_queue_enabled', True)
+        monkeypatch.setattr(scrape_job_service, 'RedisJobQueue', lambda: None)
+        monkeypatch.setattr(scrape_job_service, 'enqueue_crawl', enqueue_crawl)
+        service = scrape_job_service.ScrapeJobService(db)
+        with pytest.raises(ConnectionError):
+            asyncio.run(service.start_search_run(search.id))
+
+        log_entry = db.query(ScrapingLog).one()
+        assert log_entry.status == 'failed' and 'Redis is down' in log_entry.error_message
+        # A failed job does not block the next attempt
+        assert service._active_job(search.id) is None
+
+class TestProxyPool:
+    """Health scoring and routing through local stand-in proxies"""
+
+    def test_failing_exit_is_quarantined(self):
+        pool = ProxyPool(['http://good', 'http://bad'], quarantine_failures=2, quarantine_seconds=60)
+        for _ in range(5):
+            pool.record('http://good', latency=0.1, status=200)
+        pool.record('http://bad', latency=0.1, status=429)
+        pool.record('http://bad')
+
+        health = {proxy['url']: proxy for proxy in pool.snapshot()}
+        assert health['http://bad']['quarantined'] and not health['http://good']['quarantined']
+        assert health['http://bad']['throttles'] == 1 and health['http://bad']['errors'] == 1
+        assert {pool.choose() for _ in range(20)} == {'http://good'}
+
+    def test_healthier_exits_get_more_traffic(self):
+        pool = ProxyPool(['http://fast', 'http://slow'])
+        for _ in range(10):
+            pool.record('http://fast', latency=0.05, status=200)
+            pool.record('http://slow', latency=2.0, status=200)
+
+        picks = [pool.choose() for _ in range(400)]
+
+        assert picks.count('http://fast') > 3 * picks.count('http://slow')
+
+    def test_fetcher_routes_requests_through_the_pool(self, monkeypatch):
+        monkeypatch.setattr(settings, 'rate_limit_per_second', 200.0)
+
+        async def run():
+            runner, base_url = await start_simulator(SimulatorConfig(results=20))
+            good, good_url = await start_forward_proxy()
+            bad, bad_url = await start_forward_proxy(fail_status=502)
+            pool = ProxyPool([good_url, bad_url], quarantine_failures=1, quarantine_seconds=60)
+            try:
+                async with AsyncFetcher(proxies=pool) as fetcher:
+                    statuses = [(await fetcher.get(f"{base_url}/risultati?page=1")).status_code
+                                for _ in range(10)]
+                return statuses, good.app['stats']['requests'], bad.app['stats']['requests'], pool
+            finally:
+                await good.cleanup()
+                await bad.cleanup()
+                await runner.cleanup()
+
+        statuses, good_requests, bad_requests, pool = asyncio.run(run())
+
+        # The bad exit is quarantined after its first failure
+        assert bad_requests <= 1 and good_requests == 10 - bad_requests
+        assert statuses.count(200) == good_requests
+        health = {proxy['url']: proxy for proxy in pool.snapshot()}
+        assert all(proxy['latency'] is not None for proxy in health.values() if proxy['requests'])
+
+class TestCrawlPlanner:
+    """Grouping of overlapping saved searches"""
+
+    def test_narrower_searches_join_the_broadest_covering_crawl(self):
+        searches = [
+            Search(id=1, name='BMW Serie 3 diesel', brand='BMW', model='Serie 3', fuel_type='Diesel'),
+            Search(id=2, name='BMW', brand='bmw '),
+            Search(id=3, name='BMW recenti', brand='BMW', year_min=2020),
+            Search(id=4, name='BMW rosse', brand='BMW', color='Rosso'),
+            Search(id=5, name='Audi', brand='Audi'),
+        ]
+
+        groups = {group.root.id: [member.id for member in group.members] for group in plan_crawls(searches)}
+
+        # Colour, model and province cannot be checked on every parsed listing,
+        # so those searches keep their own crawls
+        assert groups == {2: [3], 1: [], 4: [], 5: []}
+
+class TestListingWriter:
+    """Page-level upsert tests on SQLite"""
+
+    def test_upsert_records_price_changes_only(self):
+        db = _session()
+        search = Search(name='Test')
+        db.add(search)
+        db.commit()
+        writer = ListingWriter(db)
+        page = [
+            {'external_id': 'a', 'url': 'u/a', 'brand': 'BMW', 'model': 'X1', 'price': 10000.0, 'mileage': 5000},
+            {'external_id': 'b', 'url': 'u/b', 'brand': 'Fiat', 'model': 'Panda', 'price': 5000.0},
+        ]
+
+        first = writer.write_page(page, search.id)
+        page[0] = {**page[0], 'price': 9500.0, 'mileage': None}
+        second = writer.write_page(page, search.id)
+
+        assert first == {'cars_found': 2, 'cars_new': 2, 'cars_updated': 0, 'cars_unchanged': 0}
+        assert second == {'cars_found': 2, 'cars_new': 0, 'cars_updated': 2, 'cars_unchanged': 0}
+        car = db.query(Car).filter(Car.external_id == 'a').one()
+        assert car.price == 9500.0
+        assert car.mileage == 5000  # a missing value does not erase stored data
+        assert db.query(PriceHistory).filter(PriceHistory.car_id == car.id).count() == 2
+        assert db.query(PriceHistory).count() == 3
+
+    def test_known_index_skips_unchanged_listings(self):
+        db = _session()
+        search = Search(name='Test')
+        db.add(search)
+        db.commit()
+        page = [
+            {'external_id': 'a', 'url': 'u/a', 'brand': 'BMW', 'model': 'X1', 'price': 10000.0},
+            {'external_id': 'b', 'url': 'u/b', 'brand': 'Fiat', 'model': 'Panda', 'price': 5000.0},
+        ]
+        ListingWriter(db).write_page(page, search.id)
+
+        stale = datetime(2020, 1, 1)
+        db.query(Car).update({Car.last_seen: stale})
+        db.commit()
+
+        index = KnownListingIndex.load(db, search.id)
+        page[1] = {**page[1], 'price': 4800.0}
+        counts = ListingWriter(db).write_page(page, search.id, index)
+
+        assert counts == {'cars_found': 2, 'cars_new': 0, 'cars_updated': 1, 'cars_unchanged': 1}
+        unchanged = db.query(Car).filter(Car.external_id == 'a').one()
+        db.refresh(unchanged)
+        assert unchanged.last_seen > stale
+        assert index.get('b').price == 4800.0
+        assert index.classify(page[1], index.get('b').content_hash) == KnownListingIndex.UNCHANGED
+
+    def test_known_index_covers_member_searches(self):
+        db = _session()
+        root, member = Search(name='BMW'), Search(name='BMW diesel')
+        db.add_all([root, member])
+        db.commit()
+        page = [{'external_id': 'a', 'url': 'u/a', 'brand': 'BMW', 'model': 'X1', 'price': 10000.0}]
+        # First stored by the member's own crawl, before the searches were merged
+        ListingWriter(db).write_page(page, member.id)
+
+        index = KnownListingIndex.load(db, root.id, [member.id])
+        counts = ListingWriter(db).write_page(page, root.id, index)
+
+        assert KnownListingIndex.load(db, root.id).get('a') is None
+        assert counts == {'cars_found': 1, 'cars_new': 0, 'cars_updated': 0, 'cars_unchanged': 1}
+
+    def test_sweep_delists_unseen_cars(self):
+        db = _session()
+        search = Search(name='Test')
+        db.add(search)
+        db.commit()
+        writer = ListingWriter(db)
+        writer.write_page([
+            {'external_id': external_id, 'url': f'u/{external_id}', 'brand': 'BMW', 'model': 'X1', 'price': 1.0}
+            for external_id in 'abc'
+        ], search.id)
+
+        assert sorted(car.external_id for car in writer.unseen_cars(search.id, {'a'})) == ['b', 'c']
+        assert writer.sweep_unseen(search.id, {'a'}) == 2
+        assert db.query(Car).filter(Car.is_available == True).count() == 1